@@ -1,12 +1,27 @@
 from typing import Any, Dict
 import javalang
+from ast_visitor import visit_method, add_visitor_results
 
+# "filter": one method.filter(...) walk per node type (original output)
+# "visitor": single-pass MethodBodyVisitor, also adds loops/try_catch/throws/field accesses
+DEFAULT_EXTRACTOR = "filter"
+VISITOR_KEYS = ("invocations", "conditionals", "returns", "loops", "try_catch", "throws_statements", "field_accesses")
+
+
+def enhancedtree_to_json(tree: javalang.tree.CompilationUnit, extractor: str = DEFAULT_EXTRACTOR) -> Dict[str, Any]:
+    type_cache = {}
 
-def enhancedtree_to_json(tree: javalang.tree.CompilationUnit) -> Dict[str, Any]:
     def extract_type(t):
-        # try to get readable name, fall back to str()
+        # type nodes are shared (fields, params, throws); render each one once
         if t is None:
             return None
+        key = id(t)
+        if key not in type_cache:
+            type_cache[key] = _extract_type(t)
+        return type_cache[key]
+
+    def _extract_type(t):
+        # try to get readable name, fall back to str()
         if hasattr(t, 'name'):
             # include dimensions if present (array)
             name = t.name
@@ -95,6 +110,7 @@ def enhancedtree_to_json(tree: javalang.tree.CompilationUnit) -> Dict[str, Any]:
 
             # Methods
             methods = []
+            field_names = [f["name"] for f in fields]
             for method in type_decl.methods:
                 method_json = {
                     "name": method.name,
@@ -116,6 +132,12 @@ def enhancedtree_to_json(tree: javalang.tree.CompilationUnit) -> Dict[str, Any]:
                     "position": get_position(method)
                 }
 
+                if extractor == "visitor":
+                    collected = visit_method(method, field_names, with_position=True, get_position=get_position)
+                    add_visitor_results(method_json, collected, VISITOR_KEYS)
+                    methods.append(method_json)
+                    continue
+
                 # Method Invocations
                 invocations = []
                 for _, node in method.filter(javalang.tree.MethodInvocation):
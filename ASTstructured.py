@@ -1,9 +1,15 @@
 import javalang
 import json
 from typing import Dict, Any, List
+from ast_visitor import visit_method, add_visitor_results
 
+# "filter": one method.filter(...) walk per node type (original output)
+# "visitor": single-pass MethodBodyVisitor, also adds returns/loops/try_catch/throws/field accesses
+DEFAULT_EXTRACTOR = "filter"
+VISITOR_KEYS = ("invocations", "conditionals", "returns", "loops", "try_catch", "throws_statements", "field_accesses")
 
-def tree_to_json(tree: javalang.tree.CompilationUnit) -> Dict[str, Any]:
+
+def tree_to_json(tree: javalang.tree.CompilationUnit, extractor: str = DEFAULT_EXTRACTOR) -> Dict[str, Any]:
     def extract_type(t):
         return t.name if hasattr(t, 'name') else str(t)
 
@@ -47,6 +53,7 @@ def tree_to_json(tree: javalang.tree.CompilationUnit) -> Dict[str, Any]:
 
             # Methods
             methods = []
+            field_names = [f["name"] for f in fields]
             for method in type_decl.methods:
                 method_json = {
                     "name": method.name,
@@ -58,6 +65,11 @@ def tree_to_json(tree: javalang.tree.CompilationUnit) -> Dict[str, Any]:
                     ]
                 }
 
+                if extractor == "visitor":
+                    add_visitor_results(method_json, visit_method(method, field_names), VISITOR_KEYS)
+                    methods.append(method_json)
+                    continue
+
                 # Method Invocations
                 invocations = []
                 for _, node in method.filter(javalang.tree.MethodInvocation):
@@ -1,12 +1,36 @@
 import os
-from AutomateRag import GenerateTest
-from AutomatewithoutRag import GenerateTestWithoutRag
+from AutomatewithoutRag import GenerateTestWithoutRag, prepare_without_rag, generate_for_job
 from cleanupcode import clean_java_code
 from discover_Projects import discover_maven_projects
 from fix_imports import simple_fix_imports
+from java_parse_service import parse_java
 import javalang
 import re
 import json
+import threading
+import time
+from run_journal import RunJournal
+from project_test_index import generated_under, mark_generated
+from pipeline_scheduler import (
+    PipelineScheduler,
+    print_summary,
+    DEFAULT_LLM_CONCURRENCY,
+    DEFAULT_PREPARE_WORKERS,
+    DEFAULT_QUEUE_SIZE,
+)
+
+# Set True to run all projects through the bounded concurrent pipeline
+USE_SCHEDULER = False
+# Send generation to a running generation_daemon.py (warm models/index) instead of generating in-process
+USE_DAEMON = False
+DAEMON_URL = "http://127.0.0.1:8765"
+# "norag" (AutomatewithoutRag) or "rag" (AutomateRagOPT: KB + the project's own src/test/java as context)
+GENERATION_MODE = "norag"
+_daemon_client = None
+LLM_CONCURRENCY = DEFAULT_LLM_CONCURRENCY
+# Append-only per-file journal; a restarted run skips every file already completed in it
+JOURNAL_PATH = "runJournal_MavenJavaProjectsFromGithub_deepseek_AST.jsonl"
+journal = None
 
 results = {
         "Processed_files": 0,
@@ -16,6 +40,43 @@ results = {
         "ProjectCount":0,
         "lastProject":{}
     }
+_results_lock = threading.Lock()
+
+
+def GenerateTest(sourceCode):
+    """RAG generation. AutomateRag (langchain, embeddings, torch) is only imported once this is called."""
+    from AutomateRag import GenerateTest as generate_with_rag
+    return generate_with_rag(sourceCode)
+
+
+def generate_test_code(java_code, test_root=None):
+    """
+    (test_code, package, imports) in GENERATION_MODE, from the generation daemon when USE_DAEMON,
+    else in-process. test_root: the project's src/test/java, mined for examples in "rag" mode.
+    """
+    global _daemon_client
+    if USE_DAEMON:
+        if _daemon_client is None:
+            from generation_daemon import DaemonClient
+            _daemon_client = DaemonClient(DAEMON_URL)
+        # the daemon has its own exclusion set: pass the tests this run already wrote under test_root
+        generated = generated_under(test_root) if GENERATION_MODE == "rag" and test_root else None
+        return _daemon_client.generate(java_code, mode=GENERATION_MODE, test_root=test_root, generated=generated)
+    if GENERATION_MODE == "rag":
+        from AutomateRagOPT import GenerateTestOPT
+        return GenerateTestOPT(java_code, test_root=test_root)
+    return GenerateTestWithoutRag(java_code)
+
+
+def project_test_root(src_path):
+    """<module>/src/test/java for a source root inside <module>/src/main/java, else None."""
+    path = os.path.normpath(os.path.abspath(src_path))
+    marker = os.sep + os.path.join("src", "main", "java")
+    index = path.rfind(marker)
+    end = index + len(marker)
+    if index < 0 or (end < len(path) and path[end] != os.sep):
+        return None
+    return path[:index] + os.sep + os.path.join("src", "test", "java")
 
 # def has_public_class(java_code: str) -> bool:
 #     try:
@@ -30,7 +91,8 @@ results = {
 
 def has_interface_or_enum(java_code: str) -> bool:
     try:
-        tree = javalang.parse.parse(java_code)
+        # parsed once and cached; the generator reuses the same CompilationUnit
+        tree = parse_java(java_code)
         for type_decl in tree.types:
             # Check if it's an interface
             if isinstance(type_decl, javalang.tree.InterfaceDeclaration):
@@ -43,65 +105,195 @@ def has_interface_or_enum(java_code: str) -> bool:
         return False
     
 
-def collect_java_files(src_path, output_dir):
-    
+def iter_java_files(src_path, output_dir):
+    test_root = project_test_root(src_path)
     for root, dirs, files in os.walk(src_path):
         for file in files:
             if file.endswith('.java'):
-                print(f"Processing {file} in {root}")
-                abs_path = os.path.join(root, file)
-                rel_path = os.path.relpath(abs_path, src_path)
-                try:
-                    with open(abs_path, 'r', encoding='utf-8') as java_file:
-                        java_code = java_file.read()
-                    if has_interface_or_enum(java_code):
-                        print(f"Skipping {file} — no public class found.")
-                        continue
-                    results["Processed_files"] += 1
-                    test_code, package, imports = GenerateTestWithoutRag(str(java_code))
-                    cleaned_test_code = clean_java_code(test_code)
-                    import_fixed_test_code = simple_fix_imports(
-                        cleaned_test_code,
-                        package,
-                        imports,
-                        os.path.splitext(file)[0]  )
-                    
-                    # Prepare output path
-                    match = re.search(r'public\s+class\s+([A-Za-z_]\w*)', import_fixed_test_code)
-                    if match:
-                        test_class_name = match.group(1)
-                        test_file_name = test_class_name + ".java"
-                    else:
-                        match2 = re.search(r'\bclass\s+([A-Za-z_]\w*)', import_fixed_test_code)
-
-                        if match2:
-                            test_class_name = match2.group(1)
-                            test_file_name = test_class_name + ".java"
-                        else:
-                            test_file_name = os.path.splitext(os.path.basename(file))[0] + "Test.java"
-
-                    # convert package (com.example.demo) -> path (com/example/demo)
-                    if package:
-                        test_file_rel_dir = package.replace(".", os.sep)
-                    else:
-                        test_file_rel_dir = ""
-
-                    # combine output_dir with package path
-                    test_file_dir = os.path.join(output_dir, test_file_rel_dir)
-                    os.makedirs(test_file_dir, exist_ok=True)
-
-                    # final test file path
-                    test_file_path = os.path.join(test_file_dir, test_file_name)
-                    results["generated_tests_classes"] += 1
-                    with open(test_file_path, 'w', encoding='utf-8') as out:
-                        out.write(import_fixed_test_code)
-                except Exception as e:
-                    print(f"Error processing {abs_path}: {e}")
-                    results["Error_Count"] += 1
-                    results["errors"].append({
-                        "file": abs_path,
-                        "error": str(e)
-                    })
+                yield {
+                    "abs_path": os.path.join(root, file),
+                    "file": file,
+                    "src_path": src_path,
+                    "output_dir": output_dir,
+                    "test_root": test_root
+                }
+
+
+def record_error(abs_path, e):
+    print(f"Error processing {abs_path}: {e}")
+    with _results_lock:
+        results["Error_Count"] += 1
+        results["errors"].append({
+            "file": abs_path,
+            "error": str(e)
+        })
+
+
+def journal_record(item, status, output=None, timings=None, error=None):
+    if journal is None:
+        return
+    journal.record(item["abs_path"], status, output=output, project=item.get("src_path"),
+                   output_dir=item.get("output_dir"), timings=timings, error=error)
+
+
+def is_already_done(item):
+    return journal is not None and journal.is_done(item["abs_path"])
+
+
+def save_generated_test(test_code, package, imports, file, output_dir):
+    cleaned_test_code = clean_java_code(test_code)
+    import_fixed_test_code = simple_fix_imports(
+        cleaned_test_code,
+        package,
+        imports,
+        os.path.splitext(file)[0]  )
+
+    # Prepare output path
+    match = re.search(r'public\s+class\s+([A-Za-z_]\w*)', import_fixed_test_code)
+    if match:
+        test_class_name = match.group(1)
+        test_file_name = test_class_name + ".java"
+    else:
+        match2 = re.search(r'\bclass\s+([A-Za-z_]\w*)', import_fixed_test_code)
+
+        if match2:
+            test_class_name = match2.group(1)
+            test_file_name = test_class_name + ".java"
+        else:
+            test_file_name = os.path.splitext(os.path.basename(file))[0] + "Test.java"
+
+    # convert package (com.example.demo) -> path (com/example/demo)
+    if package:
+        test_file_rel_dir = package.replace(".", os.sep)
+    else:
+        test_file_rel_dir = ""
+
+    # combine output_dir with package path
+    test_file_dir = os.path.join(output_dir, test_file_rel_dir)
+    os.makedirs(test_file_dir, exist_ok=True)
+
+    # final test file path
+    test_file_path = os.path.join(test_file_dir, test_file_name)
+    with _results_lock:
+        results["generated_tests_classes"] += 1
+    with open(test_file_path, 'w', encoding='utf-8') as out:
+        out.write(import_fixed_test_code)
+    # our own output lands in src/test/java; keep it out of the project test index
+    mark_generated([test_file_path])
+    return test_file_path
+
+
+def collect_java_files(src_path, output_dir):
+
+    for item in iter_java_files(src_path, output_dir):
+        file = item["file"]
+        abs_path = item["abs_path"]
+        if is_already_done(item):
+            print(f"Skipping {file} — already completed in run journal.")
+            continue
+        print(f"Processing {file} in {os.path.dirname(abs_path)}")
+        timings = {}
+        try:
+            with open(abs_path, 'r', encoding='utf-8') as java_file:
+                java_code = java_file.read()
+            if has_interface_or_enum(java_code):
+                print(f"Skipping {file} — no public class found.")
+                journal_record(item, "skipped")
+                continue
+            results["Processed_files"] += 1
+            start = time.perf_counter()
+            test_code, package, imports = generate_test_code(str(java_code), item["test_root"])
+            timings["generate"] = time.perf_counter() - start
+            start = time.perf_counter()
+            test_file_path = save_generated_test(test_code, package, imports, file, output_dir)
+            timings["finalize"] = time.perf_counter() - start
+            journal_record(item, "generated", output=test_file_path, timings=timings)
+        except Exception as e:
+            record_error(abs_path, e)
+            journal_record(item, "error", timings=timings, error=str(e) or type(e).__name__)
+
+
+# -----------------------
+# Concurrent pipeline stages (see pipeline_scheduler.py)
+# -----------------------
+def prepare_java_file(item):
+    """
+    Read + filter, and parse + prompt when the no-RAG generation runs in-process (otherwise the
+    generate stage hands the source to generate_test_code). Returns None for files that are skipped.
+    """
+    start = time.perf_counter()
+    with open(item["abs_path"], 'r', encoding='utf-8') as java_file:
+        java_code = java_file.read()
+    if has_interface_or_enum(java_code):
+        print(f"Skipping {item['file']} — no public class found.")
+        journal_record(item, "skipped")
+        return None
+    with _results_lock:
+        results["Processed_files"] += 1
+    job = dict(item)
+    if USE_DAEMON or GENERATION_MODE != "norag":
+        job["source"] = java_code
+    else:
+        job.update(prepare_without_rag(java_code))
+    job["timings"] = {"prepare": time.perf_counter() - start}
+    return job
+
+
+def generate_java_test(job):
+    print(f"Generating test for {job['file']}")
+    start = time.perf_counter()
+    if "source" in job:
+        response, job["package"], job["imports"] = generate_test_code(job["source"], job["test_root"])
+    else:
+        response = generate_for_job(job)
+    job["timings"]["generate"] = time.perf_counter() - start
+    return response
+
+
+def finalize_java_test(job, test_code):
+    start = time.perf_counter()
+    test_file_path = save_generated_test(test_code, job["package"], job["imports"], job["file"], job["output_dir"])
+    job["timings"]["finalize"] = time.perf_counter() - start
+    journal_record(job, "generated", output=test_file_path, timings=job["timings"])
+    return test_file_path
+
+
+def on_stage_error(job, e):
+    record_error(job.get("abs_path"), e)
+    journal_record(job, "error", timings=job.get("timings"), error=str(e) or type(e).__name__)
+
+
+def run_projects_concurrently(projects, llm_concurrency=DEFAULT_LLM_CONCURRENCY,
+                              prepare_workers=DEFAULT_PREPARE_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+    """
+    Run the parse -> prompt -> LLM -> clean -> import-fix stages as one bounded pipeline
+    across all files of all projects. Returns the scheduler summary.
+    """
+    def items():
+        for project in projects:
+            print(f"\n=== Queueing project: {project['src_path']} ===")
+            for item in iter_java_files(project["src_path"], project["output_dir"]):
+                if not is_already_done(item):
+                    yield item
+            with _results_lock:
+                results["ProjectCount"] += 1
+                results["lastProject"] = {
+                    "srcpath": project["src_path"],
+                    "output": project["output_dir"]
+                }
+
+    scheduler = PipelineScheduler(
+        prepare=prepare_java_file,
+        generate=generate_java_test,
+        finalize=finalize_java_test,
+        on_error=on_stage_error,
+        llm_concurrency=llm_concurrency,
+        prepare_workers=prepare_workers,
+        queue_size=queue_size
+    )
+    summary = scheduler.run(items())
+    print_summary(summary)
+    return summary
 
 # if __name__ == "__main__":
 #     src_path = r"f:\Thesis_SELAB_PMT\Projects\bank-application\src\com\youtube\bank"
@@ -123,6 +315,7 @@ if __name__ == "__main__":
     root = r"F:\MavenJavaProjectsFromGithub_deepseek_AST"  
     projects = discover_maven_projects(root, json_out="projects_list_For_src_MavenJavaProjectsFromGithub_deepseek_AST.json", require_test_dir=True)
     ################Use this for reRun#########################
+    # Not needed anymore: completed files are skipped via the run journal (JOURNAL_PATH)
     # srcpath="F:\\Thesis_SELAB_PMT\\PROJECTS_ALL - Maven - CodeLLama_AST_Run2\\tutorials\\jackson-modules\\jackson-conversions-2\\src\\main\\java"
     # srcpath="F:\\Thesis_SELAB_PMT\\PROJECTS_ALL - Maven - CodeLLama_AST_Run2\\tutorials\\spring-cloud-modules\\spring-cloud-archaius\\spring-cloud-archaius-additionalsources\\src\\main\\java\\com\\baeldung\\spring\\cloud\\archaius\\additionalsources\\AdditionalSourcesSimpleApplication.java"
     # srcpath="F:\\Thesis_SELAB_PMT\\java_project - Copy_Codellama\\commons-math\\commons-math-core\\src\\main\\java"
@@ -139,7 +332,18 @@ if __name__ == "__main__":
     # projects = projects[start_index:]
     totalporject=len(projects)
     print(totalporject)
+    journal = RunJournal(JOURNAL_PATH)
+    results.update(journal.summary())
+    mark_generated(journal.outputs())
+    print(f"Resuming from journal: {results['Processed_files']} files already processed")
     # 🔹 Run collection for each project
+    if USE_SCHEDULER:
+        summary = run_projects_concurrently(projects[:401], llm_concurrency=LLM_CONCURRENCY)
+        results.update(journal.summary())
+        results["scheduler"] = summary
+        with open("recordsData_MavenJavaProjectsFromGithub_deepseek_AST.json", "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+        exit(0)
     currentrun=0
     for project in projects: 
         if(currentrun>400):
@@ -147,11 +351,7 @@ if __name__ == "__main__":
         print(f"\n=== Processing project: {project['src_path']} ===")
         collect_java_files(project["src_path"], project["output_dir"])
         print(f"✅ Processed. Test files written to {project['output_dir']}")
-        results["ProjectCount"] +=1
-        results["lastProject"] = {
-            "srcpath": project["src_path"],
-            "output": project["output_dir"]
-        }
+        results.update(journal.summary())
         print(f"\n=== Remaining: {totalporject-results["ProjectCount"]} ===")
         with open("recordsData_MavenJavaProjectsFromGithub_deepseek_AST.json", "w", encoding="utf-8") as f:
             json.dump(results, f, indent=4, ensure_ascii=False)
@@ -7,11 +7,13 @@ from langchain.vectorstores import FAISS
 from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.schema import Document
 from langchain.chains import RetrievalQA
-from langchain_community.llms import Ollama
+from llm_backend import BackendLLM
 from ASTstructured import tree_to_json
 import javalang
 import json
 from Data import *
+from generation_cache import get_generation_cache, make_cache_key
+from java_parse_service import get_ast_json
 
 # Configs
 KB_FOLDER = "junit_kb"
@@ -19,6 +21,9 @@ SPLIT_CACHE = "kb_splits.json"
 FAISS_INDEX_PATH = "kb_faiss_index"
 CHUNK_SIZE = 800
 CHUNK_OVERLAP = 100
+OLLAMA_MODEL = "codellama"
+OLLAMA_TEMPERATURE = 0.2
+USE_GENERATION_CACHE = True
 
 def hash_knowledge_base(folder_path):
     hasher = hashlib.md5()
@@ -83,7 +88,7 @@ def embed_documents(splits, force_rebuild=False):
     return vectorstore
 
 def get_ollama_llm():
-    return Ollama(model="codellama", temperature=0.2)
+    return BackendLLM(model=OLLAMA_MODEL, temperature=OLLAMA_TEMPERATURE)
 
 def create_rag_pipeline(force_rebuild=False, retriever_k=4, search_type="similarity"):
     print("Loading knowledge base...")
@@ -107,19 +112,7 @@ def create_rag_pipeline(force_rebuild=False, retriever_k=4, search_type="similar
 
 
 
-def GenerateTest(sourceCode):
-    rag_chain = create_rag_pipeline(force_rebuild=False, retriever_k=4)
-
-# java_method = """
-
-# """
-
-    tree = javalang.parse.parse(sourceCode)
-    json_tree = tree_to_json(tree)
-    json_tree_str = json.dumps(json_tree)
-    print ("JSON tree structure:\n", json_tree_str)
-
-    prompt = f"""	
+PROMPT_TEMPLATE = """	
 You are a Java testing assistant.
 Below is a JSON array of method‐metadata for the class under test. Your task is to generate a complete, idiomatic JUnit 5 unit test class for each following Java method:
 ```json
@@ -141,7 +134,33 @@ Stub its behavior (when(mock.member(args)).thenReturn(...) for non-void; doNothi
 - Return only a complete Java test class, no explanation.
 - Return Only Code in Response, no other text.
 """
-    response = rag_chain.run(prompt)
+
+
+def GenerateTest(sourceCode):
+    rag_chain = create_rag_pipeline(force_rebuild=False, retriever_k=4)
+
+# java_method = """
+
+# """
+
+    json_tree = get_ast_json(sourceCode)
+    json_tree_str = json.dumps(json_tree)
+    print ("JSON tree structure:\n", json_tree_str)
+
+    prompt = PROMPT_TEMPLATE.format(json_tree_str=json_tree_str)
+
+    # Retrieve once; the retrieved context is part of the generation cache key
+    docs = rag_chain.retriever.get_relevant_documents(prompt)
+    context = "\n\n".join(doc.page_content for doc in docs)
+    cache_key = make_cache_key(json_tree, PROMPT_TEMPLATE, OLLAMA_MODEL, OLLAMA_TEMPERATURE, context)
+    cached = get_generation_cache().get(cache_key) if USE_GENERATION_CACHE else None
+    if cached is not None:
+        print("Generation cache hit, skipping Ollama.")
+        return cached[0]
+
+    response = rag_chain.combine_documents_chain.run(input_documents=docs, question=prompt)
+    if USE_GENERATION_CACHE:
+        get_generation_cache().put(cache_key, response, json_tree['package'], json_tree['imports'])
 # print("Generated JUnit test cases:\n", response)
     print("Generated JUnit test cases successfully. Now saving to file...")
 # Save the generated test cases to a Test.java file
@@ -1,48 +1,93 @@
-import logging
-import transformers
-
-logging.basicConfig(level=logging.INFO)
-transformers.utils.logging.set_verbosity_info()
+# Annotations stay strings, so FAISS / Document / RetrievalQA need not be imported up front
+from __future__ import annotations
 
+import logging
 import os
 import json
 import hashlib
 import threading
-from typing import List, Optional
-import javalang
-
-# from langchain.document_loaders import TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-# from langchain.vectorstores import FAISS
-# from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.schema import Document
-from langchain.chains import RetrievalQA
-from langchain_community.llms import Ollama
-from langchain_community.document_loaders import TextLoader
-from langchain_community.vectorstores import FAISS
-# from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.embeddings import HuggingFaceEmbeddings
-
-from ASTstructured import tree_to_json
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
 from Data import *  # preserve your project imports if used elsewhere
+from generation_cache import get_generation_cache, make_cache_key
+from java_parse_service import get_ast_json
+from ast_compact import encode_ast_for_prompt
+from kb_manifest import (scan_kb_files, chunk_ids, new_manifest, load_manifest, save_manifest,
+                         diff_manifest)
+
+# langchain, FAISS, numpy and the embedding model (torch) are imported inside the functions
+# that use them: importing this module is cheap, the first create_rag_pipeline() pays for them
+if TYPE_CHECKING:
+    from langchain.schema import Document
+    from langchain.chains import RetrievalQA
+    from langchain_community.vectorstores import FAISS
+    from cached_retriever import CachedRetriever
+    from hybrid_retriever import BM25Index
+    from split_store import SplitStoreDocstore
 
 # -----------------------
 # Configs (tune if needed)
 # -----------------------
 KB_FOLDER = "junit_kb"
-SPLIT_CACHE = "kb_splits.json"
+SPLIT_CACHE = "kb_splits"  # binary split store: kb_splits.data + kb_splits.idx
 FAISS_INDEX_PATH = "kb_faiss_index"
 FAISS_META_PATH = FAISS_INDEX_PATH + ".meta.json"
+KB_MANIFEST_PATH = FAISS_INDEX_PATH + ".manifest.json"
+# Chunk texts for FAISS hits live here (mmapped); index.pkl only references the path
+KB_DOCSTORE_PATH = os.path.join(FAISS_INDEX_PATH, "docstore")
+# full rebuilds write their docstore here and swap it in only once the new index is saved
+KB_DOCSTORE_BUILD_PATH = KB_DOCSTORE_PATH + ".building"
+# Re-embed only the KB files whose content changed (False = old all-or-nothing rebuild)
+INCREMENTAL_KB = True
+# Worker processes sharing the KB rewrite it one at a time under this lock file (see file_lock.py)
+KB_LOCK_PATH = FAISS_INDEX_PATH + ".lock"
+KB_LOCK_STALE_SECONDS = 6 * 3600  # dead owners are detected by pid on POSIX; this bounds a crashed one elsewhere
 
 # You can increase chunk size to reduce vector count for code/text KBs
 CHUNK_SIZE = 1200
 CHUNK_OVERLAP = 50
 
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# FAISS index: "flat" (exact), "ivf_flat", "ivf_pq" or "hnsw" for large KBs (see scripts/bench_faiss_index.py)
+FAISS_INDEX_TYPE = "flat"
+FAISS_NLIST = None          # IVF lists; None = ~4*sqrt(chunks)
+FAISS_PQ_M = 16             # IVF-PQ sub-quantizers
+FAISS_HNSW_M = 32
+FAISS_TRAIN_SAMPLE = 20000
+FAISS_NPROBE = 8            # query time, no rebuild needed
+FAISS_EF_SEARCH = 64        # query time, no rebuild needed
+# Persist as index.faiss + index_ids.npy (no pickle) and memory-map them read-only on load,
+# so several worker processes share one copy through the page cache
+MMAP_INDEX = True
 OLLAMA_MODEL = "codellama"
+OLLAMA_TEMPERATURE = 0.2
 DEFAULT_RETRIEVER_K = 2
 DEFAULT_SEARCH_TYPE = "similarity"
 DEFAULT_CHAIN_TYPE = "stuff"  # keep same chain_type as your original if desired
+USE_GENERATION_CACHE = True
+# Compact AST encoding (short keys, deduplicated types, private members dropped)
+COMPACT_AST = False
+AST_TOKEN_BUDGET = 3000     # estimated tokens (ast_compact.count_tokens; no Ollama tokenizer)
+# Memoize retrieval by normalized query; optionally retrieve on the class signature instead of the full prompt
+CACHE_RETRIEVAL = True
+SIGNATURE_QUERY = False
+# INFO logging from transformers while the embedding model loads (download progress etc.)
+VERBOSE_MODEL_LOADING = True
+# Fuse FAISS with a BM25 index over identifier tokens (Mockito.when, @ParameterizedTest, ...);
+# DENSE_K / SPARSE_K candidates per side, retriever_k after reciprocal rank fusion
+HYBRID_RETRIEVAL = True
+# BM25 postings saved next to the index; the KB sync updates them by chunk id
+KB_BM25_PATH = os.path.join(FAISS_INDEX_PATH, "bm25.json")
+DENSE_K = 4
+SPARSE_K = 4
+RRF_K = 60
+# Add the target project's own tests (same / neighbouring classes) to the retrieved context
+PROJECT_TEST_CONTEXT = True
+PROJECT_TEST_K = 2
+# Split large classes by methods and generate one test class per batch concurrently (chunked_generation.py)
+CHUNKED_GENERATION = False
+CHUNK_TOKEN_BUDGET = 1500   # estimated tokens, like AST_TOKEN_BUDGET
+CHUNK_WORKERS = 3
 
 # -----------------------
 # Global singletons + lock
@@ -54,6 +99,10 @@ _EMBEDDINGS = None
 _VECTORSTORE: Optional[FAISS] = None
 _RAG_CHAIN: Optional[RetrievalQA] = None
 _OLLAMA_LLM = None
+_RETRIEVER: Optional[CachedRetriever] = None
+_RETRIEVER_KEY = None
+_BM25: Optional[BM25Index] = None
+_BM25_KEY = None
 
 # -----------------------
 # Helpers: KB hashing & load
@@ -82,6 +131,8 @@ def hash_knowledge_base(folder_path: str = KB_FOLDER) -> str:
 
 
 def load_knowledge_base(folder_path: str = KB_FOLDER) -> List[Document]:
+    from langchain.schema import Document
+
     docs = []
     if not os.path.exists(folder_path):
         return docs
@@ -97,26 +148,28 @@ def load_knowledge_base(folder_path: str = KB_FOLDER) -> List[Document]:
 # Split cache handling
 # -----------------------
 def load_splits_from_cache(kb_hash: str):
-    if not os.path.exists(SPLIT_CACHE):
+    """Memory-mapped split store; Documents are only built when iterated."""
+    from split_store import SplitStore
+
+    if not os.path.exists(SPLIT_CACHE + ".idx"):
         return None
     try:
-        with open(SPLIT_CACHE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if data.get("hash") != kb_hash:
+        store = SplitStore(SPLIT_CACHE)
+        if store.tag != kb_hash:
+            store.close()
             return None
-        return [Document(page_content=item["content"], metadata=item["metadata"]) for item in data.get("splits", [])]
+        return store
     except Exception:
         return None
 
 
 def save_splits_to_cache(splits: List[Document], kb_hash: str):
-    data = {
-        "hash": kb_hash,
-        "splits": [{"content": doc.page_content, "metadata": doc.metadata} for doc in splits]
-    }
+    from split_store import SplitStore
+
+    if isinstance(_SPLITS, SplitStore):
+        _SPLITS.close()  # release the old mapping before the files are replaced
     try:
-        with open(SPLIT_CACHE, "w", encoding="utf-8") as f:
-            json.dump(data, f)
+        SplitStore.create(SPLIT_CACHE, splits, tag=kb_hash).close()
     except Exception:
         pass
 
@@ -129,6 +182,8 @@ def split_docs(documents: List[Document], kb_hash: str, force_rebuild: bool = Fa
             _SPLITS = cached
             return cached
 
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
     splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
     splits = splitter.split_documents(documents)
     save_splits_to_cache(splits, kb_hash)
@@ -140,32 +195,133 @@ def split_docs(documents: List[Document], kb_hash: str, force_rebuild: bool = Fa
 # Embeddings & FAISS management
 # -----------------------
 def get_embedding_obj():
+    """Batched sentence-transformers embeddings with a persistent per-text cache (same vectors as HuggingFaceEmbeddings)."""
     print("Initializing HuggingFace embeddings...")
     global _EMBEDDINGS
     if _EMBEDDINGS is None:
-        _EMBEDDINGS = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+        if VERBOSE_MODEL_LOADING:
+            logging.basicConfig(level=logging.INFO)
+            try:
+                import transformers
+                transformers.utils.logging.set_verbosity_info()
+            except ImportError:
+                pass
+        from embedding_service import get_embedding_service
+        _EMBEDDINGS = get_embedding_service(EMBEDDING_MODEL)
     return _EMBEDDINGS
 
 
+def faiss_index_config() -> dict:
+    """Index structure settings; changing any of them rebuilds the index."""
+    return {"index_type": FAISS_INDEX_TYPE, "nlist": FAISS_NLIST, "pq_m": FAISS_PQ_M, "hnsw_m": FAISS_HNSW_M}
+
+
 def faiss_meta_matches(kb_hash: str) -> bool:
     if not os.path.exists(FAISS_INDEX_PATH) or not os.path.exists(FAISS_META_PATH):
         return False
     try:
         with open(FAISS_META_PATH, "r", encoding="utf-8") as f:
             meta = json.load(f)
-        return meta.get("hash") == kb_hash
+        return meta.get("hash") == kb_hash and meta.get("index") == faiss_index_config()
     except Exception:
         return False
 
 
 def save_faiss_meta(kb_hash: str):
+    meta = {"hash": kb_hash, "index": faiss_index_config(), "nprobe": FAISS_NPROBE, "ef_search": FAISS_EF_SEARCH}
     try:
         with open(FAISS_META_PATH, "w", encoding="utf-8") as f:
-            json.dump({"hash": kb_hash}, f)
+            json.dump(meta, f)
     except Exception:
         pass
 
 
+def load_vectorstore(embeddings, writable: bool = False) -> FAISS:
+    """
+    Persisted vectorstore. Read-only loads memory-map the index, id map and docstore;
+    only the KB sync asks for a writable copy, and only when the KB actually changed.
+    """
+    from langchain_community.vectorstores import FAISS
+    from faiss_indexes import set_search_params
+    from faiss_store import has_saved_index, load_index
+    from split_store import SplitStoreDocstore
+
+    if MMAP_INDEX and has_saved_index(FAISS_INDEX_PATH):
+        index, index_to_docstore_id = load_index(FAISS_INDEX_PATH, writable=writable)
+        vectorstore = FAISS(embeddings, index, SplitStoreDocstore(KB_DOCSTORE_PATH), index_to_docstore_id)
+    else:
+        # indexes saved before MMAP_INDEX (pickled docstore + ids)
+        vectorstore = FAISS.load_local(FAISS_INDEX_PATH, embeddings, allow_dangerous_deserialization=True)
+    set_search_params(vectorstore.index, FAISS_NPROBE, FAISS_EF_SEARCH)
+    return vectorstore
+
+
+def save_vectorstore(vectorstore: FAISS):
+    from faiss_store import save_index
+    from split_store import SplitStoreDocstore
+
+    docstore = vectorstore.docstore
+    rebuilt = isinstance(docstore, SplitStoreDocstore) and docstore.path != KB_DOCSTORE_PATH
+    if rebuilt and os.path.exists(FAISS_META_PATH):
+        # the persisted pair is about to be replaced: without meta it is never loaded half-swapped
+        os.remove(FAISS_META_PATH)
+    if isinstance(docstore, SplitStoreDocstore):
+        docstore.commit()  # id table for the chunks added since load: the next open just maps it
+    if MMAP_INDEX and isinstance(docstore, SplitStoreDocstore):
+        # the docstore is already on disk; only the index and the id map need writing
+        save_index(FAISS_INDEX_PATH, vectorstore.index, vectorstore.index_to_docstore_id)
+        if rebuilt:
+            install_docstore(docstore)
+    else:
+        if rebuilt:
+            install_docstore(docstore)  # before pickling, so the pickle points at the final path
+        vectorstore.save_local(FAISS_INDEX_PATH)
+
+
+def install_docstore(docstore: SplitStoreDocstore):
+    """Swap a rebuilt docstore into KB_DOCSTORE_PATH, closing the one it replaces."""
+    from split_store import SplitStoreDocstore
+
+    if _VECTORSTORE is not None and _VECTORSTORE.docstore is not docstore \
+            and isinstance(_VECTORSTORE.docstore, SplitStoreDocstore):
+        _VECTORSTORE.docstore.close()
+    docstore.move(KB_DOCSTORE_PATH)
+
+
+def new_docstore() -> SplitStoreDocstore:
+    """
+    Empty on-disk docstore for a FAISS index that is about to be built from scratch. It lives at
+    KB_DOCSTORE_BUILD_PATH until save_vectorstore swaps it in, so the persisted docstore stays intact
+    (and matching its index) if the rebuild dies half-way.
+    """
+    from split_store import SplitStoreDocstore
+
+    if _VECTORSTORE is not None and isinstance(_VECTORSTORE.docstore, SplitStoreDocstore) \
+            and _VECTORSTORE.docstore.path == KB_DOCSTORE_BUILD_PATH:
+        _VECTORSTORE.docstore.close()  # an earlier rebuild whose save failed
+    return SplitStoreDocstore(KB_DOCSTORE_BUILD_PATH, fresh=True)
+
+
+def build_vectorstore(docs: List[Document], embeddings, ids: Optional[List[str]] = None) -> FAISS:
+    """New FAISS vectorstore of FAISS_INDEX_TYPE; IVF quantizers are trained on a sample of the chunks."""
+    import numpy as np
+    from langchain_community.vectorstores import FAISS
+    from faiss_indexes import build_params, build_index, set_search_params
+
+    docs = list(docs)
+    if FAISS_INDEX_TYPE == "flat":
+        return FAISS.from_documents(docs, embeddings, ids=ids, docstore=new_docstore())
+    texts = [doc.page_content for doc in docs]
+    vectors = np.asarray(embeddings.embed_documents(texts), dtype="float32")
+    params = build_params(FAISS_INDEX_TYPE, len(vectors), vectors.shape[1], FAISS_NLIST, FAISS_PQ_M, FAISS_HNSW_M)
+    print(f"Training {params} on {min(len(vectors), FAISS_TRAIN_SAMPLE)} vectors...")
+    index = build_index(vectors, params, FAISS_TRAIN_SAMPLE)
+    set_search_params(index, FAISS_NPROBE, FAISS_EF_SEARCH)
+    vectorstore = FAISS(embeddings, index, new_docstore(), {})
+    vectorstore.add_embeddings(zip(texts, vectors.tolist()), metadatas=[doc.metadata for doc in docs], ids=ids)
+    return vectorstore
+
+
 def embed_documents(splits: List[Document], kb_hash: str, force_rebuild: bool = False) -> FAISS:
     """
     Return an in-memory FAISS vectorstore. Load persisted index if meta matches, otherwise build.
@@ -183,34 +339,258 @@ def embed_documents(splits: List[Document], kb_hash: str, force_rebuild: bool =
         if not force_rebuild and faiss_meta_matches(kb_hash):
             try:
                 print("Loading persisted FAISS index...")
-                _VECTORSTORE = FAISS.load_local(FAISS_INDEX_PATH, embeddings, allow_dangerous_deserialization=True)
+                _VECTORSTORE = load_vectorstore(embeddings)
                 return _VECTORSTORE
             except Exception:
                 _VECTORSTORE = None  # fallback to rebuild
 
-        print("Creating new FAISS index...")
-        # Build FAISS from splits
-        _VECTORSTORE = FAISS.from_documents(splits, embeddings)
-        try:
-            _VECTORSTORE.save_local(FAISS_INDEX_PATH)
-            save_faiss_meta(kb_hash)
-        except Exception:
-            # best-effort persist
-            pass
+        from file_lock import FileLock
+        with FileLock(KB_LOCK_PATH, KB_LOCK_STALE_SECONDS):
+            if not force_rebuild and faiss_meta_matches(kb_hash):
+                # another worker built it while we waited for the lock
+                try:
+                    print("Loading persisted FAISS index...")
+                    _VECTORSTORE = load_vectorstore(embeddings)
+                    return _VECTORSTORE
+                except Exception:
+                    _VECTORSTORE = None
+
+            print("Creating new FAISS index...")
+            # Build FAISS from splits
+            vectorstore = build_vectorstore(splits, embeddings)
+            try:
+                save_vectorstore(vectorstore)
+                save_faiss_meta(kb_hash)
+            except Exception:
+                # best-effort persist
+                pass
 
+        _VECTORSTORE = vectorstore
         return _VECTORSTORE
 
 
 # -----------------------
-# Ollama LLM (CodeLlama) singleton
+# Incremental KB indexing (per-file manifest)
+# -----------------------
+def kb_index_settings() -> dict:
+    """Anything that changes every chunk/vector; a mismatch with the manifest forces a full rebuild."""
+    from embedding_service import PREPROCESS_VERSION
+    return {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP, "embedding_model": EMBEDDING_MODEL,
+            "embedding_preprocess": PREPROCESS_VERSION, "index": faiss_index_config()}
+
+
+def split_kb_file(filename: str, content_hash: str) -> Tuple[List[Document], List[str]]:
+    from langchain.schema import Document
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    with open(os.path.join(KB_FOLDER, filename), "r", encoding="utf-8") as f:
+        doc = Document(page_content=f.read(), metadata={"source": filename})
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks = splitter.split_documents([doc])
+    return chunks, chunk_ids(filename, content_hash, len(chunks))
+
+
+def apply_kb_delta(manifest: dict, current: Dict[str, str], delta: Dict[str, List[str]]):
+    """Update manifest for delta; returns (chunk ids to delete, new chunks, their ids)."""
+    stale_ids, new_docs, new_ids = [], [], []
+    for filename in delta["removed"] + delta["changed"]:
+        stale_ids.extend(manifest["files"].pop(filename)["ids"])
+    for filename in delta["added"] + delta["changed"]:
+        docs, ids = split_kb_file(filename, current[filename])
+        new_docs.extend(docs)
+        new_ids.extend(ids)
+        manifest["files"][filename] = {"hash": current[filename], "ids": ids}
+    return stale_ids, new_docs, new_ids
+
+
+def sync_knowledge_base(kb_hash: str, force_rebuild: bool = False) -> FAISS:
+    """
+    Bring the FAISS index in line with KB_FOLDER, touching only files whose content changed:
+    chunks of removed/changed files are deleted by id, added/changed files are split and embedded.
+    KB_MANIFEST_PATH maps every KB file to its content hash and chunk ids.
+    Worker processes share the files: one that has to write takes KB_LOCK_PATH and re-reads the
+    manifest under it, so a KB change is applied once and the other workers load the result.
+    """
+    from file_lock import FileLock
+
+    with _cache_lock:
+        if _VECTORSTORE is not None and not force_rebuild and faiss_meta_matches(kb_hash):
+            print("Using cached FAISS vectorstore.")
+            return _VECTORSTORE
+
+        current = scan_kb_files(KB_FOLDER)
+        manifest = None if force_rebuild else load_manifest(KB_MANIFEST_PATH, kb_index_settings())
+        if manifest is not None and not any(diff_manifest(manifest, current).values()) and faiss_meta_matches(kb_hash):
+            return _sync_kb(kb_hash, current, force_rebuild)  # nothing to write: no lock needed
+        with FileLock(KB_LOCK_PATH, KB_LOCK_STALE_SECONDS):
+            return _sync_kb(kb_hash, current, force_rebuild)
+
+
+def _sync_kb(kb_hash: str, current: Dict[str, str], force_rebuild: bool) -> FAISS:
+    """sync_knowledge_base's work; writes only happen under KB_LOCK_PATH."""
+    from faiss_indexes import needs_retrain, supports_remove
+    from split_store import SplitStoreDocstore
+
+    global _VECTORSTORE
+    with _cache_lock:
+        embeddings = get_embedding_obj()
+        manifest = None if force_rebuild else load_manifest(KB_MANIFEST_PATH, kb_index_settings())
+        changed = manifest is None or any(diff_manifest(manifest, current).values())
+        vectorstore = _VECTORSTORE if manifest is not None else None
+        # a changed KB is applied to the files on disk, which another worker may have moved on since we loaded
+        if manifest is not None and (vectorstore is None or changed):
+            if vectorstore is not None and isinstance(vectorstore.docstore, SplitStoreDocstore):
+                vectorstore.docstore.close()
+            try:
+                print("Loading persisted FAISS index...")
+                # an unchanged KB is served from the read-only memory-mapped files
+                vectorstore = load_vectorstore(embeddings, writable=changed)
+            except Exception:
+                manifest = None
+        if manifest is None:
+            print("Creating new FAISS index...")
+            manifest = new_manifest(kb_index_settings())
+            vectorstore = None
+
+        delta = diff_manifest(manifest, current)
+        stale_ids, new_docs, new_ids = apply_kb_delta(manifest, current, delta)
+        rebuild = None
+        if vectorstore is not None and stale_ids and not supports_remove(FAISS_INDEX_TYPE):
+            rebuild = "drop removed chunks"
+        elif vectorstore is not None and needs_retrain(
+                vectorstore.index, len(vectorstore.index_to_docstore_id) - len(stale_ids) + len(new_ids), FAISS_NLIST):
+            rebuild = "retrain IVF lists for the grown KB"
+        if rebuild:
+            # unchanged chunks come straight from the embedding cache
+            print(f"Rebuilding {FAISS_INDEX_TYPE} index to {rebuild}...")
+            manifest = new_manifest(kb_index_settings())
+            vectorstore = None
+            delta = diff_manifest(manifest, current)
+            stale_ids, new_docs, new_ids = apply_kb_delta(manifest, current, delta)
+
+        if stale_ids and vectorstore is not None:
+            vectorstore.delete(stale_ids)
+        rebuilt = vectorstore is None
+        if new_docs:
+            if vectorstore is None:
+                vectorstore = build_vectorstore(new_docs, embeddings, ids=new_ids)
+            else:
+                vectorstore.add_documents(new_docs, ids=new_ids)
+        bm25 = None
+        if HYBRID_RETRIEVAL and vectorstore is not None and (stale_ids or new_ids):
+            bm25 = update_bm25_index(vectorstore, kb_hash, stale_ids, new_docs, new_ids, rebuilt)
+        print(f"KB sync: {len(delta['added'])} added, {len(delta['changed'])} changed, {len(delta['removed'])} removed "
+              f"files; {len(new_ids)} chunks embedded, {len(stale_ids)} deleted")
+
+        if vectorstore is not None and (stale_ids or new_ids or not faiss_meta_matches(kb_hash)):
+            try:
+                save_vectorstore(vectorstore)
+                if bm25 is not None:
+                    bm25.save(KB_BM25_PATH)
+                save_manifest(KB_MANIFEST_PATH, manifest)
+                save_faiss_meta(kb_hash)
+                # tombstoned chunks are unreachable from the saved index now
+                if isinstance(vectorstore.docstore, SplitStoreDocstore):
+                    vectorstore.docstore.store.compact()
+            except Exception:
+                # best-effort persist
+                pass
+        _VECTORSTORE = vectorstore
+        return vectorstore
+
+
+# -----------------------
+# Ollama LLM (CodeLlama) singleton, served through the shared pooled backend
 # -----------------------
 def get_ollama_llm():
     global _OLLAMA_LLM
     if _OLLAMA_LLM is None:
-        _OLLAMA_LLM = Ollama(model=OLLAMA_MODEL, temperature=0.2)
+        from llm_backend import BackendLLM
+        _OLLAMA_LLM = BackendLLM(model=OLLAMA_MODEL, temperature=OLLAMA_TEMPERATURE)
     return _OLLAMA_LLM
 
 
+# -----------------------
+# Retrieval cache
+# -----------------------
+def bm25_matches(bm25: Optional[BM25Index], vectorstore: FAISS) -> bool:
+    """True when `bm25` indexes exactly the chunk ids held by `vectorstore`."""
+    ids = vectorstore.index_to_docstore_id
+    return bm25 is not None and len(bm25) == len(ids) and bm25.positions.keys() == set(ids.values())
+
+
+def get_bm25_index(vectorstore: FAISS, kb_hash: str) -> BM25Index:
+    """
+    BM25 over the chunks held by `vectorstore`: the one saved at KB_BM25_PATH if it covers the same
+    chunks, otherwise built from the docstore (and saved).
+    """
+    from hybrid_retriever import BM25Index, vectorstore_items
+
+    global _BM25, _BM25_KEY
+    key = (id(vectorstore), kb_hash)
+    if _BM25 is None or _BM25_KEY != key:
+        bm25 = _BM25 if bm25_matches(_BM25, vectorstore) else BM25Index.load(KB_BM25_PATH)
+        if not bm25_matches(bm25, vectorstore):
+            bm25 = BM25Index.build(vectorstore_items(vectorstore))
+            print(f"BM25 index built over {len(bm25)} chunks.")
+            try:
+                bm25.save(KB_BM25_PATH)
+            except OSError:
+                pass  # best-effort persist
+        _BM25, _BM25_KEY = bm25, key
+    return _BM25
+
+
+def update_bm25_index(vectorstore: FAISS, kb_hash: str, stale_ids: List[str], new_docs: List[Document],
+                      new_ids: List[str], rebuilt: bool) -> Optional[BM25Index]:
+    """
+    Apply a KB sync to the BM25 index: a fresh one for a rebuilt vectorstore, else the saved one with
+    the stale chunks removed and the new ones added (a copy, so retrievers still searching the
+    previous index are untouched). None if there was nothing to update; get_bm25_index builds it then.
+    """
+    from hybrid_retriever import BM25Index
+
+    global _BM25, _BM25_KEY
+    bm25 = BM25Index() if rebuilt else BM25Index.load(KB_BM25_PATH)
+    if bm25 is None:
+        return None
+    bm25.remove(stale_ids)
+    for doc_id, doc in zip(new_ids, new_docs):
+        bm25.add(doc_id, doc.page_content)
+    if not bm25_matches(bm25, vectorstore):
+        return None  # the saved postings were from another KB state
+    _BM25, _BM25_KEY = bm25, (id(vectorstore), kb_hash)
+    return bm25
+
+
+def get_retriever(vectorstore: FAISS, kb_hash: str, retriever_k: int, search_type: str):
+    """
+    The vectorstore retriever (fused with BM25 when HYBRID_RETRIEVAL), wrapped in a CachedRetriever
+    that lives as long as the index and retriever settings stay the same (a KB change starts a fresh cache).
+    """
+    from cached_retriever import CachedRetriever
+    from hybrid_retriever import HybridRetriever
+
+    global _RETRIEVER, _RETRIEVER_KEY
+    if HYBRID_RETRIEVAL:
+        dense = vectorstore.as_retriever(search_type=search_type, search_kwargs={"k": max(DENSE_K, retriever_k)})
+        base = HybridRetriever(dense=dense, sparse=get_bm25_index(vectorstore, kb_hash), docstore=vectorstore.docstore,
+                               k=retriever_k, sparse_k=SPARSE_K, rrf_k=RRF_K)
+    else:
+        base = vectorstore.as_retriever(search_type=search_type, search_kwargs={"k": retriever_k})
+    if not CACHE_RETRIEVAL:
+        return base
+    key = (id(vectorstore), kb_hash, retriever_k, search_type, HYBRID_RETRIEVAL, DENSE_K, SPARSE_K, RRF_K)
+    if _RETRIEVER is None or _RETRIEVER_KEY != key:
+        _RETRIEVER = CachedRetriever(base=base)
+        _RETRIEVER_KEY = key
+    return _RETRIEVER
+
+
+def retrieval_stats() -> dict:
+    return _RETRIEVER.stats() if _RETRIEVER is not None else {}
+
+
 # -----------------------
 # RAG pipeline creation & caching
 # -----------------------
@@ -220,23 +600,30 @@ def create_rag_pipeline(force_rebuild: bool = False, retriever_k: int = DEFAULT_
     Expensive ops (split/embed/index) are cached and only redone when KB hash changes or force_rebuild=True.
     """
     global _RAG_CHAIN, _KB_HASH, _SPLITS, _VECTORSTORE
+    from langchain.chains import RetrievalQA
 
     with _cache_lock:
         kb_hash = hash_knowledge_base(KB_FOLDER)
-        # If KB hash changed, force rebuild
-        if _KB_HASH != kb_hash:
-            force_rebuild = True
-            _KB_HASH = kb_hash
+        kb_changed = _KB_HASH != kb_hash
+        _KB_HASH = kb_hash
+
+        if INCREMENTAL_KB:
+            # only changed files are re-split and re-embedded
+            vectorstore = sync_knowledge_base(kb_hash, force_rebuild=force_rebuild)
+            force_rebuild = force_rebuild or kb_changed
+        else:
+            # If KB hash changed, force rebuild
+            force_rebuild = force_rebuild or kb_changed
 
-        # Load KB and splits
-        raw_docs = load_knowledge_base()
-        splits = split_docs(raw_docs, kb_hash, force_rebuild=force_rebuild)
+            # Load KB and splits
+            raw_docs = load_knowledge_base()
+            splits = split_docs(raw_docs, kb_hash, force_rebuild=force_rebuild)
 
-        # Embed / FAISS
-        vectorstore = embed_documents(splits, kb_hash, force_rebuild=force_rebuild)
+            # Embed / FAISS
+            vectorstore = embed_documents(splits, kb_hash, force_rebuild=force_rebuild)
 
         # Setup retriever and chain. Always create a new chain if retriever_k changed or chain not set.
-        retriever = vectorstore.as_retriever(search_type=search_type, search_kwargs={"k": retriever_k})
+        retriever = get_retriever(vectorstore, kb_hash, retriever_k, search_type)
         llm = get_ollama_llm()
 
         if _RAG_CHAIN is None or force_rebuild:
@@ -256,28 +643,7 @@ def create_rag_pipeline(force_rebuild: bool = False, retriever_k: int = DEFAULT_
 # -----------------------
 # GenerateTest: optimized
 # -----------------------
-def GenerateTestOPT(sourceCode: str, force_rebuild: bool = False, retriever_k: int = DEFAULT_RETRIEVER_K):
-    """
-    Parse the provided Java source (you said AST is already optimized),
-    prepare a compact prompt "something+json tree", and call the cached RAG chain.
-    Returns: (response_text, package, imports)
-    """
-    print("Generating JUnit tests using optimized RAG pipeline...")
-    # Ensure RAG chain is initialized (cached). If KB changed, create_rag_pipeline will rebuild.
-    rag_chain = create_rag_pipeline(force_rebuild=force_rebuild, retriever_k=retriever_k)
-
-
-    print("Rag chain created. Parsing Java source code...")
-    tree = javalang.parse.parse(sourceCode)
-    json_tree = tree_to_json(tree)
-    json_tree_str = json.dumps(json_tree)
-
-    package = json_tree['package']
-    imports = json_tree['imports']
-    # Compose a small prompt as requested; keep exact structure "something+json tree"
-    print ("JSON tree structure:\n", json_tree_str)
-
-    prompt = f"""	
+PROMPT_TEMPLATE = """	
 You are a Java testing assistant.
 Below is a JSON array of Abstract Syntax Tree for the class under test. Your task is to generate a complete, idiomatic JUnit 5 unit test class for each Public Java method:
 ```
@@ -300,8 +666,78 @@ Stub its behavior (when(mock.member(args)).thenReturn(...) for non-void; doNothi
 - Return Only Code in Response, no other text.
 """
 
-    # Run the RetrievalQA chain (reuses cached retriever & LLM)
-    response = rag_chain.run(prompt)
+
+def render_ast(json_tree):
+    """AST text for the prompt, plus compact stats (None in plain JSON mode)."""
+    if COMPACT_AST:
+        return encode_ast_for_prompt(json_tree, token_budget=AST_TOKEN_BUDGET, baseline_indent=None)
+    return json.dumps(json_tree), None
+
+
+def GenerateTestOPT(sourceCode: str, force_rebuild: bool = False, retriever_k: int = DEFAULT_RETRIEVER_K,
+                    test_root: Optional[str] = None):
+    """
+    Parse the provided Java source (you said AST is already optimized),
+    prepare a compact prompt "something+json tree", and call the cached RAG chain.
+    test_root: the project's src/test/java; its existing tests are mined as extra context.
+    Returns: (response_text, package, imports)
+    """
+    print("Generating JUnit tests using optimized RAG pipeline...")
+    # Ensure RAG chain is initialized (cached). If KB changed, create_rag_pipeline will rebuild.
+    rag_chain = create_rag_pipeline(force_rebuild=force_rebuild, retriever_k=retriever_k)
+
+
+    print("Rag chain created. Parsing Java source code...")
+    json_tree = get_ast_json(sourceCode)
+    template_id = PROMPT_TEMPLATE
+    json_tree_str, ast_stats = render_ast(json_tree)
+    if COMPACT_AST:
+        template_id += f"\ncompact:{AST_TOKEN_BUDGET}"
+        print(f"Compact AST: saved {ast_stats['bytes_saved']} bytes / {ast_stats['tokens_saved']} tokens")
+
+    package = json_tree['package']
+    imports = json_tree['imports']
+    # Compose a small prompt as requested; keep exact structure "something+json tree"
+    print ("JSON tree structure:\n", json_tree_str)
+
+    prompt = PROMPT_TEMPLATE.format(json_tree_str=json_tree_str)
+    batches = [json_tree]
+    if CHUNKED_GENERATION:
+        from chunked_generation import split_class_by_methods
+        template_id += f"\nchunked:{CHUNK_TOKEN_BUDGET}"
+        batches = split_class_by_methods(json_tree, token_budget=CHUNK_TOKEN_BUDGET,
+                                         render=lambda batch: render_ast(batch)[0])
+        if len(batches) > 1:
+            print(f"Large class: generating in {len(batches)} chunks")
+
+    # Retrieve once; the retrieved context is part of the generation cache key
+    from cached_retriever import signature_query
+    query = signature_query(json_tree) if SIGNATURE_QUERY else prompt
+    docs = rag_chain.retriever.get_relevant_documents(query)
+    if PROJECT_TEST_CONTEXT and test_root and os.path.isdir(test_root):
+        from project_test_index import get_project_test_index
+        project_index = get_project_test_index(test_root, get_embedding_obj())
+        docs = docs + project_index.search(json_tree, query, k=PROJECT_TEST_K)
+    context = "\n\n".join(doc.page_content for doc in docs)
+    cache_key = make_cache_key(json_tree, template_id, OLLAMA_MODEL, OLLAMA_TEMPERATURE, context)
+    if USE_GENERATION_CACHE:
+        cached = get_generation_cache().get(cache_key)
+        if cached is not None:
+            print("Generation cache hit, skipping Ollama.")
+            return cached
+
+    # Same as rag_chain.run(prompt), but reusing the documents retrieved above
+    if len(batches) > 1:
+        from chunked_generation import generate_in_chunks
+        # every batch shares the class-level retrieval; only the AST slice in the question differs
+        chunk_prompts = [PROMPT_TEMPLATE.format(json_tree_str=render_ast(batch)[0]) for batch in batches]
+        response = generate_in_chunks(
+            chunk_prompts, lambda question: rag_chain.combine_documents_chain.run(input_documents=docs, question=question),
+            CHUNK_WORKERS)
+    else:
+        response = rag_chain.combine_documents_chain.run(input_documents=docs, question=prompt)
+    if USE_GENERATION_CACHE:
+        get_generation_cache().put(cache_key, response, package, imports)
 
     return response, package, imports
 
@@ -326,6 +762,7 @@ def invalidate_and_rebuild_kb():
 
 # -----------------------
 # Warmup example for long-running service
+# (generation_daemon.py runs this warm-up once and serves jobs over HTTP)
 # -----------------------
 # if __name__ == "__main__":
 #     # Warm up once so subsequent GenerateTest calls are fast
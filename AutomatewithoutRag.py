@@ -1,22 +1,29 @@
 # ...existing code...
-import ollama
-from ASTstructured import tree_to_json
-import javalang
 import json
 from Data import *
+from generation_cache import get_generation_cache, make_cache_key
+from java_parse_service import get_ast_json
+from ast_compact import encode_ast_for_prompt
+from chunked_generation import split_class_by_methods, generate_in_chunks
+from streaming_llm import stream_generate
+from llm_backend import get_llm_backend
 # ...existing code...
 
-# Prepare your Java source code
-
-def GenerateTestWithoutRag(sourceCode):
-    tree = javalang.parse.parse(sourceCode)
-    json_tree = tree_to_json(tree)
-    json_tree_str = json.dumps(json_tree, indent=2)
+OLLAMA_MODEL = "deepseek-coder"
+# OLLAMA_MODEL = "codellama"
+OLLAMA_TEMPERATURE = None  # model default
+USE_GENERATION_CACHE = True
+# Stream the response and abort it once the test class closes (skips trailing explanations)
+STREAM_EARLY_STOP = False
+# Compact AST encoding (short keys, no indentation, private members dropped)
+COMPACT_AST = False
+AST_TOKEN_BUDGET = 3000     # estimated tokens (ast_compact.count_tokens; no Ollama tokenizer)
+# Split classes whose AST is over CHUNK_TOKEN_BUDGET into per-method prompts, generated concurrently and merged
+CHUNKED_GENERATION = False
+CHUNK_TOKEN_BUDGET = 1500   # estimated tokens, like AST_TOKEN_BUDGET
+CHUNK_WORKERS = 3
 
-    package = json_tree['package']
-    imports = json_tree['imports']
-
-    prompt = f"""	
+PROMPT_TEMPLATE = """	
 You are a Java testing assistant.
 Below is the Abstract Syntaxt Tree of a java class. Your task is to generate a complete, idiomatic JUnit 5 unit test class for each Public Java method in the class:
 ```
@@ -35,16 +42,79 @@ Rules:
 - Return only a complete Java test class, no explanation.
 - Return Only Code in Response, no other text.
 """
-# Use only Ollama (no RAG)
-# ...existing code...
 
-# Use only Ollama (no RAG)
-    # response = ollama.generate(model="codellama", prompt=prompt)
-    response = ollama.generate(model="deepseek-coder", prompt=prompt)
-    java_test_code = response['response']
+# Prepare your Java source code
+
+def render_ast(json_tree):
+    """AST text for the prompt, plus compact stats (None in plain JSON mode)."""
+    if COMPACT_AST:
+        return encode_ast_for_prompt(json_tree, token_budget=AST_TOKEN_BUDGET)
+    return json.dumps(json_tree, indent=2), None
+
+
+def prepare_without_rag(sourceCode):
+    """
+    Parse the Java source and build the no-RAG prompt.
+    Returns a job dict: prompt, package, imports, cache_key (+ ast_stats in compact mode,
+    + chunk_prompts when the class is split for chunked generation)
+    """
+    json_tree = get_ast_json(sourceCode)
+    job = {
+        "package": json_tree['package'],
+        "imports": json_tree['imports']
+    }
+    template_id = PROMPT_TEMPLATE
+    json_tree_str, ast_stats = render_ast(json_tree)
+    if COMPACT_AST:
+        template_id += f"\ncompact:{AST_TOKEN_BUDGET}"
+        job["ast_stats"] = ast_stats
+        print(f"Compact AST: saved {ast_stats['bytes_saved']} bytes / {ast_stats['tokens_saved']} tokens")
+
+    job["prompt"] = PROMPT_TEMPLATE.format(json_tree_str=json_tree_str)
+    if CHUNKED_GENERATION:
+        template_id += f"\nchunked:{CHUNK_TOKEN_BUDGET}"
+        # budget measured on the encoding the chunk prompts use (compact or indented JSON)
+        batches = split_class_by_methods(json_tree, token_budget=CHUNK_TOKEN_BUDGET,
+                                         render=lambda batch: render_ast(batch)[0])
+        if len(batches) > 1:
+            job["chunk_prompts"] = [PROMPT_TEMPLATE.format(json_tree_str=render_ast(batch)[0]) for batch in batches]
+            print(f"Large class: generating in {len(batches)} chunks")
+    job["cache_key"] = make_cache_key(json_tree, template_id, OLLAMA_MODEL, OLLAMA_TEMPERATURE)
+    return job
+
+
+def generate_from_prompt(prompt):
+    # Use only Ollama (no RAG)
+    if STREAM_EARLY_STOP:
+        result = stream_generate(OLLAMA_MODEL, prompt)
+        if result["stopped_early"]:
+            print(f"Stopped generation at class close after {result['seconds']}s")
+        return result["response"]
+    return get_llm_backend().generate(OLLAMA_MODEL, prompt, OLLAMA_TEMPERATURE)
+
+
+def generate_for_job(job):
+    """LLM call for a prepared job, answered from the generation cache when possible."""
+    if USE_GENERATION_CACHE:
+        cached = get_generation_cache().get(job["cache_key"])
+        if cached is not None:
+            print("Generation cache hit, skipping Ollama.")
+            return cached[0]
+    if job.get("chunk_prompts"):
+        java_test_code = generate_in_chunks(job["chunk_prompts"], generate_from_prompt, CHUNK_WORKERS)
+    else:
+        java_test_code = generate_from_prompt(job["prompt"])
+    if USE_GENERATION_CACHE:
+        get_generation_cache().put(job["cache_key"], java_test_code, job["package"], job["imports"])
+    return java_test_code
+
+
+def GenerateTestWithoutRag(sourceCode):
+    job = prepare_without_rag(sourceCode)
+    java_test_code = generate_for_job(job)
 
     print("Generated JUnit test cases successfully. Now saving to file...")
-    return java_test_code , package, imports
+    return java_test_code , job["package"], job["imports"]
     # with open("Test4.java", "w", encoding="utf-8") as f:
     #     f.write(java_test_code)
 
@@ -3,7 +3,7 @@ from langchain.schema import Document
 from langchain.vectorstores import FAISS
 from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.llms import Ollama
+from llm_backend import BackendLLM
 from langchain.chains import RetrievalQA
 
 # 1. Load text files into LangChain Documents
@@ -29,7 +29,7 @@ def embed_documents(splits):
 
 # 4. Set up Ollama (CodeLlama)
 def get_ollama_llm():
-    return Ollama(model="codellama", temperature=0.2)
+    return BackendLLM(model="codellama", temperature=0.2)
 
 # 5. Create the RAG QA chain
 def create_rag_pipeline():
@@ -4,6 +4,7 @@ import re
 import os
 import json
 import javalang
+from RunProjectResultGenerator import categorize_error
 
 # ---------------------------
 # 1. Run Maven compile
@@ -64,16 +65,7 @@ def parse_errors(output_lines):
             filepath, row, col, message = match.groups()
             filepath = filepath.strip()
             ErrorCount+=1
-            # categorize
-            if "package" in message and "does not exist" in message:
-                category = "missing_package"
-            elif "cannot find symbol" in message:
-                category = "cannot_find_symbol"
-            elif "not a statement" in message or "expected" in message:
-                category = "syntax_error"
-            else:
-                category = "other"
-
+            category = categorize_error(message)
             error_counts[category] += 1
             errors.append({
                 "file": filepath,
@@ -1,90 +1,143 @@
 import datetime
+import shutil
 import subprocess
+import shlex
+import signal
 import re
 import os
 import json
 import javalang
 import glob
 import xml.etree.ElementTree as ET
+from java_parse_service import parse_java
+
+# ---------------------------
+# Maven settings (MVN_COMMAND env var overrides the executable, e.g. "python scripts/stub_mvn.py")
+# ---------------------------
+MVN_COMMAND = shlex.split(os.environ["MVN_COMMAND"]) if os.environ.get("MVN_COMMAND") else [
+    r"C:\Program Files\Apache\Maven\apache-maven-3.9.10\bin\mvn.cmd"
+]
+MVN_FLAGS = [
+    "-B", "-e",
+    "-Drat.skip=true",
+    "-Dcheckstyle.skip=true",
+    "-Dsurefire.failIfNoSpecifiedTests=false"
+]
+MVN_TIMEOUT = None  # seconds; None waits forever (old behaviour)
+MAX_BUILD_ERRORS = None  # kill a build once it printed more compile errors than this; None = never
+
 
 # ---------------------------
 # 1. Run Maven compile
 # ---------------------------
-def run_maven_command(project_path, goal, log_prefix="compile", log_dir="logs"):
-    os.makedirs(log_dir, exist_ok=True)
+def kill_process_tree(process):
+    """Kill mvn together with its forked JVMs (surefire, compiler daemons)."""
+    try:
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except (OSError, ProcessLookupError):
+        pass
+    try:
+        process.kill()
+    except OSError:
+        pass
+
+
+def run_maven(project_path, goals, log_file, extra_args=None, timeout=MVN_TIMEOUT, env=None, mvn=None,
+              max_errors=MAX_BUILD_ERRORS):
+    """
+    Run `mvn <flags> <goals> <extra_args>` in project_path, streaming its output to a gzip log
+    while compile errors are parsed (see build_log_stream.py).
+    Returns {returncode, timed_out, aborted, seconds, stdout (tail), stderr, log_file, errors,
+    error_counts, modules, ...}; on timeout or past max_errors the whole process tree is killed.
+    """
+    cmd = list(mvn or MVN_COMMAND) + MVN_FLAGS + list(goals) + list(extra_args or [])
+    return run_process(cmd, project_path, log_file, timeout=timeout, env=env, max_errors=max_errors)
+
+
+def run_process(cmd, cwd, log_file, timeout=MVN_TIMEOUT, env=None, max_errors=None):
+    """run_maven for any command (javac, java -jar junit-console ...): same result dict and log format."""
+    from build_log_stream import stream_process
+    return stream_process(cmd, cwd, log_file, timeout=timeout, env=env, max_errors=max_errors)
+
+
+def run_maven_command(project_path, goal, log_prefix="compile", log_dir="logs", extra_args=None, timeout=MVN_TIMEOUT):
+    """
+    Returns (output lines, stderr). The lines are a lazy iterator over the whole log, read only if the
+    caller consumes them; run_maven's "stdout" only keeps the last TAIL_LINES (use run_maven for the parsed errors).
+    """
+    from build_log_stream import iter_log
 
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     log_file = os.path.join(log_dir, f"{log_prefix}_log_{timestamp}.txt")
 
-    cmd = [
-        r"C:\Program Files\Apache\Maven\apache-maven-3.9.10\bin\mvn.cmd",
-        "-B", "-e",
-        "clean", "test-compile",  # separate strings
-        "-Drat.skip=true",
-        "-Dcheckstyle.skip=true",
-        "-Dsurefire.failIfNoSpecifiedTests=false"
-    ]
-
-
     print(f"🔹 Running {goal} in {project_path} ...")
-    process = subprocess.Popen(
-        cmd,
-        cwd=project_path,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True
-    )
-
-    stdout, stderr = process.communicate()
-
-    with open(log_file, "w", encoding="utf-8") as f:
-        f.write("==== STDOUT ====\n")
-        f.write(stdout)
-        f.write("\n==== STDERR ====\n")
-        f.write(stderr or "")
+    result = run_maven(project_path, goal.split(), log_file, extra_args=extra_args, timeout=timeout)
+    if result["timed_out"]:
+        print(f"⏱️ {goal} killed after {timeout}s")
 
-    print(f"📄 Full log saved to {log_file}")
+    print(f"📄 Full log saved to {result['log_file']}")
 
-    return stdout.splitlines(), stderr
+    return iter_log(result["log_file"]), result["stderr"]
 
 # ---------------------------
 # 2. Parse compile errors
 # ---------------------------
-def parse_errors(output_lines):
-    errors = []
-    error_counts = {
+def categorize_error(message):
+    """Error category of a javac message (shared with compile_checker.py)."""
+    if "package" in message and "does not exist" in message:
+        return "missing_package"
+    elif "cannot find symbol" in message:
+        return "cannot_find_symbol"
+    elif "not a statement" in message or "expected" in message:
+        return "syntax_error"
+    return "other"
+
+
+ERROR_PATTERN = re.compile(r"\[ERROR\]\s(.+\.java):\[(\d+),(\d+)\]\s(.+)")
+# plain javac output (direct compiles, see classpath_cache.py): no column, the caret line follows
+JAVAC_ERROR_PATTERN = re.compile(r"^(.+\.java):(\d+): error: (.+)")
+
+
+def new_error_counts():
+    return {
         "missing_package": 0,
         "cannot_find_symbol": 0,
         "syntax_error": 0,
         "other": 0
     }
 
-    pattern = re.compile(r"\[ERROR\]\s(.+\.java):\[(\d+),(\d+)\]\s(.+)")
+
+def parse_error_line(line):
+    """Error dict for one mvn `[ERROR] file:[row,col] msg` or javac `file:line: error: msg` line, else None."""
+    match = ERROR_PATTERN.search(line)
+    if match:
+        filepath, row, col, message = match.groups()
+    else:
+        match = JAVAC_ERROR_PATTERN.match(line)
+        if not match:
+            return None
+        (filepath, row, message), col = match.groups(), 0
+    return {
+        "file": filepath.strip(),
+        "line": int(row),
+        "col": int(col),
+        "message": message,
+        "category": categorize_error(message)
+    }
+
+
+def parse_errors(output_lines):
+    errors = []
+    error_counts = new_error_counts()
 
     for line in output_lines:
-        match = pattern.search(line)
-        if match:
-            filepath, row, col, message = match.groups()
-            filepath = filepath.strip()
-
-            # categorize
-            if "package" in message and "does not exist" in message:
-                category = "missing_package"
-            elif "cannot find symbol" in message:
-                category = "cannot_find_symbol"
-            elif "not a statement" in message or "expected" in message:
-                category = "syntax_error"
-            else:
-                category = "other"
-
-            error_counts[category] += 1
-            errors.append({
-                "file": filepath,
-                "line": int(row),
-                "col": int(col),
-                "message": message,
-                "category": category
-            })
+        error = parse_error_line(line)
+        if error:
+            error_counts[error["category"]] += 1
+            errors.append(error)
 
     return errors, error_counts
 
@@ -101,7 +154,7 @@ def check_syntax_in_tests(test_dir):
                 with open(filepath, "r", encoding="utf-8") as src:
                     code = src.read()
                 try:
-                    javalang.parse.parse(code)
+                    parse_java(code, cache=False)  # test files: keep the cache for main sources
                     syntax_results.append({"file": filepath, "syntax_ok": True})
                 except javalang.parser.JavaSyntaxError as e:
                     syntax_results.append({
@@ -199,29 +252,75 @@ def run_tests(project_path):
 # ---------------------------
 # 5. Main pipeline
 # ---------------------------
-def process_project(project_path, report_file="evaluation_report.json"):
+def evaluate_project(project_path, log_dir="logs", extra_args=None, timeout=MVN_TIMEOUT, execute_tests=False,
+                     warm=False, direct=False, max_errors=MAX_BUILD_ERRORS):
+    """
+    Syntax + compile (+ optionally test) evaluation of one project; returns the report dict.
+    extra_args go to every mvn call (e.g. -Dmaven.repo.local=... for an isolated repository).
+    warm: skip `clean` and the main compile while poms and src/main are unchanged (see warm_build.py).
+    direct: like warm, but tests are compiled with javac and run with the JUnit console launcher on the
+            cached dependency classpath, without a Maven lifecycle (see classpath_cache.py).
+    max_errors: stop the compile step once it reported more errors than this.
+    """
+    name = os.path.basename(os.path.normpath(project_path))
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
     # Step 1: Syntax correctness
     syntax_results, syntactic_correctness_count = check_syntax_in_tests(os.path.join(project_path, "src", "test", "java"))
 
     # Step 2: Compilation correctness
-    compile_output, _ = run_maven_command(project_path, "clean test-compile", log_prefix=f"compile_{os.path.basename(project_path)}")
-    errors, error_counts = parse_errors(compile_output)
+    compile_log = os.path.join(log_dir, f"compile_{name}_log_{timestamp}.txt")
+    if direct:
+        from classpath_cache import direct_test_compile
+        compile_run = direct_test_compile(project_path, compile_log, extra_args=extra_args, timeout=timeout,
+                                          max_errors=max_errors)
+    elif warm:
+        from warm_build import warm_test_compile
+        compile_run = warm_test_compile(project_path, compile_log, extra_args=extra_args, timeout=timeout,
+                                        max_errors=max_errors)
+    else:
+        compile_run = run_maven(project_path, ["clean", "test-compile"], compile_log, extra_args=extra_args,
+                                timeout=timeout, max_errors=max_errors)
+    # parsed while the build streamed; error_count stays exact past the kept error list
+    errors, error_counts = compile_run["errors"], dict(compile_run["error_counts"])
 
-    # Step 3: Execution correctness
-    # execution_results = run_tests(project_path)
     error_counts["syntactic_correctness_count"] = syntactic_correctness_count
     # Build JSON report
     report = {
         "project": project_path,
         "syntactic_correctness": syntax_results,
         "compilation_correctness": {
-            "error_count":len(errors),
+            "error_count":compile_run["error_total"],
             "errors": errors,
+            "errors_truncated": compile_run["errors_truncated"],
             "error_counts": error_counts
         },
-        # "execution_correctness": execution_results
+        "build": {k: compile_run[k] for k in ("returncode", "timed_out", "aborted", "seconds", "log_file",
+                                                     "mode", "runner", "classpath_cached", "modules")
+                  if k in compile_run},
     }
 
+    # Step 3: Execution correctness (surefire reports of `mvn test`), only when the tests compiled
+    if execute_tests and compile_run["returncode"] == 0:
+        test_log = os.path.join(log_dir, f"test_{name}_log_{timestamp}.txt")
+        if direct:
+            from classpath_cache import direct_run_tests
+            test_run = direct_run_tests(project_path, test_log, extra_args=extra_args, timeout=timeout)
+            summary, details = test_run["summary"], test_run["details"]
+        else:
+            test_goals = ["test", "-Dmaven.main.skip=true"] if warm else ["test"]
+            reports_dir = os.path.join(project_path, "target", "surefire-reports")
+            # warm builds skip `clean`: reports of earlier runs (e.g. of deleted tests) must not be counted
+            shutil.rmtree(reports_dir, ignore_errors=True)
+            test_run = run_maven(project_path, test_goals, test_log, extra_args=extra_args, timeout=timeout)
+            summary, details = parse_surefire_reports(reports_dir)
+        report["execution_correctness"] = {"summary": summary, "details": details,
+                                           "build": {k: test_run[k] for k in ("returncode", "timed_out", "seconds", "log_file")}}
+    return report
+
+
+def process_project(project_path, report_file="evaluation_report.json"):
+    report = evaluate_project(project_path)
+
     # Step 3: Append to file instead of overwrite
     if os.path.exists(report_file):
         try:
@@ -0,0 +1,225 @@
+import os
+import time
+import queue
+import signal
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import javalang
+
+from ASTstructured import tree_to_json
+from ASTenchancedStructure import enhancedtree_to_json
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+DEFAULT_CHUNKSIZE = 16          # files per task sent to a worker process
+DEFAULT_FILE_TIMEOUT = 30.0     # seconds per file
+POLL_INTERVAL = 0.5
+
+_HAS_ALARM = hasattr(signal, "setitimer") and hasattr(signal, "SIGALRM")
+
+
+class ExtractionTimeout(Exception):
+    pass
+
+
+_alarm_armed = False
+_started_queue = None   # worker side: (chunk id, wall time) when a chunk is picked up
+
+
+def _on_alarm(signum, frame):
+    if _alarm_armed:
+        raise ExtractionTimeout()
+
+
+def _extract_one(path: str, enhanced: bool) -> Dict[str, Any]:
+    start = time.perf_counter()
+    result = {"file": path, "ok": False, "ast": None, "error": None, "seconds": 0.0}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+        tree = javalang.parse.parse(source)
+        result["ast"] = enhancedtree_to_json(tree) if enhanced else tree_to_json(tree)
+        result["ok"] = True
+    except ExtractionTimeout:
+        result["error"] = "timeout"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def _init_worker(started_queue):
+    global _started_queue
+    _started_queue = started_queue
+
+
+def _extract_chunk(chunk_id: int, paths: List[str], enhanced: bool,
+                   per_file_timeout: Optional[float]) -> List[Dict[str, Any]]:
+    """Runs inside a worker process."""
+    global _alarm_armed
+    if _started_queue is not None:
+        # a future counts as running while it still waits in the call queue, so the worker reports the real start
+        _started_queue.put((chunk_id, time.time()))
+    use_alarm = _HAS_ALARM and per_file_timeout
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+    results = []
+    for path in paths:
+        try:
+            if use_alarm:
+                _alarm_armed = True
+                signal.setitimer(signal.ITIMER_REAL, per_file_timeout)
+            result = _extract_one(path, enhanced)
+        except ExtractionTimeout:
+            # fired outside _extract_one's own handler
+            result = {"file": path, "ok": False, "ast": None, "error": "timeout", "seconds": per_file_timeout}
+        finally:
+            _alarm_armed = False
+            if use_alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        results.append(result)
+    return results
+
+
+def iter_java_sources(root: str) -> Iterator[str]:
+    for dirpath, _, files in os.walk(root):
+        for file in files:
+            if file.endswith(".java"):
+                yield os.path.join(dirpath, file)
+
+
+def _chunks(paths: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def extract_ast_batch(paths: Iterable[str], enhanced: bool = False, max_workers: Optional[int] = None,
+                      chunksize: int = DEFAULT_CHUNKSIZE,
+                      per_file_timeout: Optional[float] = DEFAULT_FILE_TIMEOUT) -> Iterator[Dict[str, Any]]:
+    """
+    Fan `paths` out over a process pool and yield one result per file in completion order:
+        {"file", "ok", "ast", "error", "seconds"}
+    Failures (parse errors, unreadable files, timeouts) are reported in "error", never raised.
+
+    Per-file timeouts use SIGALRM inside the workers where available; on platforms without
+    it (Windows) a whole chunk is given chunksize * per_file_timeout from the moment a worker
+    picks it up. An overrunning chunk is reported as timed out and the pool is replaced (the
+    chunks still queued in it are resubmitted), so one hung worker doesn't hold a slot until the end.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_in_flight = max_workers * 2  # keeps memory flat for very large trees
+    chunk_iter = _chunks(paths, max(1, chunksize))
+    chunk_ids = itertools.count()
+
+    started_queue = multiprocessing.Queue() if per_file_timeout else None
+    executor = _new_executor(max_workers, started_queue)
+    pending = {}          # future -> (chunk id, chunk)
+    started = {}          # chunk id -> wall time a worker started it
+
+    def submit(chunk):
+        chunk_id = next(chunk_ids)
+        pending[executor.submit(_extract_chunk, chunk_id, chunk, enhanced, per_file_timeout)] = (chunk_id, chunk)
+
+    try:
+        while True:
+            while len(pending) < max_in_flight:
+                chunk = next(chunk_iter, None)
+                if chunk is None:
+                    break
+                submit(chunk)
+            if not pending:
+                break
+
+            done, _ = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk_id, chunk = pending.pop(future)
+                started.pop(chunk_id, None)
+                try:
+                    yield from future.result()
+                except Exception as e:
+                    # worker crashed (e.g. killed); report every file of the chunk
+                    for path in chunk:
+                        yield {"file": path, "ok": False, "ast": None,
+                               "error": f"worker failed: {type(e).__name__}: {e}", "seconds": 0.0}
+
+            if per_file_timeout:
+                _drain_started(started_queue, started, {chunk_id for chunk_id, _ in pending.values()})
+                now = time.time()
+                # generous backstop: the in-worker alarm normally fires long before this
+                overdue = [future for future, (chunk_id, chunk) in pending.items()
+                           if chunk_id in started and now - started[chunk_id] > per_file_timeout * len(chunk) + 5]
+                if overdue:
+                    for future in overdue:
+                        chunk_id, chunk = pending.pop(future)
+                        started.pop(chunk_id, None)
+                        for path in chunk:
+                            yield {"file": path, "ok": False, "ast": None, "error": "timeout", "seconds": 0.0}
+                    # a stuck worker can't be cancelled: replace the pool and requeue what it still held
+                    requeue = [chunk for _, chunk in pending.values()]
+                    pending.clear()
+                    started.clear()
+                    _terminate(executor)
+                    executor = _new_executor(max_workers, started_queue)
+                    for chunk in requeue:
+                        submit(chunk)
+    finally:
+        if pending:  # abandoned early (or failed): don't wait on chunks that may never finish
+            _terminate(executor)
+        else:
+            executor.shutdown(wait=True, cancel_futures=True)
+        if started_queue is not None:
+            started_queue.close()
+            started_queue.cancel_join_thread()
+
+
+def _new_executor(max_workers: int, started_queue) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(started_queue,))
+
+
+def _terminate(executor: ProcessPoolExecutor):
+    # a stuck worker would block shutdown forever; there is no public API to kill it
+    for process in list(getattr(executor, "_processes", {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _drain_started(started_queue, started: Dict[int, float], live_ids):
+    while True:
+        try:
+            chunk_id, at = started_queue.get_nowait()
+        except queue.Empty:
+            return
+        if chunk_id in live_ids:  # ids of chunks from a replaced pool are dropped
+            started[chunk_id] = at
+
+
+def extract_ast_tree(root: str, enhanced: bool = False, **kwargs) -> Dict[str, Any]:
+    """Extract every .java file under `root`; returns {"asts": {path: ast}, "errors": [...], "seconds": ...}."""
+    start = time.perf_counter()
+    asts, errors = {}, []
+    for result in extract_ast_batch(iter_java_sources(root), enhanced=enhanced, **kwargs):
+        if result["ok"]:
+            asts[result["file"]] = result["ast"]
+        else:
+            errors.append({"file": result["file"], "error": result["error"]})
+    return {"asts": asts, "errors": errors, "seconds": round(time.perf_counter() - start, 3)}
+
+
+if __name__ == "__main__":
+    import sys
+    import json
+
+    src_root = sys.argv[1] if len(sys.argv) > 1 else "."
+    summary = extract_ast_tree(src_root, enhanced=True)
+    print(f"Extracted {len(summary['asts'])} files in {summary['seconds']}s, {len(summary['errors'])} errors")
+    print(json.dumps(summary["errors"][:20], indent=2))
@@ -0,0 +1,257 @@
+import re
+import json
+import copy
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# -----------------------
+# Compact key names
+# -----------------------
+SHORT_KEYS = {
+    "package": "pkg",
+    "imports": "imp",
+    "classes": "cls",
+    "class_name": "n",
+    "name": "n",
+    "modifiers": "mod",
+    "visibility": "vis",
+    "is_static": "st",
+    "annotations": "ann",
+    "position": "ln",
+    "extends": "ext",
+    "implements": "impl",
+    "fields": "f",
+    "type": "t",
+    "initializer": "init",
+    "constructors": "ctor",
+    "parameters": "p",
+    "varargs": "va",
+    "throws": "thr",
+    "methods": "m",
+    "return_type": "r",
+    "invocations": "inv",
+    "qualifier": "q",
+    "member": "mb",
+    "arguments": "a",
+    "conditionals": "if",
+    "condition": "c",
+    "has_else": "el",
+    "returns": "ret",
+    "expression": "e",
+    "loops": "loop",
+    "kind": "k",
+    "iterable": "it",
+    "try_catch": "try",
+    "catches": "cat",
+    "has_finally": "fin",
+    "has_resources": "res",
+    "throws_statements": "throw",
+    "exception": "ex",
+    "field_accesses": "fa",
+    "nested_classes": "nest",
+}
+TYPE_KEYS = ("type", "return_type")
+
+
+def _legend() -> str:
+    """One line for the prompt so the model can read every short key (built from SHORT_KEYS)."""
+    long_names: Dict[str, List[str]] = {}
+    for long_name, short in SHORT_KEYS.items():
+        long_names.setdefault(short, []).append(long_name)
+    keys = " ".join(f"{short}={'/'.join(names)}" for short, names in long_names.items())
+    return f"Keys: {keys} (ln=line number). An integer t/r is an index into the top-level T type table."
+
+
+LEGEND = _legend()
+
+# javalang node reprs (used for conditions/returns) are mostly empty attributes
+_EMPTY_ATTR = re.compile(r"\b(?:prefix_operators|postfix_operators|selectors|type_arguments|dimensions|annotations"
+                         r"|qualifier|label)=(?:\[\]|None)?(?=[,)])|\b\w+=None(?=[,)])")
+_LEADING_SEP = re.compile(r"\((?:\s*,)+\s*")
+_TRAILING_SEP = re.compile(r"(?:\s*,)+\s*\)")
+_DOUBLE_SEP = re.compile(r",(?:\s*,)+")
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str, tokenizer: Optional[Callable[[str], List[Any]]] = None) -> int:
+    """
+    Token count of `text`. Pass the model's tokenizer (e.g. a HuggingFace tokenizer.encode)
+    for exact numbers; the fallback counts words and punctuation, which tracks code BPE closely.
+    The pipelines talk to Ollama, which exposes no tokenizer, so their budgets use the estimate.
+    """
+    if tokenizer is not None:
+        return len(tokenizer(text))
+    return len(_TOKEN.findall(text))
+
+
+def shorten_node_repr(text: Optional[str]) -> Optional[str]:
+    if not text:
+        return text
+    text = _EMPTY_ATTR.sub("", text)
+    text = _DOUBLE_SEP.sub(",", text)
+    text = _LEADING_SEP.sub("(", text)
+    return _TRAILING_SEP.sub(")", text)
+
+
+def _is_private(member: Dict[str, Any]) -> bool:
+    return "private" in (member.get("modifiers") or [])
+
+
+def _prune(ast_json: Dict[str, Any], drop_private: bool) -> Dict[str, Any]:
+    ast = copy.deepcopy(ast_json)
+    for cls in ast.get("classes", []):
+        if drop_private:
+            # private fields stay: they are usually the dependencies the test has to mock
+            for key in ("methods", "constructors"):
+                if key in cls:
+                    kept = [m for m in cls[key] if not _is_private(m)]
+                    if kept:
+                        cls[key] = kept
+                    else:
+                        del cls[key]
+        for method in cls.get("methods", []):
+            for cond in method.get("conditionals", []):
+                cond["condition"] = shorten_node_repr(cond.get("condition"))
+            for ret in method.get("returns", []):
+                ret["expression"] = shorten_node_repr(ret.get("expression"))
+    return ast
+
+
+def _is_empty(value) -> bool:
+    return value is None or value is False or (isinstance(value, (str, list, dict)) and not value)
+
+
+def _drop_empty(value):
+    if isinstance(value, dict):
+        return {k: _drop_empty(v) for k, v in value.items() if not _is_empty(v)}
+    if isinstance(value, list):
+        return [_drop_empty(v) for v in value]
+    return value
+
+
+def _collect_types(value, counter: Counter):
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if k in TYPE_KEYS and isinstance(v, str):
+                counter[v] += 1
+            else:
+                _collect_types(v, counter)
+    elif isinstance(value, list):
+        for v in value:
+            _collect_types(v, counter)
+
+
+def _encode(value, table: Dict[str, int]):
+    if isinstance(value, dict):
+        out = {}
+        for k, v in value.items():
+            if k in TYPE_KEYS and isinstance(v, str) and v in table:
+                out[SHORT_KEYS.get(k, k)] = table[v]
+            else:
+                out[SHORT_KEYS.get(k, k)] = _encode(v, table)
+        return out
+    if isinstance(value, list):
+        return [_encode(v, table) for v in value]
+    return value
+
+
+def compact_ast(ast_json: Dict[str, Any], drop_private: bool = True) -> Dict[str, Any]:
+    """
+    Compact form of tree_to_json / enhancedtree_to_json output:
+    short keys, empty values removed, private methods/constructors dropped, and type
+    strings used more than once moved into a "T" table and referenced by index.
+    """
+    ast = _drop_empty(_prune(ast_json, drop_private))
+    counter = Counter()
+    _collect_types(ast, counter)
+    # only worth a table entry if the index is shorter than repeating the name
+    types = [t for t, n in counter.most_common() if n > 1 and len(t) > 2]
+    table = {t: i for i, t in enumerate(types)}
+    encoded = _encode(ast, table)
+    if types:
+        encoded["T"] = types
+    return encoded
+
+
+def dumps_compact(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+# -----------------------
+# Token budget trimming (lowest value first)
+# -----------------------
+def _strip_keys(keys):
+    def step(ast: Dict[str, Any]):
+        def walk(value):
+            if isinstance(value, dict):
+                for k in keys:
+                    value.pop(k, None)
+                for v in value.values():
+                    walk(v)
+            elif isinstance(value, list):
+                for v in value:
+                    walk(v)
+        walk(ast)
+    return step
+
+
+def _strip_method_keys(keys):
+    def step(ast: Dict[str, Any]):
+        for cls in ast.get("cls", []):
+            for method in cls.get("m", []):
+                for k in keys:
+                    method.pop(k, None)
+    return step
+
+
+TRIM_STEPS = [
+    ("positions", _strip_keys(("ln",))),
+    ("annotations_and_initializers", _strip_keys(("ann", "init", "va"))),
+    ("invocation_arguments", _strip_keys(("a",))),
+    ("returns", _strip_method_keys(("ret",))),
+    ("loops_try_throws", _strip_method_keys(("loop", "try", "throw", "fa"))),
+    ("conditions", _strip_method_keys(("if",))),
+    ("imports", lambda ast: ast.pop("imp", None)),
+    ("invocations", _strip_method_keys(("inv",))),
+]
+
+
+def encode_ast_for_prompt(ast_json: Dict[str, Any], token_budget: Optional[int] = None, drop_private: bool = True,
+                          tokenizer: Optional[Callable[[str], List[Any]]] = None,
+                          baseline_indent: Optional[int] = 2, with_legend: bool = True) -> Tuple[str, Dict[str, Any]]:
+    """
+    Serialize an AST for a prompt in the compact form, trimming low-value fields until it
+    fits `token_budget` (if given). Returns (text, stats) where stats compares against the
+    json.dumps(ast_json, indent=baseline_indent) the prompts used before.
+    With `with_legend` the key legend line is prepended and counted against the budget.
+    """
+    baseline = json.dumps(ast_json, indent=baseline_indent)
+    prefix = LEGEND + "\n" if with_legend else ""
+    encoded = compact_ast(ast_json, drop_private=drop_private)
+    text = prefix + dumps_compact(encoded)
+    tokens = count_tokens(text, tokenizer)
+
+    trimmed = []
+    if token_budget:
+        for label, step in TRIM_STEPS:
+            if tokens <= token_budget:
+                break
+            step(encoded)
+            text = prefix + dumps_compact(encoded)
+            tokens = count_tokens(text, tokenizer)
+            trimmed.append(label)
+
+    tokens_before = count_tokens(baseline, tokenizer)
+    bytes_before = len(baseline.encode("utf-8"))
+    bytes_after = len(text.encode("utf-8"))
+    stats = {
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "bytes_saved": bytes_before - bytes_after,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens,
+        "tokens_saved": tokens_before - tokens,
+        "trimmed": trimmed,
+        "over_budget": bool(token_budget) and tokens > token_budget,
+    }
+    return text, stats
@@ -0,0 +1,168 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import javalang
+from javalang.ast import Node
+
+T = javalang.tree
+
+
+def _argument_str(arg):
+    return str(arg.member) if isinstance(arg, T.MemberReference) else str(arg)
+
+
+class MethodBodyVisitor:
+    """
+    Single-traversal replacement for the repeated method.filter(...) walks.
+
+    One pre-order walk over a method (same visiting order as javalang's Node.filter,
+    so list contents/order match the filter based extractors) collects:
+    invocations, conditionals, returns, loops, try/catch blocks, throws and field accesses.
+    """
+
+    def __init__(self, field_names: Iterable[str] = (), with_position: bool = False,
+                 get_position: Optional[Callable[[Any], Optional[int]]] = None):
+        self.field_names = set(field_names)
+        self.with_position = with_position
+        self.get_position = get_position or (lambda node: None)
+        self._dispatch = {
+            T.MethodInvocation: self._invocation,
+            T.IfStatement: self._conditional,
+            T.ReturnStatement: self._return,
+            T.ForStatement: self._for,
+            T.WhileStatement: self._while,
+            T.DoStatement: self._do,
+            T.TryStatement: self._try,
+            T.ThrowStatement: self._throw,
+            T.MemberReference: self._member_reference,
+            T.This: self._this,
+            T.FormalParameter: self._local,
+            T.LocalVariableDeclaration: self._local_declaration,
+            T.CatchClauseParameter: self._local,
+        }
+
+    # -----------------------
+    # Walk
+    # -----------------------
+    def visit(self, method) -> Dict[str, List[Any]]:
+        self.result = {
+            "invocations": [],
+            "conditionals": [],
+            "returns": [],
+            "loops": [],
+            "try_catch": [],
+            "throws_statements": [],
+            "field_accesses": [],
+        }
+        self._locals = set()
+        self._seen_fields = set()
+        dispatch = self._dispatch
+        stack = [method]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Node):
+                handler = dispatch.get(type(node))
+                if handler is not None:
+                    handler(node)
+                children = node.children
+            else:
+                children = node
+            # push in reverse so children are visited left to right (pre-order)
+            for child in reversed(children):
+                if isinstance(child, (Node, list, tuple)):
+                    stack.append(child)
+        return self.result
+
+    def _with_position(self, entry: Dict[str, Any], node) -> Dict[str, Any]:
+        if self.with_position:
+            entry["position"] = self.get_position(node)
+        return entry
+
+    # -----------------------
+    # Handlers
+    # -----------------------
+    def _invocation(self, node):
+        self.result["invocations"].append(self._with_position({
+            "qualifier": node.qualifier,
+            "member": node.member,
+            "arguments": [_argument_str(arg) for arg in node.arguments or []]
+        }, node))
+
+    def _conditional(self, node):
+        self.result["conditionals"].append(self._with_position({
+            "condition": str(node.condition),
+            "has_else": node.else_statement is not None
+        }, node))
+
+    def _return(self, node):
+        self.result["returns"].append(self._with_position({
+            "expression": str(node.expression) if node.expression else None
+        }, node))
+
+    def _for(self, node):
+        control = node.control
+        if isinstance(control, T.EnhancedForControl):
+            entry = {"kind": "foreach"}
+            if isinstance(control.iterable, T.MemberReference):
+                entry["iterable"] = control.iterable.member
+        else:
+            entry = {"kind": "for"}
+        self.result["loops"].append(self._with_position(entry, node))
+
+    def _while(self, node):
+        self.result["loops"].append(self._with_position({"kind": "while"}, node))
+
+    def _do(self, node):
+        self.result["loops"].append(self._with_position({"kind": "do"}, node))
+
+    def _try(self, node):
+        catches = []
+        for clause in node.catches or []:
+            catches.extend(clause.parameter.types)
+        self.result["try_catch"].append(self._with_position({
+            "catches": catches,
+            "has_finally": node.finally_block is not None,
+            "has_resources": bool(node.resources)
+        }, node))
+
+    def _throw(self, node):
+        expression = node.expression
+        if isinstance(expression, T.ClassCreator):
+            thrown = expression.type.name
+        else:
+            thrown = _argument_str(expression)
+        self.result["throws_statements"].append(self._with_position({"exception": thrown}, node))
+
+    def _local(self, node):
+        self._locals.add(node.name)
+
+    def _local_declaration(self, node):
+        for decl in node.declarators:
+            self._locals.add(decl.name)
+
+    def _field(self, name):
+        if name in self.field_names and name not in self._seen_fields:
+            self._seen_fields.add(name)
+            self.result["field_accesses"].append(name)
+
+    def _member_reference(self, node):
+        # bare `name` that is not shadowed by a parameter/local declared earlier
+        if not node.qualifier and node.member not in self._locals:
+            self._field(node.member)
+
+    def _this(self, node):
+        # this.name
+        for selector in node.selectors or []:
+            if isinstance(selector, T.MemberReference):
+                self._field(selector.member)
+                break
+
+
+def visit_method(method, field_names: Iterable[str] = (), with_position: bool = False,
+                 get_position: Optional[Callable[[Any], Optional[int]]] = None) -> Dict[str, List[Any]]:
+    return MethodBodyVisitor(field_names, with_position, get_position).visit(method)
+
+
+def add_visitor_results(method_json: Dict[str, Any], collected: Dict[str, List[Any]], keys: Iterable[str]):
+    """Copy the non-empty collected lists into method_json, in `keys` order (empty lists are omitted)."""
+    for key in keys:
+        if collected.get(key):
+            method_json[key] = collected[key]
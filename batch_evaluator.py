@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from RunProjectResultGenerator import evaluate_project
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+# Each mvn run is a JVM with forked compiler/surefire JVMs: keep well below the core count
+EVAL_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+EVAL_TIMEOUT = 900              # seconds per mvn call before the process tree is killed
+EVAL_LOG_DIR = "eval_logs"
+EVAL_REPORT = "batch_evaluation_report.json"
+# "shared":   one local repository for all workers (Maven 3.9 file locks guard concurrent writes)
+# "isolated": a private repository per project under ISOLATED_REPO_ROOT; with SHARED_REPO set it is
+#             chained as a read-only tail, so only artifacts missing from the shared cache are downloaded
+REPO_MODE = "shared"
+SHARED_REPO: Optional[str] = None   # None = Maven's default (~/.m2/repository)
+ISOLATED_REPO_ROOT = "eval_m2"
+OFFLINE = False                     # mvn -o: resolve only from the local repositories
+# Skip clean + main compile for projects whose poms and src/main are unchanged (warm_build.py, mvnd if installed)
+WARM_BUILD = False
+# Compile / run tests with javac + the JUnit console on the cached classpath (classpath_cache.py)
+DIRECT_BUILD = False
+EVAL_MAX_ERRORS: Optional[int] = None   # stop a project's compile after this many errors (None = never)
+
+
+def project_root(project: Dict[str, str]) -> str:
+    """discover_maven_projects entry (src_path = <root>/src/main/java) or {"project_root": ...}."""
+    if project.get("project_root"):
+        return os.path.abspath(project["project_root"])
+    return os.path.abspath(os.path.join(project["src_path"], "..", "..", ".."))
+
+
+def repo_args(root: str, repo_mode: str = REPO_MODE, shared_repo: Optional[str] = SHARED_REPO,
+              isolated_root: str = ISOLATED_REPO_ROOT, offline: bool = OFFLINE) -> List[str]:
+    """mvn arguments selecting the local repository layout for one project."""
+    args = ["-o"] if offline else []
+    if repo_mode == "shared":
+        if shared_repo:
+            args.append(f"-Dmaven.repo.local={os.path.abspath(shared_repo)}")
+        args.append("-Daether.syncContext.named.factory=file-lock")
+    elif repo_mode == "isolated":
+        name = os.path.basename(root) + "-" + hashlib.sha1(root.encode("utf-8")).hexdigest()[:8]
+        args.append(f"-Dmaven.repo.local={os.path.abspath(os.path.join(isolated_root, name))}")
+        if shared_repo:
+            args.append(f"-Dmaven.repo.local.tail={os.path.abspath(shared_repo)}")
+    else:
+        raise ValueError(f"Unknown repo_mode {repo_mode!r}; expected 'shared' or 'isolated'")
+    return args
+
+
+def project_status(report: Dict[str, Any]) -> str:
+    build = report["build"]
+    if build["timed_out"]:
+        return "timeout"
+    if build["returncode"] != 0:
+        return "compile_failed"
+    execution = report.get("execution_correctness")
+    if execution and execution["build"]["timed_out"]:
+        return "test_timeout"
+    if execution and (execution["summary"]["failed"] or execution["summary"]["errors"]):
+        return "tests_failed"
+    return "ok"
+
+
+def evaluate_one(project: Dict[str, str], timeout: float, execute_tests: bool, log_dir: str,
+                 mvn_args: List[str], warm: bool = WARM_BUILD, direct: bool = DIRECT_BUILD,
+                 max_errors: Optional[int] = EVAL_MAX_ERRORS) -> Dict[str, Any]:
+    root = project_root(project)
+    start = time.perf_counter()
+    if not os.path.exists(os.path.join(root, "pom.xml")):
+        return {"project": root, "status": "no_pom", "seconds": 0.0}
+    try:
+        report = evaluate_project(root, log_dir=log_dir, extra_args=mvn_args, timeout=timeout,
+                                  execute_tests=execute_tests, warm=warm, direct=direct, max_errors=max_errors)
+        report["status"] = project_status(report)
+    except Exception as e:
+        report = {"project": root, "status": "error", "error": f"{type(e).__name__}: {e}"}
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def aggregate(reports: List[Dict[str, Any]], wall_seconds: float, workers: int) -> Dict[str, Any]:
+    statuses: Dict[str, int] = {}
+    error_counts: Dict[str, int] = {}
+    tests = {"passed": 0, "failed": 0, "errors": 0, "skipped": 0}
+    build_seconds: Dict[str, List[float]] = {}
+    for report in reports:
+        if "build" in report:
+            build_seconds.setdefault(report["build"].get("mode", "cold"), []).append(report["build"]["seconds"])
+        statuses[report["status"]] = statuses.get(report["status"], 0) + 1
+        for category, count in report.get("compilation_correctness", {}).get("error_counts", {}).items():
+            error_counts[category] = error_counts.get(category, 0) + count
+        for key, count in report.get("execution_correctness", {}).get("summary", {}).items():
+            tests[key] += count
+    busy = sum(r.get("seconds", 0.0) for r in reports)
+    compiled = sum(statuses.get(s, 0) for s in ("ok", "tests_failed", "test_timeout"))
+    return {
+        "projects": len(reports),
+        "statuses": statuses,
+        "compile_success_rate": round(compiled / len(reports), 3) if reports else 0.0,
+        "error_counts": error_counts,
+        "tests": tests,
+        # compile step only: cold = clean build, warm = main sources reused, direct = javac on the cached classpath
+        "build_seconds": {mode: {"count": len(times), "avg": round(sum(times) / len(times), 3),
+                                 "total": round(sum(times), 3)} for mode, times in build_seconds.items()},
+        "workers": workers,
+        "wall_seconds": round(wall_seconds, 3),
+        "busy_seconds": round(busy, 3),
+        # > 1 means the pool overlapped builds (ideal = workers)
+        "parallelism": round(busy / wall_seconds, 2) if wall_seconds else 0.0,
+    }
+
+
+def save_report(report: Dict[str, Any], path: str):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def evaluate_projects(projects: List[Dict[str, str]], workers: int = EVAL_WORKERS, timeout: float = EVAL_TIMEOUT,
+                      execute_tests: bool = False, repo_mode: str = REPO_MODE, shared_repo: Optional[str] = SHARED_REPO,
+                      offline: bool = OFFLINE, log_dir: str = EVAL_LOG_DIR,
+                      report_file: Optional[str] = EVAL_REPORT, warm: bool = WARM_BUILD,
+                      direct: bool = DIRECT_BUILD, max_errors: Optional[int] = EVAL_MAX_ERRORS) -> Dict[str, Any]:
+    """
+    Evaluate every project in a bounded pool of mvn runs and write one aggregated report
+    ({"summary": ..., "projects": [...]}) to report_file, rewritten as projects finish.
+    """
+    start = time.perf_counter()
+    reports: List[Dict[str, Any]] = []
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mvn-eval") as pool:
+        futures = {}
+        for project in projects:
+            root = project_root(project)
+            mvn_args = repo_args(root, repo_mode, shared_repo, offline=offline)
+            future = pool.submit(evaluate_one, project, timeout, execute_tests, log_dir, mvn_args, warm, direct,
+                                 max_errors)
+            futures[future] = root
+        for done, future in enumerate(as_completed(futures), start=1):
+            report = future.result()
+            reports.append(report)
+            print(f"[{done}/{len(futures)}] {report['status']:<15} {report['seconds']:>8.1f}s  {report['project']}")
+            if report_file:
+                save_report({"summary": aggregate(reports, time.perf_counter() - start, workers),
+                             "projects": reports}, report_file)
+
+    result = {"summary": aggregate(reports, time.perf_counter() - start, workers),
+              "projects": sorted(reports, key=lambda r: r["project"])}
+    if report_file:
+        save_report(result, report_file)
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+    from discover_Projects import discover_maven_projects
+
+    parser = argparse.ArgumentParser(description="Compile (and optionally test) many Maven projects in parallel")
+    parser.add_argument("root", help="folder scanned with discover_maven_projects, or a projects JSON list")
+    parser.add_argument("--workers", type=int, default=EVAL_WORKERS)
+    parser.add_argument("--timeout", type=float, default=EVAL_TIMEOUT)
+    parser.add_argument("--tests", action="store_true", help="also run mvn test and parse surefire reports")
+    parser.add_argument("--repo-mode", choices=("shared", "isolated"), default=REPO_MODE)
+    parser.add_argument("--shared-repo", default=SHARED_REPO)
+    parser.add_argument("--offline", action="store_true", default=OFFLINE)
+    parser.add_argument("--warm", action="store_true", default=WARM_BUILD,
+                        help="reuse target/classes while main sources are unchanged (mvnd when installed)")
+    parser.add_argument("--direct", action="store_true", default=DIRECT_BUILD,
+                        help="javac + JUnit console on the cached classpath while main sources are unchanged")
+    parser.add_argument("--max-errors", type=int, default=EVAL_MAX_ERRORS,
+                        help="kill a compile once it reported more errors than this")
+    parser.add_argument("--report", default=EVAL_REPORT)
+    parser.add_argument("--log-dir", default=EVAL_LOG_DIR)
+    args = parser.parse_args()
+
+    if args.root.endswith(".json"):
+        with open(args.root, "r", encoding="utf-8") as f:
+            project_list = json.load(f)
+    else:
+        project_list = discover_maven_projects(args.root, json_out="projects_list_for_evaluation.json")
+    outcome = evaluate_projects(project_list, workers=args.workers, timeout=args.timeout, execute_tests=args.tests,
+                                repo_mode=args.repo_mode, shared_repo=args.shared_repo, offline=args.offline,
+                                log_dir=args.log_dir, report_file=args.report, warm=args.warm,
+                                direct=args.direct, max_errors=args.max_errors)
+    print(json.dumps(outcome["summary"], indent=2))
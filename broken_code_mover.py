@@ -2,33 +2,41 @@ import json
 import os
 import shutil
 
-# path to your error JSON
-json_file = "compile_report.json"
 
-# target folder for broken classes
-broken_dir = "broken_tests"
+def move_broken_files(file_paths, project_path, broken_dir="broken_tests"):
+    """Move each file (once) to broken_dir, keeping its path relative to project_path. Returns the moved set."""
+    # ensure the broken_tests folder exists
+    os.makedirs(broken_dir, exist_ok=True)
 
-with open(json_file, "r") as f:
-    data = json.load(f)
+    # keep track of unique files
+    moved_files = set()
 
-# ensure the broken_tests folder exists
-os.makedirs(broken_dir, exist_ok=True)
+    for file_path in file_paths:
+        if file_path not in moved_files and os.path.exists(file_path):
+            moved_files.add(file_path)
 
-# keep track of unique files
-moved_files = set()
+            # preserve original folder structure (optional)
+            relative_path = os.path.relpath(file_path, project_path)
+            dest_path = os.path.join(broken_dir, relative_path)
 
-for error in data["errors"]:
-    file_path = error["file"].lstrip("/")  # remove leading "/" from your JSON paths
-    if file_path not in moved_files and os.path.exists(file_path):
-        moved_files.add(file_path)
+            os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+            shutil.move(file_path, dest_path)
 
-        # preserve original folder structure (optional)
-        relative_path = os.path.relpath(file_path, data["project"])
-        dest_path = os.path.join(broken_dir, relative_path)
+            print(f"Moved: {file_path} → {dest_path}")
+    return moved_files
 
-        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-        shutil.move(file_path, dest_path)
 
-        print(f"Moved: {file_path} → {dest_path}")
+if __name__ == "__main__":
+    # path to your error JSON
+    json_file = "compile_report.json"
 
-print(f"\n✅ Moved {len(moved_files)} broken files to {broken_dir}")
+    # target folder for broken classes
+    broken_dir = "broken_tests"
+
+    with open(json_file, "r") as f:
+        data = json.load(f)
+
+    # remove leading "/" from your JSON paths
+    moved_files = move_broken_files([error["file"].lstrip("/") for error in data["errors"]], data["project"], broken_dir)
+
+    print(f"\n✅ Moved {len(moved_files)} broken files to {broken_dir}")
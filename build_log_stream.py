@@ -0,0 +1,206 @@
+import os
+import re
+import gzip
+import time
+import threading
+import subprocess
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from RunProjectResultGenerator import kill_process_tree, new_error_counts, parse_error_line
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+LOG_COMPRESS = True         # logs are written as <log_file>.gz (Maven logs compress ~10-20x)
+LOG_COMPRESSLEVEL = 6
+TAIL_LINES = 500            # last lines kept in memory (result["stdout"])
+MAX_KEPT_ERRORS = 2000      # error dicts kept in memory; error_counts keep counting past it
+MAX_LINE_CHARS = 64 * 1024  # longer lines are read (and parsed) in pieces
+SHOW_PROGRESS = True        # print a line per reactor module as it starts / finishes
+PIPE_DRAIN_SECONDS = 10     # after exit, wait this long for output still held by detached children
+
+# [INFO] Building core 1.0-SNAPSHOT                                      [2/5]
+# (no colon in the name: "[INFO] Building jar: target/x.jar" is the jar plugin)
+_MODULE_START = re.compile(r"^\[INFO\] Building ([^:]+?) (\S+?)(?:\s+\[(\d+)/(\d+)\])?\s*$")
+# [INFO] core ............................................... SUCCESS [  1.234 s]
+_MODULE_RESULT = re.compile(r"^\[INFO\] (.+?) \.+ ?(SUCCESS|FAILURE|SKIPPED)\b")
+_BUILD_RESULT = re.compile(r"^\[INFO\] BUILD (SUCCESS|FAILURE)")
+
+
+def print_progress(module: Dict[str, Any]):
+    position = f"[{module['index']}/{module['total']}] " if module.get("total") else ""
+    if module["status"] == "building":
+        print(f"🔹 {position}{module['name']} ...")
+    else:
+        errors = f", {module['errors']} errors" if module["errors"] else ""
+        icon = {"SUCCESS": "✅", "SKIPPED": "⏭️"}.get(module["status"], "❌")
+        print(f"{icon} {position}{module['name']} {module['status']}{errors}")
+
+
+class BuildLogParser:
+    """
+    Incremental view of a Maven / javac log, fed one line at a time: compile errors (same dicts as
+    parse_errors), per-module progress, and a bounded tail. Memory does not grow with the log.
+    """
+
+    def __init__(self, on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 tail_lines: int = TAIL_LINES, max_kept_errors: int = MAX_KEPT_ERRORS):
+        self.on_progress = on_progress
+        self.max_kept_errors = max_kept_errors
+        self.errors: List[Dict[str, Any]] = []
+        self.error_counts = new_error_counts()
+        self.error_total = 0
+        self.modules: List[Dict[str, Any]] = []
+        self.tail = deque(maxlen=tail_lines)
+        self.lines = 0
+        self.build_result = None
+
+    def _finish(self, module, status):
+        if module["status"] == status:
+            return
+        module["status"] = status
+        if "started" in module:
+            module["seconds"] = round(time.perf_counter() - module.pop("started"), 3)
+        if self.on_progress:
+            self.on_progress(module)
+
+    def feed(self, line: str) -> Optional[Dict[str, Any]]:
+        """Consume one line (without newline); returns the compile error it reported, if any."""
+        self.lines += 1
+        self.tail.append(line)
+        error = parse_error_line(line)
+        if error:
+            self.error_total += 1
+            self.error_counts[error["category"]] += 1
+            if len(self.errors) < self.max_kept_errors:
+                self.errors.append(error)
+            if self.modules:
+                self.modules[-1]["errors"] += 1
+            return error
+
+        match = _MODULE_START.match(line)
+        if match:
+            name, version, index, total = match.groups()
+            if self.modules and self.modules[-1]["status"] == "building":
+                # reactor moved on (-fae keeps going after failures; the summary line corrects it)
+                self._finish(self.modules[-1], "FAILURE" if self.modules[-1]["errors"] else "SUCCESS")
+            module = {"name": name, "version": version, "index": int(index or len(self.modules) + 1),
+                      "total": int(total) if total else None, "status": "building", "errors": 0,
+                      "started": time.perf_counter()}
+            self.modules.append(module)
+            if self.on_progress:
+                self.on_progress(module)
+            return None
+
+        match = _MODULE_RESULT.match(line)
+        if match:
+            name, status = match.groups()
+            for module in self.modules:
+                if name in (module["name"], f"{module['name']} {module['version']}"):
+                    self._finish(module, status)
+            return None
+
+        match = _BUILD_RESULT.match(line)
+        if match:
+            self.build_result = match.group(1)
+            for module in self.modules:
+                if module["status"] == "building":
+                    self._finish(module, match.group(1))
+        return None
+
+    def module_summary(self) -> List[Dict[str, Any]]:
+        return [{k: v for k, v in m.items() if k != "started"} for m in self.modules]
+
+
+def _open_log(log_file: str, compress: bool):
+    os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+    if compress:
+        return gzip.open(log_file, "wt", encoding="utf-8", compresslevel=LOG_COMPRESSLEVEL)
+    return open(log_file, "w", encoding="utf-8")
+
+
+def stream_process(cmd, cwd, log_file, timeout=None, env=None, max_errors: Optional[int] = None,
+                   on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   compress: bool = LOG_COMPRESS) -> Dict[str, Any]:
+    """
+    Run cmd with stdout+stderr merged and teed line by line into log_file (gzip when compress; ".gz"
+    is appended) while BuildLogParser follows it. Once more than max_errors compile errors were seen,
+    or after timeout seconds, the process tree is killed.
+    Returns {returncode, timed_out, aborted, output_cut, seconds, stdout (last TAIL_LINES lines),
+    stderr (""), log_file, lines, errors, error_counts, error_total, errors_truncated, modules};
+    errors_truncated means errors holds only the first MAX_KEPT_ERRORS of error_total, output_cut that a
+    process outside the killed tree still held the pipe and its remaining output was not read.
+    """
+    if compress and not log_file.endswith(".gz"):
+        log_file += ".gz"
+    if on_progress is None and SHOW_PROGRESS:
+        on_progress = print_progress
+    parser = BuildLogParser(on_progress)
+    group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP} if os.name == "nt" else {"start_new_session": True}
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                               encoding="utf-8", errors="replace", env=env, **group)
+    aborted = threading.Event()
+    detached = threading.Event()
+    log_lock = threading.Lock()
+
+    with _open_log(log_file, compress) as log:
+        log.write("==== COMMAND ====\n")
+        log.write(" ".join(cmd) + "\n")
+        log.write("==== OUTPUT ====\n")
+
+        def pump():
+            while True:
+                line = process.stdout.readline(MAX_LINE_CHARS)
+                if not line:
+                    break
+                with log_lock:
+                    if detached.is_set():
+                        break
+                    log.write(line)
+                    error = parser.feed(line.rstrip("\r\n"))
+                if error and max_errors is not None and parser.error_total > max_errors and not aborted.is_set():
+                    aborted.set()
+                    kill_process_tree(process)
+
+        reader = threading.Thread(target=pump, name="build-log", daemon=True)
+        reader.start()
+        timed_out = False
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            kill_process_tree(process)
+            process.wait()
+        reader.join(PIPE_DRAIN_SECONDS)
+        if reader.is_alive():  # a detached child still holds the pipe open
+            kill_process_tree(process)
+            reader.join(PIPE_DRAIN_SECONDS)
+        with log_lock:
+            if reader.is_alive():
+                # held by a process outside the tree: stop following it. The pipe stays open, since
+                # closing it would block on the reader's lock; the daemon reader drops what comes later.
+                detached.set()
+                log.write(f"\n==== OUTPUT CUT: pipe still open {2 * PIPE_DRAIN_SECONDS}s after exit ====\n")
+            else:
+                process.stdout.close()
+        if timed_out:
+            log.write(f"\n==== KILLED after {timeout}s timeout ====\n")
+        if aborted.is_set():
+            log.write(f"\n==== KILLED after {parser.error_total} compile errors (limit {max_errors}) ====\n")
+
+    return {"returncode": process.returncode, "timed_out": timed_out, "aborted": aborted.is_set(),
+            "output_cut": detached.is_set(),
+            "seconds": round(time.perf_counter() - start, 3), "stdout": "\n".join(parser.tail), "stderr": "",
+            "log_file": log_file, "lines": parser.lines, "errors": parser.errors,
+            "error_counts": parser.error_counts, "error_total": parser.error_total,
+            "errors_truncated": parser.error_total > len(parser.errors), "modules": parser.module_summary()}
+
+
+def iter_log(log_file: str) -> Iterator[str]:
+    """Lines (without newline) of a (possibly gzip-compressed) build log, read as they are consumed."""
+    opener = gzip.open if log_file.endswith(".gz") else open
+    with opener(log_file, "rt", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            yield line.rstrip("\r\n")
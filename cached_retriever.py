@@ -0,0 +1,134 @@
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from langchain.schema import Document
+from langchain_core.retrievers import BaseRetriever
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+RETRIEVAL_CACHE_SIZE = 512
+SIGNATURE_MAX_METHODS = 12    # keep the signature query short
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Whitespace-insensitive form of a query (indentation/line endings of the prompt don't matter)."""
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def signature_query(ast_json: Dict[str, Any], max_methods: int = SIGNATURE_MAX_METHODS) -> str:
+    """
+    Short retrieval query from the class signature in a tree_to_json AST:
+    class declaration, field types and public method signatures.
+    """
+    parts = []
+    for cls in ast_json.get("classes", []):
+        header = f"class {cls.get('class_name', '')}"
+        if cls.get("extends"):
+            header += f" extends {cls['extends']}"
+        if cls.get("implements"):
+            header += " implements " + ", ".join(cls["implements"])
+        parts.append(header)
+        field_types = sorted({f.get("type") for f in cls.get("fields", []) if f.get("type")})
+        if field_types:
+            parts.append("fields: " + ", ".join(field_types))
+        methods = [m for m in cls.get("methods", []) if "private" not in (m.get("modifiers") or [])]
+        for method in methods[:max_methods]:
+            params = ", ".join(p.get("type", "") for p in method.get("parameters", []))
+            signature = f"{method.get('return_type') or 'void'} {method.get('name')}({params})"
+            if method.get("throws"):
+                signature += " throws " + ", ".join(method["throws"])
+            parts.append(signature)
+    return "JUnit 5 test for " + "; ".join(parts)
+
+
+class RetrievalMemo:
+    """Thread-safe LRU of query -> documents with hit-rate and latency counters."""
+
+    def __init__(self, max_entries: int = RETRIEVAL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, List[Document]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    def get(self, key: str) -> Optional[List[Document]]:
+        with self.lock:
+            docs = self.entries.get(key)
+            if docs is not None:
+                self.entries.move_to_end(key)
+            return docs
+
+    def put(self, key: str, docs: List[Document]):
+        with self.lock:
+            self.entries[key] = docs
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def record(self, hit: bool, seconds: float):
+        with self.lock:
+            if hit:
+                self.hits += 1
+                self.hit_seconds += seconds
+            else:
+                self.misses += 1
+                self.miss_seconds += seconds
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "lookups": lookups,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "avg_hit_ms": round(1000 * self.hit_seconds / self.hits, 3) if self.hits else 0.0,
+                "avg_miss_ms": round(1000 * self.miss_seconds / self.misses, 3) if self.misses else 0.0,
+                "entries": len(self.entries),
+            }
+
+
+class CachedRetriever(BaseRetriever):
+    """
+    Memoizing front for a vectorstore retriever: results are cached by the normalized query,
+    so repeated prompts (or repeated signature queries) skip embedding + FAISS search.
+    Drop a CachedRetriever whenever the index changes; it never invalidates entries itself.
+    """
+
+    base: BaseRetriever
+    memo: Any = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.memo is None:
+            self.memo = RetrievalMemo()
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        start = time.perf_counter()
+        key = hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+        docs = self.memo.get(key)
+        hit = docs is not None
+        if not hit:
+            docs = self.base.get_relevant_documents(query)
+            self.memo.put(key, docs)
+        self.memo.record(hit, time.perf_counter() - start)
+        return list(docs)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.memo.stats()
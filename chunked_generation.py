@@ -0,0 +1,223 @@
+import re
+import copy
+import json
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ast_compact import count_tokens
+from cleanupcode import clean_java_code
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+DEFAULT_CHUNK_TOKEN_BUDGET = 1500   # AST tokens per prompt; leaves room for rules + answer in a 4k context
+DEFAULT_CHUNK_WORKERS = 3
+
+SETUP_ANNOTATIONS = ("@BeforeEach", "@AfterEach", "@BeforeAll", "@AfterAll", "@Before", "@After",
+                     "@BeforeClass", "@AfterClass")
+
+
+# -----------------------
+# Splitting
+# -----------------------
+def _indented_json(ast_json: Dict[str, Any]) -> str:
+    return json.dumps(ast_json, indent=2)
+
+
+def split_class_by_methods(ast_json: Dict[str, Any], token_budget: int = DEFAULT_CHUNK_TOKEN_BUDGET,
+                           tokenizer: Optional[Callable[[str], List[Any]]] = None,
+                           render: Callable[[Dict[str, Any]], str] = _indented_json) -> List[Dict[str, Any]]:
+    """
+    Split a tree_to_json / enhancedtree_to_json AST into sub-ASTs that each fit `token_budget`,
+    measured on render(sub_ast): pass the encoding the prompt really uses (compact, no indent ...).
+
+    Every batch keeps the shared header (package, imports, class name, modifiers, fields,
+    constructors) and gets a slice of that class's non-private methods; private methods are
+    never tested directly, so they are left out of the batches. A method that does not fit
+    on its own still gets its own batch. Returns [ast_json] when no split is needed.
+    """
+    def _ast_tokens(tree, tokenizer):
+        return count_tokens(render(tree), tokenizer)
+
+    if _ast_tokens(ast_json, tokenizer) <= token_budget:
+        return [ast_json]
+
+    batches = []
+    for cls in ast_json.get("classes", []):
+        header_cls = {k: v for k, v in cls.items() if k != "methods"}
+        header = dict(ast_json, classes=[header_cls])
+        methods = [m for m in cls.get("methods", []) if "private" not in (m.get("modifiers") or [])]
+        if not methods:
+            continue
+
+        current: List[Dict[str, Any]] = []
+        for method in methods:
+            candidate = dict(header, classes=[dict(header_cls, methods=current + [method])])
+            if current and _ast_tokens(candidate, tokenizer) > token_budget:
+                batches.append(dict(header, classes=[dict(header_cls, methods=current)]))
+                current = [method]
+            else:
+                current.append(method)
+        if current:
+            batches.append(dict(header, classes=[dict(header_cls, methods=current)]))
+    return copy.deepcopy(batches) or [ast_json]
+
+
+# -----------------------
+# Merging generated test classes
+# -----------------------
+def _split_members(body: str) -> List[str]:
+    """Split a class body into top-level members (fields, methods, nested types, initializers)."""
+    members, start, depth, i, n = [], 0, 0, 0, len(body)
+    while i < n:
+        ch = body[i]
+        if ch == '"' or ch == "'":
+            if body.startswith('"""', i):
+                end = body.find('"""', i + 3)
+                i = n if end == -1 else end + 3
+                continue
+            i += 1
+            while i < n and body[i] != ch:
+                i += 2 if body[i] == "\\" else 1
+        elif body.startswith("//", i):
+            end = body.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        elif body.startswith("/*", i):
+            end = body.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                members.append(body[start:i + 1])
+                start = i + 1
+        elif ch == ";" and depth == 0:
+            members.append(body[start:i + 1])
+            start = i + 1
+        i += 1
+    members.append(body[start:])
+    # drop leading blank lines, then dedent so every member starts at column 0
+    members = [textwrap.dedent(m.lstrip("\r\n").rstrip()) for m in members]
+    return [m for m in members if m.strip() and m.strip() != ";"]
+
+
+_METHOD_NAME = re.compile(r"(\w+)\s*\([^()]*\)\s*(?:throws\s+[\w.,\s]+)?\s*$")
+_COMMENT = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+
+
+def _member_name(member: str) -> Optional[str]:
+    member = _COMMENT.sub("", member)
+    signature = member.split("{", 1)[0] if "{" in member else None
+    if signature is None:
+        return None
+    match = _METHOD_NAME.search(signature.strip())
+    return match.group(1) if match else None
+
+
+def _parse_test_class(code: str):
+    code = clean_java_code(code)
+    imports, rest = [], []
+    for line in code.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("import "):
+            imports.append(stripped)
+        elif not stripped.startswith("package "):
+            rest.append(line)
+    text = "\n".join(rest)
+    match = re.search(r"\bclass\s+\w+[^{]*\{", text)
+    if not match:
+        return imports, None, []
+    open_idx = match.end() - 1
+    close_idx = text.rfind("}")
+    header = text[:open_idx].strip()
+    body = text[open_idx + 1:close_idx] if close_idx > open_idx else text[open_idx + 1:]
+    return imports, header, _split_members(body)
+
+
+def _setup_annotations(member: str, name: str) -> Tuple[str, ...]:
+    prefix = member.split(name, 1)[0]
+    return tuple(a for a in SETUP_ANNOTATIONS if re.search(rf"{re.escape(a)}\b", prefix))
+
+
+def _merge_setup_bodies(first: str, other: str) -> str:
+    """Append the statements of `other`'s body that `first` doesn't already have (setup needed by later batches)."""
+    have = {line.strip() for line in first.splitlines()}
+    body = other[other.index("{") + 1:other.rindex("}")]
+    extra = [line for line in textwrap.dedent(body).strip("\r\n").splitlines()
+             if line.strip() and line.strip() not in have]
+    if not extra:
+        return first
+    close = first.rindex("}")
+    return first[:close].rstrip() + "\n" + textwrap.indent("\n".join(extra), "    ") + "\n" + first[close:]
+
+
+def merge_test_classes(codes: List[str]) -> str:
+    """
+    Merge the test classes generated for each batch into one class: union of imports, the
+    first class header, fields de-duplicated, setup/teardown methods of the same name and
+    annotation merged into one body, and other methods whose names collide renamed with a
+    numeric suffix.
+    """
+    imports, header, members = [], None, []
+    seen_text, seen_names = set(), {}
+    setup_members: Dict[str, int] = {}   # setup method name -> index in members
+    for code in codes:
+        class_imports, class_header, class_members = _parse_test_class(code)
+        imports.extend(class_imports)
+        if class_header is None:
+            continue
+        header = header or class_header
+        for member in class_members:
+            normalized = re.sub(r"\s+", " ", member)
+            if normalized in seen_text:
+                continue
+            seen_text.add(normalized)
+            name = _member_name(member)
+            if name is not None:
+                annotations = _setup_annotations(member, name)
+                if annotations and name in setup_members:
+                    index = setup_members[name]
+                    if _setup_annotations(members[index], name) == annotations:
+                        members[index] = _merge_setup_bodies(members[index], member)
+                        continue
+                if annotations and name not in seen_names:
+                    setup_members[name] = len(members)
+                if name in seen_names:
+                    seen_names[name] += 1
+                    new_name = f"{name}_{seen_names[name]}"
+                    member = re.sub(rf"\b{re.escape(name)}(\s*\()", rf"{new_name}\1", member, count=1)
+                else:
+                    seen_names[name] = 1
+            elif member.rstrip().endswith(";"):
+                field = re.search(r"(\w+)\s*(?:=[^;]*)?;\s*$", member)
+                if field and field.group(1) in seen_names:
+                    continue  # same field declared with a different initializer
+                if field:
+                    seen_names[field.group(1)] = 1
+            members.append(member)
+
+    if header is None:
+        return "\n".join(codes)
+    lines = list(dict.fromkeys(imports))
+    out = "\n".join(lines) + ("\n\n" if lines else "")
+    out += header + " {\n\n"
+    out += "\n\n".join(textwrap.indent(m, "    ") for m in members)
+    out += "\n}\n"
+    return out
+
+
+# -----------------------
+# Concurrent generation
+# -----------------------
+def generate_in_chunks(batches: List[Any], generate_fn: Callable[[Any], str],
+                       max_workers: int = DEFAULT_CHUNK_WORKERS) -> str:
+    """Run generate_fn(batch) (a sub-AST or its prompt) for every batch concurrently and merge in batch order."""
+    if len(batches) == 1:
+        return generate_fn(batches[0])
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as pool:
+        responses = list(pool.map(generate_fn, batches))
+    return merge_test_classes(responses)
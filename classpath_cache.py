@@ -0,0 +1,224 @@
+import os
+import json
+import shlex
+import shutil
+import hashlib
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional
+
+from file_lock import FileLock
+from RunProjectResultGenerator import (MAX_BUILD_ERRORS, MVN_TIMEOUT, new_error_counts, parse_surefire_reports,
+                                       run_maven, run_process)
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+# One directory for every worker / process: entries are written atomically, resolution runs under a lock file
+CLASSPATH_CACHE_DIR = os.environ.get("CLASSPATH_CACHE_DIR", "classpath_cache")
+LOCK_STALE_SECONDS = 1800           # a lock older than this belongs to a crashed resolver
+JAVAC_COMMAND = shlex.split(os.environ["JAVAC_COMMAND"]) if os.environ.get("JAVAC_COMMAND") else ["javac"]
+JAVA_COMMAND = shlex.split(os.environ["JAVA_COMMAND"]) if os.environ.get("JAVA_COMMAND") else ["java"]
+# same launcher scripts/run_tests.py uses
+JUNIT_JAR = os.environ.get("JUNIT_JAR", os.path.join("lib", "junit-platform-console-standalone-1.10.2.jar"))
+DIRECT_REPORTS_DIR = os.path.join("target", "junit-reports")   # inside the project
+
+_POM_NS = "{http://maven.apache.org/POM/4.0.0}"
+
+
+# -----------------------
+# Cache key: project pom + local parent chain
+# -----------------------
+def _pom_parent(pom_file: str) -> Optional[str]:
+    """Local parent pom of pom_file (<parent><relativePath>, default ../pom.xml), if it exists on disk."""
+    try:
+        root = ET.parse(pom_file).getroot()
+    except (ET.ParseError, OSError):
+        return None
+    ns = _POM_NS if root.tag.startswith(_POM_NS) else ""
+    parent = root.find(f"{ns}parent")
+    if parent is None:
+        return None
+    relative = parent.find(f"{ns}relativePath")
+    if relative is not None and not (relative.text or "").strip():
+        return None  # <relativePath/>: parent comes from the repository only
+    path = os.path.join(os.path.dirname(pom_file), (relative.text.strip() if relative is not None else "../pom.xml"))
+    if os.path.isdir(path):
+        path = os.path.join(path, "pom.xml")
+    return os.path.abspath(path) if os.path.isfile(path) else None
+
+
+def pom_chain(project_path: str) -> List[str]:
+    """The project's pom.xml followed by its local parents (repository parents are pinned by the child's coordinates)."""
+    chain = []
+    pom = os.path.abspath(os.path.join(project_path, "pom.xml"))
+    while pom and pom not in chain:
+        chain.append(pom)
+        pom = _pom_parent(pom)
+    return chain
+
+
+def classpath_key(project_path: str, scope: str = "test", extra_args=None) -> str:
+    """Changes with any pom of the chain, the scope, and the mvn arguments (repository location, profiles)."""
+    hasher = hashlib.sha1(f"{scope}\n{' '.join(extra_args or [])}\n".encode("utf-8"))
+    for pom in pom_chain(project_path):
+        with open(pom, "rb") as f:
+            hasher.update(hashlib.sha1(f.read()).digest())
+    return hasher.hexdigest()
+
+
+# -----------------------
+# Shared store
+# -----------------------
+def _entry_path(key: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{key}.json")
+
+
+def load_entry(key: str, cache_dir: str = CLASSPATH_CACHE_DIR) -> Optional[Dict[str, Any]]:
+    """Cached entry, or None when missing, unreadable, or a jar of it has disappeared from the repository."""
+    try:
+        with open(_entry_path(key, cache_dir), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not all(os.path.exists(jar) for jar in entry.get("classpath", [])):
+        return None
+    return entry
+
+
+def save_entry(entry: Dict[str, Any], cache_dir: str = CLASSPATH_CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _entry_path(entry["key"], cache_dir)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f, indent=2)
+    os.replace(tmp, path)  # readers never see a half-written entry
+
+
+def resolve_classpath(project_path: str, scope: str = "test", extra_args=None, timeout: Optional[float] = MVN_TIMEOUT,
+                      cache_dir: str = CLASSPATH_CACHE_DIR, goals=None) -> Dict[str, Any]:
+    """
+    Dependency jars of the project for `scope`, from the shared cache when the pom chain is unchanged,
+    otherwise resolved with `mvn dependency:build-classpath` (plus any extra goals, e.g. "compile").
+    Returns the cache entry: {key, project, poms, scope, classpath, seconds, cached}.
+    """
+    key = classpath_key(project_path, scope, extra_args)
+    entry = load_entry(key, cache_dir)
+    if entry is None:
+        with FileLock(os.path.join(cache_dir, f"{key}.lock"), LOCK_STALE_SECONDS):
+            entry = load_entry(key, cache_dir)  # another worker may have resolved it while we waited
+            if entry is None:
+                output_file = os.path.abspath(os.path.join(cache_dir, f"{key}.{os.getpid()}.classpath"))
+                run = run_maven(project_path, list(goals or []) + ["dependency:build-classpath",
+                                f"-Dmdep.outputFile={output_file}", f"-Dmdep.includeScope={scope}"],
+                                os.path.join(cache_dir, f"{key}_log.txt"), extra_args=extra_args, timeout=timeout)
+                if run["returncode"] != 0 or not os.path.exists(output_file):
+                    raise RuntimeError(f"Could not resolve the classpath of {project_path} (see {run['log_file']})")
+                with open(output_file, "r", encoding="utf-8") as f:
+                    jars = [jar for jar in f.read().strip().split(os.pathsep) if jar]
+                os.remove(output_file)
+                entry = {"key": key, "project": os.path.abspath(project_path), "poms": pom_chain(project_path),
+                         "scope": scope, "classpath": jars, "seconds": run["seconds"]}
+                save_entry(entry, cache_dir)
+                return dict(entry, cached=False)
+    return dict(entry, cached=True)
+
+
+def project_classpath(project_path: str, scope: str = "test", extra_args=None, timeout: Optional[float] = MVN_TIMEOUT,
+                      cache_dir: str = CLASSPATH_CACHE_DIR) -> List[str]:
+    """target/classes + cached dependency jars; main sources are compiled by the same mvn call when missing."""
+    classes = os.path.join(os.path.abspath(project_path), "target", "classes")
+    goals = [] if os.path.isdir(classes) else ["compile"]
+    entry = resolve_classpath(project_path, scope, extra_args, timeout, cache_dir, goals=goals)
+    if entry["cached"] and not os.path.isdir(classes):
+        run = run_maven(project_path, ["compile"], os.path.join(cache_dir, f"{entry['key']}_compile_log.txt"),
+                        extra_args=extra_args, timeout=timeout)
+        if run["returncode"] != 0:
+            raise RuntimeError(f"Main sources of {project_path} do not compile (see {run['log_file']})")
+    return [classes] + entry["classpath"]
+
+
+# -----------------------
+# Direct javac / JUnit console runs (no Maven lifecycle)
+# -----------------------
+def main_classes_current(project_path: str) -> bool:
+    """target/classes was built from the current poms + src/main (state recorded by warm_build.py)."""
+    from warm_build import load_state, main_sources_hash
+    return (os.path.isdir(os.path.join(project_path, "target", "classes"))
+            and load_state(project_path).get("main_hash") == main_sources_hash(project_path))
+
+
+def direct_test_compile(project_path: str, log_file: str, extra_args=None, timeout: Optional[float] = MVN_TIMEOUT,
+                        cache_dir: str = CLASSPATH_CACHE_DIR, max_errors: Optional[int] = MAX_BUILD_ERRORS) -> Dict[str, Any]:
+    """
+    javac src/test/java into target/test-classes against the cached classpath (+ src/test/resources copied).
+    Main sources go through warm_build.warm_test_compile's mvn path only when they changed.
+    Same result dict as run_maven (javac diagnostics parsed into errors), plus mode / runner / classpath_cached.
+    """
+    from warm_build import warm_test_compile
+    project_path = os.path.abspath(project_path)
+    if not main_classes_current(project_path):
+        result = warm_test_compile(project_path, log_file, extra_args=extra_args, timeout=timeout, use_mvnd=False,
+                                   max_errors=max_errors)
+        result["runner"] = "mvn"
+        return result
+
+    entry = resolve_classpath(project_path, "test", extra_args, timeout, cache_dir)
+    test_root = os.path.join(project_path, "src", "test", "java")
+    test_classes = os.path.join(project_path, "target", "test-classes")
+    shutil.rmtree(test_classes, ignore_errors=True)
+    os.makedirs(test_classes)
+    resources = os.path.join(project_path, "src", "test", "resources")
+    if os.path.isdir(resources):
+        shutil.copytree(resources, test_classes, dirs_exist_ok=True)
+
+    files = [os.path.join(dirpath, name) for dirpath, _, names in os.walk(test_root)
+             for name in sorted(names) if name.endswith(".java")]
+    if not files:  # javac without sources only prints its usage and fails
+        print(f"No test sources in {test_root}, nothing to compile")
+        return {"returncode": 0, "timed_out": False, "aborted": False, "output_cut": False, "seconds": 0.0,
+                "stdout": "", "stderr": "", "log_file": None, "lines": 0, "errors": [],
+                "error_counts": new_error_counts(), "error_total": 0, "errors_truncated": False, "modules": [],
+                "mode": "direct", "runner": "javac", "classpath_cached": entry["cached"]}
+    classpath = [os.path.join(project_path, "target", "classes")] + entry["classpath"]
+    cmd = JAVAC_COMMAND + ["-encoding", "UTF-8", "-nowarn", "-Xmaxerrs", "1000", "-d", test_classes,
+                           "-cp", os.pathsep.join(classpath)] + files
+    result = run_process(cmd, project_path, log_file, timeout=timeout, max_errors=max_errors)
+    result.update(mode="direct", runner="javac", classpath_cached=entry["cached"])
+    return result
+
+
+def direct_run_tests(project_path: str, log_file: str, extra_args=None, timeout: Optional[float] = MVN_TIMEOUT,
+                     cache_dir: str = CLASSPATH_CACHE_DIR, junit_jar: str = JUNIT_JAR) -> Dict[str, Any]:
+    """
+    Run target/test-classes with the JUnit console launcher (after direct_test_compile).
+    Returns run_process's dict plus summary / details from the launcher's XML report.
+    """
+    if not os.path.exists(junit_jar):
+        raise FileNotFoundError(f"JUnit console launcher not found: {junit_jar} (set JUNIT_JAR)")
+    project_path = os.path.abspath(project_path)
+    entry = resolve_classpath(project_path, "test", extra_args, timeout, cache_dir)
+    test_classes = os.path.join(project_path, "target", "test-classes")
+    reports_dir = os.path.join(project_path, DIRECT_REPORTS_DIR)
+    shutil.rmtree(reports_dir, ignore_errors=True)
+    classpath = [test_classes, os.path.join(project_path, "target", "classes")] + entry["classpath"]
+    cmd = JAVA_COMMAND + ["-jar", os.path.abspath(junit_jar), "-cp", os.pathsep.join(classpath),
+                          "--scan-class-path", test_classes, f"--reports-dir={reports_dir}", "--disable-banner"]
+    result = run_process(cmd, project_path, log_file, timeout=timeout)
+    summary, details = parse_surefire_reports(reports_dir)
+    result.update(summary=summary, details=details)
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Resolve (or show the cached) test classpath of Maven projects")
+    parser.add_argument("projects", nargs="+")
+    parser.add_argument("--scope", default="test")
+    parser.add_argument("--cache-dir", default=CLASSPATH_CACHE_DIR)
+    args = parser.parse_args()
+
+    for project in args.projects:
+        resolved = resolve_classpath(project, args.scope, cache_dir=args.cache_dir)
+        origin = "cached" if resolved["cached"] else f"resolved in {resolved['seconds']}s"
+        print(f"{project}: {len(resolved['classpath'])} jars ({origin}, key {resolved['key'][:12]})")
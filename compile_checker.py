@@ -0,0 +1,182 @@
+import os
+import re
+import time
+import shlex
+import shutil
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import javalang
+
+from java_parse_service import parse_java
+from classpath_cache import project_classpath
+from RunProjectResultGenerator import categorize_error
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+JAVAC_COMMAND = shlex.split(os.environ["JAVAC_COMMAND"]) if os.environ.get("JAVAC_COMMAND") else ["javac"]
+JAVAC_FLAGS = ["-proc:none", "-implicit:none", "-nowarn", "-encoding", "UTF-8", "-Xmaxerrs", "500"]
+CHECK_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+# Files per javac call: javac start-up (~0.5s) is paid per call, diagnostics stay per file either way
+CHECK_BATCH_SIZE = 8
+JAVAC_TIMEOUT = 300
+CHECK_DIR = os.path.join("target", "compile-check")   # inside the project
+
+_DIAGNOSTIC = re.compile(r"^(.+\.java):(\d+): (error|warning): (.*)$")
+
+
+# -----------------------
+# Diagnostics
+# -----------------------
+def parse_javac_output(output: str) -> List[Dict[str, Any]]:
+    """
+    Structured javac diagnostics. Each "file:line: error: msg" header is followed by the source
+    line and a caret line (column = caret position) and sometimes symbol/location details.
+    """
+    diagnostics = []
+    current = None
+    for line in output.splitlines():
+        match = _DIAGNOSTIC.match(line)
+        if match:
+            path, row, severity, message = match.groups()
+            current = {"file": os.path.normpath(path), "line": int(row), "col": None, "severity": severity,
+                       "message": message, "category": categorize_error(message), "detail": []}
+            diagnostics.append(current)
+        elif current is not None:
+            if current["col"] is None and line.strip() == "^":
+                current["col"] = line.index("^") + 1
+            elif line.startswith("  ") and ":" in line and current["col"] is not None:
+                current["detail"].append(line.strip())  # symbol: ..., location: ...
+            elif re.match(r"^\d+ (errors?|warnings?)$", line):
+                current = None
+    return diagnostics
+
+
+def syntax_diagnostic(path: str) -> Optional[Dict[str, Any]]:
+    """javalang pre-check: files that do not parse are compiled on their own (a parse error in one
+    file would stop javac from attributing the rest of its batch). Not a verdict: javalang only knows
+    Java 8 and rejects records, text blocks, switch expressions etc."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            parse_java(f.read(), cache=False)
+        return None
+    except javalang.parser.JavaSyntaxError as e:
+        position = getattr(e.at, "position", None)
+        return {"file": path, "line": position.line if position else None, "col": position.column if position else None,
+                "severity": "error", "message": f"syntax error: {e.description}", "category": "syntax_error",
+                "detail": [], "source": "javalang"}
+    except (javalang.tokenizer.LexerError, UnicodeDecodeError) as e:
+        return {"file": path, "line": None, "col": None, "severity": "error", "message": f"syntax error: {e}",
+                "category": "syntax_error", "detail": [], "source": "javalang"}
+
+
+# -----------------------
+# Checking
+# -----------------------
+def _run_javac(files: List[str], classpath: List[str], sourcepath: str, out_root: str) -> Dict[str, Any]:
+    out_dir = tempfile.mkdtemp(prefix="batch-", dir=out_root)
+    cmd = JAVAC_COMMAND + JAVAC_FLAGS + ["-d", out_dir, "-cp", os.pathsep.join(classpath),
+                                         "-sourcepath", sourcepath] + files
+    start = time.perf_counter()
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", errors="replace",
+                              timeout=JAVAC_TIMEOUT)
+        output, returncode = proc.stdout + proc.stderr, proc.returncode
+    except subprocess.TimeoutExpired:
+        output, returncode = f"javac timed out after {JAVAC_TIMEOUT}s", None
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return {"files": files, "output": output, "returncode": returncode, "seconds": time.perf_counter() - start}
+
+
+def check_files(project_path: str, files: Optional[List[str]] = None, batch_size: int = CHECK_BATCH_SIZE,
+                workers: int = CHECK_WORKERS, classpath: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Compile test files (default: all of src/test/java) against the project classpath in parallel
+    javac batches. Returns {"files": {path: {"ok", "diagnostics"}}, "stats": {...}}. Only the requested
+    files are reported: diagnostics in other test sources javac read through -sourcepath are counted
+    in stats["unrequested_diagnostics"].
+    """
+    start = time.perf_counter()
+    test_root = os.path.join(project_path, "src", "test", "java")
+    if files is None:
+        files = [os.path.join(dirpath, name) for dirpath, _, names in os.walk(test_root)
+                 for name in sorted(names) if name.endswith(".java")]
+    files = [os.path.normpath(os.path.abspath(f)) for f in files]
+    classpath = classpath if classpath is not None else project_classpath(project_path)
+    classpath_seconds = time.perf_counter() - start
+
+    results = {path: {"ok": True, "diagnostics": []} for path in files}
+    compilable, unparsed = [], []
+    for path in files:
+        (unparsed if syntax_diagnostic(path) else compilable).append(path)
+
+    out_root = os.path.join(project_path, CHECK_DIR)
+    os.makedirs(out_root, exist_ok=True)
+    batches = [compilable[i:i + max(1, batch_size)] for i in range(0, len(compilable), max(1, batch_size))]
+    # javac decides on what javalang rejected, one file per run so real syntax errors stay contained
+    batches += [[path] for path in unparsed]
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="javac") as pool:
+        runs = list(pool.map(lambda batch: _run_javac(batch, classpath, test_root, out_root), batches))
+
+    unrequested = 0
+    for run in runs:
+        diagnostics = parse_javac_output(run["output"])
+        for diagnostic in diagnostics:
+            entry = results.get(os.path.normpath(os.path.abspath(diagnostic["file"])))
+            if entry is None:
+                unrequested += 1
+                continue
+            entry["diagnostics"].append(diagnostic)
+            if diagnostic["severity"] == "error":
+                entry["ok"] = False
+        if run["returncode"] is None or (run["returncode"] != 0 and not diagnostics):
+            for path in run["files"]:  # javac failed without per-file diagnostics (bad flags, timeout)
+                results[path] = {"ok": False, "diagnostics": [{"file": path, "line": None, "col": None,
+                                                               "severity": "error", "message": run["output"].strip()[:500],
+                                                               "category": "other", "detail": []}]}
+
+    failed = [path for path in files if not results[path]["ok"]]
+    return {
+        "files": results,
+        "stats": {
+            "files": len(files),
+            "ok": len(files) - len(failed),
+            "failed": len(failed),
+            "javalang_rejected": len(unparsed),
+            "javac_runs": len(runs),
+            "unrequested_diagnostics": unrequested,
+            "classpath_seconds": round(classpath_seconds, 3),
+            "javac_seconds": round(sum(run["seconds"] for run in runs), 3),
+            "wall_seconds": round(time.perf_counter() - start, 3),
+        },
+    }
+
+
+def failing_files(check: Dict[str, Any]) -> List[str]:
+    return sorted(path for path, entry in check["files"].items() if not entry["ok"])
+
+
+if __name__ == "__main__":
+    import json
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile generated test files one batch at a time, without a Maven build")
+    parser.add_argument("project", help="Maven project root (with pom.xml)")
+    parser.add_argument("files", nargs="*", help="test files to check (default: all of src/test/java)")
+    parser.add_argument("--batch-size", type=int, default=CHECK_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=CHECK_WORKERS)
+    parser.add_argument("--move-broken", metavar="DIR", help="move failing files here (broken_code_mover layout)")
+    parser.add_argument("--report", default="compile_check_report.json")
+    args = parser.parse_args()
+
+    check = check_files(args.project, args.files or None, args.batch_size, args.workers)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(check, f, indent=4)
+    print(json.dumps(check["stats"], indent=2))
+    if args.move_broken:
+        from broken_code_mover import move_broken_files
+        move_broken_files(failing_files(check), args.project, args.move_broken)
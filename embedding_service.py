@@ -0,0 +1,179 @@
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+EMBEDDING_CACHE_PATH = "embedding_cache.sqlite"
+EMBED_BATCH_SIZE = 64
+EMBED_THREADS = None          # torch.set_num_threads on CPU; None = torch default
+QUERY_MEMO_SIZE = 1024        # in-memory LRU in front of SQLite for repeated queries
+LOOKUP_CHUNK = 500            # keys per SQLite IN (...) lookup
+PREPROCESS_VERSION = "newlines-to-spaces"  # bump when preprocess() changes; part of the KB index settings
+
+_service_lock = threading.Lock()
+_SERVICES: Dict[str, "EmbeddingService"] = {}
+
+
+def embedding_key(model_name: str, text: str) -> str:
+    hasher = hashlib.sha256()
+    hasher.update(model_name.encode("utf-8"))
+    hasher.update(b"\0")
+    hasher.update(text.encode("utf-8", errors="surrogatepass"))
+    return hasher.hexdigest()
+
+
+def preprocess(text: str) -> str:
+    """Same text cleanup HuggingFaceEmbeddings applies before encoding."""
+    return text.replace("\n", " ")
+
+
+def length_buckets(texts: List[str], batch_size: int) -> List[List[int]]:
+    """Indices of `texts` grouped into batches of similar length (longest first) to minimise padding."""
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+class EmbeddingService(Embeddings):
+    """
+    LangChain Embeddings with explicit batching and a persistent cache.
+
+    Texts are preprocessed like HuggingFaceEmbeddings (newlines -> spaces), then looked up by
+    sha256(model, text) in SQLite first; only unseen texts are encoded, de-duplicated and
+    length-bucketed into batches of `batch_size`. Vectors are stored as float32, so identical KB
+    chunks and repeated queries are embedded once ever.
+    `encode_fn(texts) -> vectors` replaces the sentence-transformers model if given.
+    """
+
+    def __init__(self, model_name: str, cache_path: Optional[str] = EMBEDDING_CACHE_PATH,
+                 batch_size: int = EMBED_BATCH_SIZE, num_threads: Optional[int] = EMBED_THREADS,
+                 encode_fn: Optional[Callable[[List[str]], List[List[float]]]] = None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self._encode_fn = encode_fn
+        self._model = None
+        self._lock = threading.Lock()
+        self._memo: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "encoded": 0, "batches": 0, "encode_seconds": 0.0}
+        self._conn = None
+        if cache_path:
+            self._conn = sqlite3.connect(cache_path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._conn.commit()
+
+    # -----------------------
+    # Model
+    # -----------------------
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        if self._encode_fn is not None:
+            return [list(v) for v in self._encode_fn(texts)]
+        if self._model is None:
+            import torch
+            from sentence_transformers import SentenceTransformer
+            if self.num_threads:
+                torch.set_num_threads(self.num_threads)
+            self._model = SentenceTransformer(self.model_name)
+        # same settings as HuggingFaceEmbeddings, so vectors match indexes built before
+        vectors = self._model.encode(texts, batch_size=len(texts), show_progress_bar=False)
+        return vectors.tolist()
+
+    # -----------------------
+    # Cache
+    # -----------------------
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        if self._conn is None:
+            return found
+        for i in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[i:i + LOOKUP_CHUNK]
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = array("f", blob).tolist()
+        return found
+
+    def _store(self, vectors: Dict[str, List[float]]):
+        if self._conn is None or not vectors:
+            return
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+            [(key, array("f", vector).tobytes()) for key, vector in vectors.items()]
+        )
+        self._conn.commit()
+
+    # -----------------------
+    # Embeddings interface
+    # -----------------------
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = [preprocess(t) for t in texts]
+        keys = [embedding_key(self.model_name, t) for t in texts]
+        with self._lock:
+            found = self._lookup(list(dict.fromkeys(keys)))
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in found:
+                    missing.setdefault(key, text)
+            self.stats["hits"] += len(texts) - sum(1 for k in keys if k not in found)
+            self.stats["misses"] += len(missing)
+
+            missing_keys = list(missing)
+            missing_texts = [missing[k] for k in missing_keys]
+            computed = {}
+            start = time.perf_counter()
+            for bucket in length_buckets(missing_texts, self.batch_size):
+                vectors = self._encode([missing_texts[i] for i in bucket])
+                for i, vector in zip(bucket, vectors):
+                    # round through float32 so a fresh vector equals its cached copy
+                    computed[missing_keys[i]] = array("f", vector).tolist()
+                self.stats["batches"] += 1
+            self.stats["encoded"] += len(computed)
+            self.stats["encode_seconds"] += time.perf_counter() - start
+            self._store(computed)
+        found.update(computed)
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = embedding_key(self.model_name, preprocess(text))
+        with self._lock:
+            vector = self._memo.get(key)
+            if vector is not None:
+                self._memo.move_to_end(key)
+                self.stats["hits"] += 1
+                return vector
+        vector = self.embed_documents([text])[0]
+        with self._lock:
+            self._memo[key] = vector
+            while len(self._memo) > QUERY_MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return vector
+
+    def cache_stats(self) -> Dict[str, float]:
+        stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["encode_seconds"] = round(stats["encode_seconds"], 3)
+        return stats
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def get_embedding_service(model_name: str) -> EmbeddingService:
+    with _service_lock:
+        service = _SERVICES.get(model_name)
+        if service is None:
+            service = _SERVICES[model_name] = EmbeddingService(model_name)
+        return service
@@ -0,0 +1,117 @@
+import math
+from typing import Any, Dict, Optional
+
+import numpy as np
+import faiss
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+DEFAULT_PQ_M = 16            # sub-quantizers for IVF-PQ (must divide the dimension; adjusted down if not)
+DEFAULT_PQ_BITS = 8
+DEFAULT_HNSW_M = 32
+DEFAULT_NPROBE = 8
+DEFAULT_EF_SEARCH = 64
+DEFAULT_TRAIN_SAMPLE = 20000
+MIN_POINTS_PER_CENTROID = 39  # below this faiss k-means warns and quality drops
+RETRAIN_GROWTH = 2            # retrain IVF once auto_nlist for the current size is this many times the trained nlist
+
+
+def auto_nlist(count: int) -> int:
+    """~4*sqrt(n) inverted lists, but never more than the training data can support."""
+    nlist = int(4 * math.sqrt(max(count, 1)))
+    return max(1, min(nlist, count // MIN_POINTS_PER_CENTROID or 1))
+
+
+def pq_subquantizers(dim: int, requested: int) -> int:
+    m = max(1, min(requested, dim))
+    while dim % m:
+        m -= 1
+    return m
+
+
+def pq_bits(count: int) -> int:
+    """8-bit codebooks need 256 * MIN_POINTS_PER_CENTROID training points; use smaller ones for small KBs."""
+    bits = DEFAULT_PQ_BITS
+    while bits > 4 and count < (1 << bits) * MIN_POINTS_PER_CENTROID:
+        bits -= 1
+    return bits
+
+
+def build_params(index_type: str, count: int, dim: int, nlist: Optional[int] = None,
+                 pq_m: int = DEFAULT_PQ_M, hnsw_m: int = DEFAULT_HNSW_M) -> Dict[str, Any]:
+    """The parameters that shape the index structure (a change means rebuilding it)."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type {index_type!r}; expected one of {INDEX_TYPES}")
+    params = {"index_type": index_type}
+    if index_type in ("ivf_flat", "ivf_pq"):
+        params["nlist"] = nlist or auto_nlist(count)
+    if index_type == "ivf_pq":
+        params["pq_m"] = pq_subquantizers(dim, pq_m)
+        params["pq_bits"] = pq_bits(count)
+    if index_type == "hnsw":
+        params["hnsw_m"] = hnsw_m
+    return params
+
+
+def new_index(dim: int, params: Dict[str, Any]) -> faiss.Index:
+    index_type = params["index_type"]
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+    if index_type == "hnsw":
+        return faiss.IndexHNSWFlat(dim, params["hnsw_m"])
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "ivf_flat":
+        return faiss.IndexIVFFlat(quantizer, dim, params["nlist"])
+    return faiss.IndexIVFPQ(quantizer, dim, params["nlist"], params["pq_m"], params["pq_bits"])
+
+
+def build_index(vectors: np.ndarray, params: Dict[str, Any],
+                train_sample: int = DEFAULT_TRAIN_SAMPLE, seed: int = 0) -> faiss.Index:
+    """
+    Empty, trained index for `vectors` (float32, shape (n, d)). IVF quantizers are trained on
+    at most `train_sample` random rows; the caller adds the vectors (so ids stay in its hands).
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    index = new_index(vectors.shape[1], params)
+    if not index.is_trained:
+        sample = vectors
+        if len(vectors) > train_sample:
+            rows = np.random.default_rng(seed).choice(len(vectors), train_sample, replace=False)
+            sample = vectors[rows]
+        index.train(sample)
+    return index
+
+
+def set_search_params(index: faiss.Index, nprobe: int = DEFAULT_NPROBE, ef_search: int = DEFAULT_EF_SEARCH):
+    """Query-time knobs; safe to change without rebuilding."""
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    except RuntimeError:
+        pass  # not an IVF index
+    hnsw = getattr(index, "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search
+
+
+def supports_remove(index_type: str) -> bool:
+    """
+    Only flat indexes drop vectors cleanly. HNSW graphs cannot, and IVF lists would keep centroids
+    trained on chunks that are gone; deleting from either means rebuilding the index.
+    """
+    return index_type == "flat"
+
+
+def needs_retrain(index: faiss.Index, count: int, nlist: Optional[int] = None) -> bool:
+    """
+    True when an IVF index with an automatic nlist has outgrown its quantizer: the KB now holds
+    `count` chunks and auto_nlist(count) is RETRAIN_GROWTH times the nlist it was trained with.
+    """
+    if nlist:
+        return False  # fixed by config; a different value already rebuilds via the index settings
+    try:
+        trained_nlist = faiss.extract_index_ivf(index).nlist
+    except RuntimeError:
+        return False  # not an IVF index
+    return auto_nlist(count) >= RETRAIN_GROWTH * trained_nlist
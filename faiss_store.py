@@ -0,0 +1,78 @@
+import os
+from collections.abc import Mapping
+from typing import Dict, Iterator, Union
+
+import numpy as np
+import faiss
+
+# -----------------------
+# File layout (inside the FAISS_INDEX_PATH folder)
+# -----------------------
+INDEX_FILE = "index.faiss"      # faiss.write_index format
+IDS_FILE = "index_ids.npy"      # fixed-width UTF-8 docstore ids, row i = vector i
+LEGACY_PICKLE = "index.pkl"     # FAISS.save_local's pickled (docstore, ids)
+
+# IO_FLAG_MMAP_IFC (faiss >= 1.8) also maps flat/HNSW vector storage, not just IVF lists
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+
+
+class IdMap(Mapping):
+    """Read-only {vector position: docstore id} over a memory-mapped .npy of fixed-width bytes."""
+
+    def __init__(self, array: np.ndarray):
+        self._array = array
+
+    def __getitem__(self, position: int) -> str:
+        if not 0 <= position < len(self._array):
+            raise KeyError(position)
+        return self._array[position].decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self._array)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self._array)))
+
+
+def has_saved_index(folder: str) -> bool:
+    return os.path.exists(os.path.join(folder, INDEX_FILE)) and os.path.exists(os.path.join(folder, IDS_FILE))
+
+
+def save_index(folder: str, index: faiss.Index, index_to_docstore_id: Dict[int, str]):
+    """Write the index and id map without pickle (temp files + os.replace, so readers never see half a file)."""
+    os.makedirs(folder, exist_ok=True)
+    ids = [index_to_docstore_id[i].encode("utf-8") for i in range(len(index_to_docstore_id))]
+    width = max((len(i) for i in ids), default=1) or 1
+    index_path = os.path.join(folder, INDEX_FILE)
+    ids_path = os.path.join(folder, IDS_FILE)
+    faiss.write_index(index, index_path + ".tmp")
+    with open(ids_path + ".tmp", "wb") as f:
+        np.save(f, np.array(ids, dtype=f"S{width}"))
+    os.replace(index_path + ".tmp", index_path)
+    os.replace(ids_path + ".tmp", ids_path)
+    # a stale pickle next to the new files would be picked up by FAISS.load_local
+    legacy = os.path.join(folder, LEGACY_PICKLE)
+    if os.path.exists(legacy):
+        os.remove(legacy)
+
+
+def load_index(folder: str, writable: bool = False):
+    """
+    (index, index_to_docstore_id). Read-only loads map the files, so every worker process
+    shares the same pages through the OS page cache; writable loads read them into the heap.
+    """
+    index_path = os.path.join(folder, INDEX_FILE)
+    ids_path = os.path.join(folder, IDS_FILE)
+    if writable:
+        ids = np.load(ids_path)
+        return faiss.read_index(index_path), {i: value.decode("utf-8") for i, value in enumerate(ids)}
+    try:
+        index = faiss.read_index(index_path, MMAP_FLAGS)
+    except RuntimeError:
+        # index type without mmap support in this faiss build
+        index = faiss.read_index(index_path)
+    return index, IdMap(np.load(ids_path, mmap_mode="r"))
+
+
+def is_read_only(index_to_docstore_id: Union[Dict[int, str], Mapping]) -> bool:
+    return isinstance(index_to_docstore_id, IdMap)
@@ -0,0 +1,69 @@
+import os
+import time
+from typing import Optional
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+LOCK_STALE_SECONDS = 1800   # a lock older than this belongs to a crashed holder
+LOCK_POLL_SECONDS = 0.5
+
+
+def _owner_gone(path: str) -> bool:
+    """True when the lock file names a pid that no longer runs on this host (not checked on Windows)."""
+    if os.name == "nt":
+        return False  # os.kill there would terminate the process
+    try:
+        with open(path, "r", encoding="ascii") as f:
+            pid = int(f.read() or 0)
+    except (OSError, ValueError):
+        return False
+    if pid <= 0:
+        return False  # created, pid not written yet
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass  # exists, owned by someone else
+    return False
+
+
+class FileLock:
+    """
+    Cross-process lock file (O_EXCL create holding the owner's pid), e.g. so only one worker
+    resolves a classpath or rewrites the KB index at a time. A lock whose owner died, or older than
+    stale_seconds (None = never), is taken over.
+    """
+
+    def __init__(self, path: str, stale_seconds: Optional[float] = LOCK_STALE_SECONDS):
+        self.path = path
+        self.stale_seconds = stale_seconds
+
+    def _stale(self) -> bool:
+        if self.stale_seconds is not None and time.time() - os.path.getmtime(self.path) > self.stale_seconds:
+            return True
+        return _owner_gone(self.path)
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode("ascii"))
+                os.close(fd)
+                return self
+            except FileExistsError:
+                try:
+                    if self._stale():
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    continue  # released between the two calls
+                time.sleep(LOCK_POLL_SECONDS)
+
+    def __exit__(self, *exc):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
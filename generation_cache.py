@@ -0,0 +1,134 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+GENERATION_CACHE_PATH = "generation_cache.sqlite"
+DEFAULT_MAX_ENTRIES = 20000
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # stored responses only
+
+_cache_lock = threading.Lock()
+_GENERATION_CACHE = None
+
+
+def make_cache_key(ast_json: Dict[str, Any], prompt_template: str, model: str,
+                   temperature: Optional[float] = None, context: str = "") -> str:
+    """
+    Content address of one generation: AST (tree_to_json output) + prompt template +
+    model + temperature + retrieved context. Any change in one of them is a miss.
+    """
+    hasher = hashlib.sha256()
+    for part in (
+        json.dumps(ast_json, sort_keys=True, ensure_ascii=False),
+        prompt_template,
+        model,
+        repr(temperature),
+        context or "",
+    ):
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+class GenerationCache:
+    """
+    Persistent (SQLite) cache of generated tests: key -> (response, package, imports).
+
+    Size bounded by entry count and stored bytes; the least recently used entries are
+    evicted first. SQLite in WAL mode lets several worker processes share one file.
+    """
+
+    def __init__(self, path: str = GENERATION_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS generations ("
+                " key TEXT PRIMARY KEY,"
+                " response TEXT NOT NULL,"
+                " package TEXT,"
+                " imports TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON generations(last_access)")
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[str], List[str]]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, package, imports FROM generations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE generations SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        response, package, imports = row
+        return response, package, json.loads(imports)
+
+    def put(self, key: str, response: str, package: Optional[str], imports: Optional[List[str]]):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO generations (key, response, package, imports, size, created, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, response, package, json.dumps(imports or []), size, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations").fetchone()
+        while count > self.max_entries or (self.max_bytes and total > self.max_bytes):
+            # drop the least recently used entries; over the byte budget go in 1% steps
+            batch = count - self.max_entries if count > self.max_entries else max(1, count // 100)
+            self._conn.execute(
+                "DELETE FROM generations WHERE key IN"
+                " (SELECT key FROM generations ORDER BY last_access ASC LIMIT ?)", (batch,)
+            )
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations").fetchone()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM generations")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_generation_cache() -> GenerationCache:
+    global _GENERATION_CACHE
+    with _cache_lock:
+        if _GENERATION_CACHE is None:
+            _GENERATION_CACHE = GenerationCache(GENERATION_CACHE_PATH)
+        return _GENERATION_CACHE
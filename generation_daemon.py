@@ -0,0 +1,343 @@
+import json
+import time
+import uuid
+import queue
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8765
+DAEMON_URL = f"http://{DAEMON_HOST}:{DAEMON_PORT}"
+DAEMON_WORKERS = 4          # concurrent generations; the LLM backend bounds in-flight requests itself
+MAX_BATCH = 16              # jobs drained per dispatch: the window in which identical requests are de-duplicated
+BATCH_WAIT = 0.05           # seconds to wait for more jobs once one arrived
+MAX_FINISHED_JOBS = 2000    # finished jobs kept for status queries (oldest dropped first)
+MAX_WAIT_SECONDS = 60.0     # cap for GET /jobs/<id>?wait=
+MODES = ("rag", "norag")
+
+Generator = Callable[[str, Optional[str]], Tuple[str, Any, Any]]
+
+
+def generate_rag(source: str, test_root: Optional[str] = None):
+    from AutomateRagOPT import GenerateTestOPT
+    return GenerateTestOPT(source, test_root=test_root)
+
+
+def generate_norag(source: str, test_root: Optional[str] = None):
+    from AutomatewithoutRag import GenerateTestWithoutRag
+    return GenerateTestWithoutRag(source)
+
+
+DEFAULT_GENERATORS: Dict[str, Generator] = {"rag": generate_rag, "norag": generate_norag}
+
+
+def warm_up(modes=MODES):
+    """Load what the first job would otherwise pay for: RAG pipeline (embeddings, FAISS, chain) and LLM client."""
+    from llm_backend import get_llm_backend
+    get_llm_backend()
+    if "rag" in modes:
+        from AutomateRagOPT import create_rag_pipeline, get_embedding_obj
+        get_embedding_obj()
+        create_rag_pipeline()
+
+
+class GenerationDaemon:
+    """
+    Job queue in front of the generation functions. A dispatcher drains up to MAX_BATCH queued jobs
+    (waiting BATCH_WAIT after the first) and de-duplicates them: identical requests (mode, test root,
+    source) share one generation. Each distinct request then runs on its own in a DAEMON_WORKERS
+    pool; there is no batched LLM call. Every job keeps a status record: queued -> running -> done | error.
+    """
+
+    def __init__(self, generators: Optional[Dict[str, Generator]] = None, workers: int = DAEMON_WORKERS,
+                 max_batch: int = MAX_BATCH, batch_wait: float = BATCH_WAIT):
+        self.generators = dict(generators or DEFAULT_GENERATORS)
+        self.max_batch = max(1, max_batch)
+        self.batch_wait = batch_wait
+        self.pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="gen-worker")
+        self.queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.payloads: Dict[str, Dict[str, Any]] = {}
+        self.cond = threading.Condition()
+        self.stats = {"submitted": 0, "done": 0, "errors": 0, "batches": 0, "deduplicated": 0, "running": 0}
+        self.started = time.time()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="gen-dispatcher", daemon=True)
+        self._dispatcher.start()
+
+    # ---- submission / status ----
+    def submit(self, source: str, mode: str = "norag", test_root: Optional[str] = None,
+               generated: Optional[List[str]] = None) -> str:
+        """generated: test files the caller wrote under test_root, never mined as examples."""
+        if mode not in self.generators:
+            raise ValueError(f"unknown mode {mode!r}; expected one of {sorted(self.generators)}")
+        if generated:
+            from project_test_index import mark_generated
+            mark_generated(generated)
+        job_id = uuid.uuid4().hex
+        with self.cond:
+            self.jobs[job_id] = {"id": job_id, "status": "queued", "mode": mode, "submitted": time.time(),
+                                 "started": None, "finished": None, "result": None, "error": None}
+            self.payloads[job_id] = {"source": source, "mode": mode, "test_root": test_root}
+            self.stats["submitted"] += 1
+        self.queue.put(job_id)
+        return job_id
+
+    def status(self, job_id: str, wait: float = 0.0) -> Optional[Dict[str, Any]]:
+        """Job record (a copy); with wait > 0 blocks until the job finished or the wait ran out."""
+        deadline = time.time() + min(wait, MAX_WAIT_SECONDS)
+        with self.cond:
+            while True:
+                job = self.jobs.get(job_id)
+                if job is None:
+                    return None
+                remaining = deadline - time.time()
+                if job["status"] in ("done", "error") or remaining <= 0:
+                    return dict(job)
+                self.cond.wait(remaining)
+
+    def health(self) -> Dict[str, Any]:
+        with self.cond:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return {"uptime": round(time.time() - self.started, 1), "queue_depth": self.queue.qsize(),
+                    "jobs": counts, **self.stats}
+
+    # ---- dispatch ----
+    def _collect(self) -> List[str]:
+        first = self.queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.time() + self.batch_wait
+        while len(batch) < self.max_batch:
+            try:
+                job_id = self.queue.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                break
+            if job_id is None:
+                self.queue.put(None)  # let the loop see the stop marker after this batch
+                break
+            batch.append(job_id)
+        return batch
+
+    def _dispatch(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                return
+            groups: Dict[tuple, List[str]] = {}
+            with self.cond:
+                self.stats["batches"] += 1
+                for job_id in batch:
+                    payload = self.payloads[job_id]
+                    key = (payload["mode"], payload["test_root"],
+                           hashlib.sha1(payload["source"].encode("utf-8")).hexdigest())
+                    groups.setdefault(key, []).append(job_id)
+                    if len(groups[key]) > 1:
+                        self.stats["deduplicated"] += 1
+            for job_ids in groups.values():
+                self.pool.submit(self._run, job_ids)
+
+    def _run(self, job_ids: List[str]):
+        start = time.time()
+        with self.cond:
+            payload = [self.payloads.pop(job_id) for job_id in job_ids][0]
+            for job_id in job_ids:
+                self.jobs[job_id].update(status="running", started=start)
+            self.stats["running"] += 1
+        result, error = None, None
+        try:
+            test_code, package, imports = self.generators[payload["mode"]](payload["source"], payload["test_root"])
+            result = {"test_code": test_code, "package": package, "imports": imports}
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finished = time.time()
+        with self.cond:
+            self.stats["running"] -= 1
+            for job_id in job_ids:
+                job = self.jobs[job_id]
+                job.update(status="error" if error else "done", finished=finished, result=result, error=error,
+                           queued_seconds=round(start - job["submitted"], 3),
+                           run_seconds=round(finished - start, 3), batch_shared=len(job_ids))
+                self.stats["errors" if error else "done"] += 1
+            self._evict()
+            self.cond.notify_all()
+
+    def _evict(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["status"] in ("done", "error")]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def close(self):
+        self.queue.put(None)
+        self._dispatcher.join()
+        self.pool.shutdown(wait=True)
+
+
+# -----------------------
+# HTTP API
+# -----------------------
+class DaemonHandler(BaseHTTPRequestHandler):
+    """
+    POST /jobs         {"source", "mode", "test_root", "generated"}  -> 202 {"id", "status"}
+    POST /jobs/batch   {"jobs": [{...}, ...]}                        -> 202 {"ids": [...]}  (one round trip; jobs run as above)
+    GET  /jobs/<id>[?wait=seconds]                                   -> job record
+    GET  /health                                                     -> queue depth and counters
+    "generated" (optional): the client's generated test files, skipped when mining test_root in "rag" mode.
+    """
+
+    protocol_version = "HTTP/1.1"
+    daemon: GenerationDaemon = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _submit(self, request: dict) -> str:
+        return self.daemon.submit(request["source"], request.get("mode", "norag"), request.get("test_root"),
+                                  request.get("generated"))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/jobs":
+                self._send_json(202, {"id": self._submit(request), "status": "queued"})
+            elif self.path == "/jobs/batch":
+                self._send_json(202, {"ids": [self._submit(job) for job in request.get("jobs", [])]})
+            else:
+                self._send_json(404, {"error": f"unknown path {self.path}"})
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": f"bad request: {e}"})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send_json(200, self.daemon.health())
+        elif url.path.startswith("/jobs/"):
+            wait = float(parse_qs(url.query).get("wait", ["0"])[0])
+            job = self.daemon.status(url.path[len("/jobs/"):], wait=wait)
+            if job is None:
+                self._send_json(404, {"error": "unknown job"})
+            else:
+                self._send_json(200, job)
+        else:
+            self._send_json(404, {"error": f"unknown path {url.path}"})
+
+
+def start_daemon_server(daemon: GenerationDaemon, host: str = DAEMON_HOST,
+                        port: int = DAEMON_PORT) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve `daemon` on a background thread; port=0 picks a free port. Returns (server, base_url)."""
+    handler = type("BoundDaemonHandler", (DaemonHandler,), {"daemon": daemon})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="gen-daemon-http", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+# -----------------------
+# Client
+# -----------------------
+class DaemonError(Exception):
+    pass
+
+
+class DaemonClient:
+    """Submit jobs to a running generation daemon; generate() mirrors GenerateTestOPT's return value."""
+
+    def __init__(self, url: str = DAEMON_URL, timeout: float = 30.0):
+        import httpx
+        self.url = url.rstrip("/")
+        self.http = httpx.Client(timeout=timeout)
+
+    def submit(self, source: str, mode: str = "norag", test_root: Optional[str] = None,
+               generated: Optional[List[str]] = None) -> str:
+        response = self.http.post(f"{self.url}/jobs", json={"source": source, "mode": mode, "test_root": test_root,
+                                                            "generated": generated})
+        response.raise_for_status()
+        return response.json()["id"]
+
+    def submit_many(self, sources: List[str], mode: str = "norag", test_root: Optional[str] = None,
+                    generated: Optional[List[str]] = None) -> List[str]:
+        jobs = [{"source": source, "mode": mode, "test_root": test_root} for source in sources]
+        if jobs:
+            jobs[0]["generated"] = generated  # registered once, before any of the batch runs
+        response = self.http.post(f"{self.url}/jobs/batch", json={"jobs": jobs})
+        response.raise_for_status()
+        return response.json()["ids"]
+
+    def status(self, job_id: str, wait: float = 0.0) -> Dict[str, Any]:
+        response = self.http.get(f"{self.url}/jobs/{job_id}", params={"wait": wait},
+                                 timeout=self.http.timeout.read + wait)
+        response.raise_for_status()
+        return response.json()
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Long-poll until the job finished; raises DaemonError for failed jobs."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            remaining = MAX_WAIT_SECONDS if deadline is None else min(MAX_WAIT_SECONDS, deadline - time.time())
+            if remaining <= 0:
+                raise DaemonError(f"job {job_id} still running after {timeout}s")
+            job = self.status(job_id, wait=remaining)
+            if job["status"] == "done":
+                return job
+            if job["status"] == "error":
+                raise DaemonError(job["error"])
+
+    def generate(self, source: str, mode: str = "norag", test_root: Optional[str] = None,
+                 timeout: Optional[float] = None, generated: Optional[List[str]] = None):
+        result = self.wait(self.submit(source, mode, test_root, generated), timeout)["result"]
+        return result["test_code"], result["package"], result["imports"]
+
+    def health(self) -> Dict[str, Any]:
+        response = self.http.get(f"{self.url}/health")
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self.http.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Long-running test generation daemon")
+    parser.add_argument("--host", default=DAEMON_HOST)
+    parser.add_argument("--port", type=int, default=DAEMON_PORT)
+    parser.add_argument("--workers", type=int, default=DAEMON_WORKERS)
+    parser.add_argument("--no-warm", action="store_true", help="skip loading the RAG pipeline at startup")
+    args = parser.parse_args()
+
+    if not args.no_warm:
+        start = time.time()
+        try:
+            warm_up()
+            print(f"Pipeline warm in {time.time() - start:.1f}s")
+        except Exception as e:
+            print(f"Warm-up failed ({type(e).__name__}: {e}); RAG jobs will retry on first use")
+    server = ThreadingHTTPServer((args.host, args.port),
+                                 type("BoundDaemonHandler", (DaemonHandler,),
+                                      {"daemon": GenerationDaemon(workers=args.workers)}))
+    server.daemon_threads = True
+    print(f"Generation daemon listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,215 @@
+import os
+import re
+import json
+import math
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain.schema import Document
+from langchain_core.retrievers import BaseRetriever
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60              # rank constant of reciprocal rank fusion (60 = value from the original paper)
+MIN_TOKEN_LENGTH = 2
+BM25_FORMAT = 1         # bump when tokenize_code changes; saved indexes of another format are rebuilt
+
+# Mockito.when, @ParameterizedTest, assertEquals, org.junit.jupiter.api.Test ...
+_IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*(?:\.[A-Za-z_$][\w$]*)*")
+_CAMEL_PARTS = re.compile(r"[A-Z]+(?=[A-Z][a-z]|\d|\b)|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize_code(text: str) -> List[str]:
+    """
+    Identifier-aware tokens: every dotted name is kept whole and split on dots, and every
+    part is kept whole and split on camelCase / underscores, all lowercased.
+    'Mockito.when' -> mockito.when, mockito, when; 'assertEquals' -> assertequals, assert, equals.
+    """
+    tokens = []
+    for match in _IDENTIFIER.finditer(text):
+        name = match.group(0)
+        parts = name.split(".")
+        if len(parts) > 1:
+            tokens.append(name.lower())
+        for part in parts:
+            tokens.append(part.lower())
+            pieces = [p for chunk in part.split("_") for p in _CAMEL_PARTS.findall(chunk)]
+            if len(pieces) > 1:
+                tokens.extend(p.lower() for p in pieces)
+    return [t for t in tokens if len(t) >= MIN_TOKEN_LENGTH]
+
+
+class BM25Index:
+    """
+    In-memory inverted index (Okapi BM25) over docstore ids. Documents can be added and removed
+    by id, and the index saved as JSON, so a KB change only touches the chunks that changed.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.ids: List[Optional[str]] = []      # by position; None once removed (until compact)
+        self.lengths: List[int] = []
+        self.positions: Dict[str, int] = {}
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.total_length = 0
+
+    @classmethod
+    def build(cls, items: Iterable[Tuple[str, str]], **kwargs) -> "BM25Index":
+        """items: (docstore id, text) pairs."""
+        index = cls(**kwargs)
+        for doc_id, text in items:
+            index.add(doc_id, text)
+        return index
+
+    def add(self, doc_id: str, text: str):
+        if doc_id in self.positions:
+            self.remove([doc_id])
+        position = len(self.ids)
+        counts = Counter(tokenize_code(text))
+        self.ids.append(doc_id)
+        self.positions[doc_id] = position
+        self.lengths.append(sum(counts.values()))
+        self.total_length += self.lengths[-1]
+        for token, tf in counts.items():
+            self.postings[token][position] = tf
+
+    def remove(self, doc_ids: Iterable[str]):
+        """Drop documents by id (unknown ids are ignored); one pass over the postings per call."""
+        removed = {self.positions.pop(doc_id) for doc_id in doc_ids if doc_id in self.positions}
+        if not removed:
+            return
+        for position in removed:
+            self.ids[position] = None
+            self.total_length -= self.lengths[position]
+            self.lengths[position] = 0
+        for token in list(self.postings):
+            postings = self.postings[token]
+            for position in removed.intersection(postings):
+                del postings[position]
+            if not postings:
+                del self.postings[token]
+
+    def compact(self):
+        """Renumber positions so removed documents no longer take a slot."""
+        if len(self.positions) == len(self.ids):
+            return
+        renumber = {old: new for new, old in enumerate(sorted(self.positions.values()))}
+        self.ids = [self.ids[old] for old in sorted(renumber)]
+        self.lengths = [self.lengths[old] for old in sorted(renumber)]
+        self.positions = {doc_id: position for position, doc_id in enumerate(self.ids)}
+        self.postings = defaultdict(dict, {
+            token: {renumber[position]: tf for position, tf in postings.items()}
+            for token, postings in self.postings.items()})
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def save(self, path: str):
+        """Write the index as JSON (temp file + os.replace, so readers never see half a file)."""
+        self.compact()
+        data = {"format": BM25_FORMAT, "k1": self.k1, "b": self.b, "ids": self.ids, "lengths": self.lengths,
+                # token -> [position, tf, position, tf, ...]
+                "postings": {token: [v for item in postings.items() for v in item]
+                             for token, postings in self.postings.items()}}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        """Index saved by save(), or None if missing, unreadable or of another BM25_FORMAT."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("format") != BM25_FORMAT:
+            return None
+        index = cls(k1=data["k1"], b=data["b"])
+        index.ids = data["ids"]
+        index.lengths = data["lengths"]
+        index.positions = {doc_id: position for position, doc_id in enumerate(index.ids)}
+        index.total_length = sum(index.lengths)
+        for token, flat in data["postings"].items():
+            index.postings[token] = dict(zip(flat[0::2], flat[1::2]))
+        return index
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Top-k (docstore id, score); every distinct query token counts once."""
+        if not self.positions:
+            return []
+        n = len(self.positions)
+        avg_length = self.total_length / n or 1.0
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokenize_code(query)):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[position] / avg_length)
+                scores[position] += idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.ids[position], score) for position, score in best]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Any]], rrf_k: int = RRF_K,
+                           weights: Optional[List[float]] = None) -> List[Tuple[Any, float]]:
+    """Fuse ranked key lists: score(key) = sum(weight / (rrf_k + rank)), rank starting at 1."""
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[Any, float] = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] += weight / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def vectorstore_items(vectorstore) -> Iterable[Tuple[str, str]]:
+    """(docstore id, text) for every vector of a LangChain FAISS store, in index order."""
+    for position in range(len(vectorstore.index_to_docstore_id)):
+        doc_id = vectorstore.index_to_docstore_id[position]
+        doc = vectorstore.docstore.search(doc_id)
+        if isinstance(doc, Document):
+            yield doc_id, doc.page_content
+
+
+def _doc_key(doc: Document) -> Tuple[str, str]:
+    # FAISS hits carry no docstore id, so both sides are matched on source + content
+    return doc.metadata.get("source", ""), doc.page_content
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense (FAISS) + sparse (BM25 over identifier tokens) retrieval fused with reciprocal rank
+    fusion. dense_k / sparse_k candidates are taken from each side and the top k are returned.
+    """
+
+    dense: BaseRetriever
+    sparse: Any
+    docstore: Any
+    k: int = 2
+    sparse_k: int = 4
+    rrf_k: int = RRF_K
+    sparse_weight: float = 1.0
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        dense_docs = self.dense.get_relevant_documents(query)
+        sparse_docs = []
+        for doc_id, _ in self.sparse.search(query, self.sparse_k):
+            doc = self.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                sparse_docs.append(doc)
+        by_key = {}
+        for doc in dense_docs + sparse_docs:
+            by_key.setdefault(_doc_key(doc), doc)
+        fused = reciprocal_rank_fusion([[_doc_key(d) for d in dense_docs], [_doc_key(d) for d in sparse_docs]],
+                                       rrf_k=self.rrf_k, weights=[1.0, self.sparse_weight])
+        return [by_key[key] for key, _ in fused[:self.k]]
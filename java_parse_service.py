@@ -0,0 +1,108 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+import javalang
+
+from ASTstructured import tree_to_json
+from ASTenchancedStructure import enhancedtree_to_json
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+# CompilationUnits are large object graphs; a few hundred covers one project easily.
+# Test sources are parsed with cache=False so they don't evict the main sources the generator reuses.
+PARSE_CACHE_SIZE = 256
+
+_parse_lock = threading.Lock()
+_PARSE_CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_STATS = {"hits": 0, "misses": 0, "evictions": 0}
+
+_EXTRACTORS = {
+    False: tree_to_json,
+    True: enhancedtree_to_json,
+}
+
+
+def content_hash(source: str) -> str:
+    return hashlib.sha1(source.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+def _get_entry(source: str) -> Dict[str, Any]:
+    """
+    Return the cache entry for `source`, parsing it on a miss.
+    Entry: {"tree": CompilationUnit or None, "error": exception or None, "json": {enhanced: dict}}
+    """
+    key = content_hash(source)
+    with _parse_lock:
+        entry = _PARSE_CACHE.get(key)
+        if entry is not None:
+            _PARSE_CACHE.move_to_end(key)
+            _STATS["hits"] += 1
+            return entry
+        _STATS["misses"] += 1
+
+    # tokenize + parse outside the lock so other threads are not blocked
+    entry = {"tree": None, "error": None, "json": {}}
+    try:
+        tokens = javalang.tokenizer.tokenize(source)
+        entry["tree"] = javalang.parser.Parser(tokens).parse()
+    except Exception as e:
+        # remember failures too, so the filter and the generator don't both re-parse broken files
+        entry["error"] = e
+
+    with _parse_lock:
+        _PARSE_CACHE[key] = entry
+        _PARSE_CACHE.move_to_end(key)
+        while len(_PARSE_CACHE) > PARSE_CACHE_SIZE:
+            _PARSE_CACHE.popitem(last=False)
+            _STATS["evictions"] += 1
+    return entry
+
+
+def parse_java(source: str, cache: bool = True) -> javalang.tree.CompilationUnit:
+    """
+    Drop-in replacement for javalang.parse.parse(source) that parses each distinct
+    source only once. Raises the same exception as the original parse on failure.
+    cache=False parses without reading or filling the cache (one-off sources such as test files).
+    """
+    if not cache:
+        return javalang.parser.Parser(javalang.tokenizer.tokenize(source)).parse()
+    entry = _get_entry(source)
+    if entry["error"] is not None:
+        raise entry["error"]
+    return entry["tree"]
+
+
+def parse_java_file(path: str) -> Tuple[str, javalang.tree.CompilationUnit]:
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    return source, parse_java(source)
+
+
+def get_ast_json(source: str, enhanced: bool = False) -> Dict[str, Any]:
+    """
+    tree_to_json / enhancedtree_to_json of the cached CompilationUnit.
+    The returned dict is shared between callers: treat it as read-only.
+    """
+    entry = _get_entry(source)
+    if entry["error"] is not None:
+        raise entry["error"]
+    ast_json = entry["json"].get(enhanced)
+    if ast_json is None:
+        ast_json = _EXTRACTORS[enhanced](entry["tree"])
+        entry["json"][enhanced] = ast_json
+    return ast_json
+
+
+def parse_stats() -> Dict[str, int]:
+    with _parse_lock:
+        stats = dict(_STATS)
+        stats["entries"] = len(_PARSE_CACHE)
+    return stats
+
+
+def clear_parse_cache():
+    with _parse_lock:
+        _PARSE_CACHE.clear()
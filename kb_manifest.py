@@ -0,0 +1,74 @@
+import os
+import json
+import hashlib
+from typing import Any, Dict, List, Optional
+
+MANIFEST_VERSION = 1
+
+
+def file_content_hash(path: str) -> str:
+    """Full-content hash of one KB file (mtime-independent, so touching a file is not a change)."""
+    hasher = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def scan_kb_files(folder_path: str, suffix: str = ".txt") -> Dict[str, str]:
+    """{filename: content hash} for every KB file."""
+    hashes = {}
+    if not os.path.exists(folder_path):
+        return hashes
+    for filename in sorted(os.listdir(folder_path)):
+        if filename.endswith(suffix):
+            try:
+                hashes[filename] = file_content_hash(os.path.join(folder_path, filename))
+            except OSError:
+                # unreadable files are treated as removed
+                continue
+    return hashes
+
+
+def chunk_ids(filename: str, content_hash: str, count: int) -> List[str]:
+    """Stable docstore/vector ids for a file's chunks: a new file version never reuses old ids."""
+    return [f"{filename}:{content_hash[:12]}:{i}" for i in range(count)]
+
+
+def new_manifest(settings: Dict[str, Any]) -> Dict[str, Any]:
+    return {"version": MANIFEST_VERSION, "settings": settings, "files": {}}
+
+
+def load_manifest(path: str, settings: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Manifest layout: {"version", "settings", "files": {filename: {"hash", "ids"}}}.
+    Returns None when missing, unreadable or built with different settings
+    (chunking / embedding model), in which case the index must be rebuilt.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except Exception:
+        return None
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("settings") != settings:
+        return None
+    return manifest
+
+
+def save_manifest(path: str, manifest: Dict[str, Any]):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def diff_manifest(manifest: Dict[str, Any], current: Dict[str, str]) -> Dict[str, List[str]]:
+    """Compare the manifest against scan_kb_files() output: {"added", "changed", "removed"}."""
+    indexed = manifest.get("files", {})
+    return {
+        "added": [f for f in current if f not in indexed],
+        "changed": [f for f in current if f in indexed and indexed[f]["hash"] != current[f]],
+        "removed": [f for f in indexed if f not in current],
+    }
@@ -0,0 +1,279 @@
+import os
+import json
+import queue
+import random
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+# Point at llm_stub_server.py (or any Ollama-compatible server) with LLM_BACKEND_HOST
+LLM_BACKEND_HOST = os.environ.get("LLM_BACKEND_HOST") or os.environ.get("OLLAMA_HOST") or "http://127.0.0.1:11434"
+MAX_IN_FLIGHT = 4          # match OLLAMA_NUM_PARALLEL on the server
+MAX_CONNECTIONS = 8
+CONNECT_TIMEOUT = 10.0
+READ_TIMEOUT = 600.0       # a long test class on a slow GPU
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+_backend_lock = threading.Lock()
+_BACKEND: Optional["LLMBackend"] = None
+
+
+class LLMBackendError(Exception):
+    pass
+
+
+def _host_url(host: str) -> str:
+    return host if host.startswith(("http://", "https://")) else "http://" + host
+
+
+def _options(temperature: Optional[float] = None, options: Optional[Dict[str, Any]] = None,
+             stop: Optional[List[str]] = None) -> Dict[str, Any]:
+    merged = dict(options or {})
+    if temperature is not None:
+        merged["temperature"] = temperature
+    if stop:
+        merged["stop"] = stop
+    return merged
+
+
+# -----------------------
+# Async backend
+# -----------------------
+class AsyncLLMBackend:
+    """
+    Ollama /api/generate client on one pooled httpx.AsyncClient.
+    At most `max_in_flight` requests run at once; connection errors, timeouts and
+    429/5xx answers are retried with full-jitter exponential backoff.
+    """
+
+    def __init__(self, host: str = LLM_BACKEND_HOST, max_in_flight: int = MAX_IN_FLIGHT,
+                 max_connections: int = MAX_CONNECTIONS, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT, max_retries: int = MAX_RETRIES,
+                 backoff_base: float = BACKOFF_BASE, backoff_max: float = BACKOFF_MAX):
+        self.host = _host_url(host).rstrip("/")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._client = httpx.AsyncClient(
+            base_url=self.host,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "in_flight": 0, "max_in_flight_seen": 0}
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _enter(self):
+        self.stats["requests"] += 1
+        self.stats["in_flight"] += 1
+        self.stats["max_in_flight_seen"] = max(self.stats["max_in_flight_seen"], self.stats["in_flight"])
+
+    async def _retry_or_raise(self, attempt: int, error: str):
+        if attempt >= self.max_retries:
+            self.stats["failures"] += 1
+            raise LLMBackendError(error)
+        self.stats["retries"] += 1
+        await asyncio.sleep(self._backoff(attempt))
+
+    async def agenerate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+        payload = {"model": model, "prompt": prompt, "stream": False}
+        if options:
+            payload["options"] = options
+        async with self._semaphore:
+            self._enter()
+            try:
+                attempt = 0
+                while True:
+                    try:
+                        response = await self._client.post("/api/generate", json=payload)
+                        if response.status_code in RETRY_STATUS:
+                            await self._retry_or_raise(attempt, f"HTTP {response.status_code}: {response.text[:200]}")
+                        else:
+                            response.raise_for_status()
+                            return response.json()["response"]
+                    except httpx.TransportError as e:
+                        await self._retry_or_raise(attempt, f"{type(e).__name__}: {e}")
+                    attempt += 1
+            finally:
+                self.stats["in_flight"] -= 1
+
+    async def astream(self, model: str, prompt: str,
+                      options: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield the NDJSON chunks of a streamed generation ({"response": ..., "done": ...}).
+        Only failures before the first chunk are retried. Closing the iterator closes the
+        response, which makes Ollama stop decoding.
+        """
+        payload = {"model": model, "prompt": prompt, "stream": True}
+        if options:
+            payload["options"] = options
+        async with self._semaphore:
+            self._enter()
+            try:
+                attempt = 0
+                while True:
+                    try:
+                        async with self._client.stream("POST", "/api/generate", json=payload) as response:
+                            if response.status_code in RETRY_STATUS:
+                                await response.aread()
+                                await self._retry_or_raise(attempt, f"HTTP {response.status_code}")
+                                attempt += 1
+                                continue
+                            response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                if not line.strip():
+                                    continue
+                                chunk = json.loads(line)
+                                if "error" in chunk:
+                                    raise LLMBackendError(chunk["error"])
+                                attempt = self.max_retries  # something was delivered: no more retries
+                                yield chunk
+                                if chunk.get("done"):
+                                    break
+                            return
+                    except httpx.TransportError as e:
+                        await self._retry_or_raise(attempt, f"{type(e).__name__}: {e}")
+                        attempt += 1
+            finally:
+                self.stats["in_flight"] -= 1
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+# -----------------------
+# Sync facade (background event loop)
+# -----------------------
+class LLMBackend:
+    """
+    Runs an AsyncLLMBackend on a daemon event-loop thread so the existing synchronous
+    code (and the scheduler's worker threads) can share one connection pool.
+    """
+
+    def __init__(self, **config):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-backend", daemon=True)
+        self._thread.start()
+        self.backend: AsyncLLMBackend = self._call(self._make(config))
+
+    @staticmethod
+    async def _make(config) -> AsyncLLMBackend:
+        return AsyncLLMBackend(**config)
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def generate(self, model: str, prompt: str, temperature: Optional[float] = None,
+                 options: Optional[Dict[str, Any]] = None, stop: Optional[List[str]] = None) -> str:
+        return self._call(self.backend.agenerate(model, prompt, _options(temperature, options, stop)))
+
+    def generate_many(self, model: str, prompts: List[str], temperature: Optional[float] = None,
+                      options: Optional[Dict[str, Any]] = None) -> List[str]:
+        """All prompts concurrently (bounded by max_in_flight); results in prompt order."""
+        opts = _options(temperature, options)
+
+        async def run():
+            return await asyncio.gather(*(self.backend.agenerate(model, p, opts) for p in prompts))
+        return self._call(run())
+
+    def stream(self, model: str, prompt: str, temperature: Optional[float] = None,
+               options: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Blocking iterator over the streamed chunks; close() it to abort the generation."""
+        chunks: "queue.Queue" = queue.Queue()
+        done = object()
+
+        async def pump():
+            try:
+                async for chunk in self.backend.astream(model, prompt, _options(temperature, options)):
+                    chunks.put(chunk)
+            except Exception as e:
+                chunks.put(e)
+            finally:
+                chunks.put(done)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._loop)
+        try:
+            while True:
+                item = chunks.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.backend.stats)
+
+    def close(self):
+        self._call(self.backend.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+def get_llm_backend() -> LLMBackend:
+    global _BACKEND
+    with _backend_lock:
+        if _BACKEND is None:
+            _BACKEND = LLMBackend()
+        return _BACKEND
+
+
+def set_llm_backend(backend: Optional[LLMBackend]):
+    """Swap the shared backend (e.g. one pointed at llm_stub_server); None resets to the default."""
+    global _BACKEND
+    with _backend_lock:
+        old, _BACKEND = _BACKEND, backend
+    if old is not None and old is not backend:
+        old.close()
+
+
+# -----------------------
+# LangChain adapter (defined on first use: the no-RAG path never imports langchain)
+# -----------------------
+_BackendLLM = None
+
+
+def _define_backend_llm():
+    from langchain_core.language_models.llms import LLM
+
+    class BackendLLM(LLM):
+        """LangChain LLM that sends every call through the shared LLMBackend (drop-in for Ollama)."""
+
+        model: str
+        temperature: Optional[float] = None
+
+        @property
+        def _llm_type(self) -> str:
+            return "ollama-backend"
+
+        @property
+        def _identifying_params(self) -> Dict[str, Any]:
+            return {"model": self.model, "temperature": self.temperature}
+
+        def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> str:
+            return get_llm_backend().generate(self.model, prompt, self.temperature, stop=stop)
+
+    return BackendLLM
+
+
+def __getattr__(name: str):
+    # `from llm_backend import BackendLLM` still works; langchain_core is imported right then
+    global _BackendLLM
+    if name == "BackendLLM":
+        with _backend_lock:
+            if _BackendLLM is None:
+                _BackendLLM = _define_backend_llm()
+        return _BackendLLM
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,138 @@
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional, Tuple
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+STUB_HOST = "127.0.0.1"
+STUB_PORT = 11435  # next to Ollama's 11434 so both can run
+
+STUB_RESPONSE = """```java
+import org.junit.jupiter.api.Test;
+import static org.junit.jupiter.api.Assertions.*;
+
+public class StubTest {
+
+    @Test
+    public void testStub() {
+        assertTrue(true);
+    }
+}
+```
+This test class checks the stubbed behaviour."""
+
+
+class StubConfig:
+    """Knobs for exercising the backend: latency, token pacing and injected failures."""
+
+    def __init__(self, respond: Optional[Callable[[dict], str]] = None, latency: float = 0.0,
+                 token_delay: float = 0.0, failure_rate: float = 0.0, failure_status: int = 503):
+        self.respond = respond or (lambda request: STUB_RESPONSE)
+        self.latency = latency
+        self.token_delay = token_delay
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "failures": 0, "in_flight": 0, "max_in_flight": 0, "aborted_streams": 0}
+
+    def bump(self, key: str, delta: int = 1):
+        with self.lock:
+            self.stats[key] += delta
+            if key == "in_flight":
+                self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+
+
+def _tokens(text: str):
+    # roughly word-sized pieces, like a model would stream them
+    start = 0
+    for i, ch in enumerate(text):
+        if ch in " \n" and i > start:
+            yield text[start:i + 1]
+            start = i + 1
+    if start < len(text):
+        yield text[start:]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so the backend's connection pooling is exercised
+    config: StubConfig = StubConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path != "/api/generate":
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+
+        config = self.config
+        config.bump("requests")
+        config.bump("in_flight")
+        try:
+            if config.latency:
+                time.sleep(config.latency)
+            if config.failure_rate and random.random() < config.failure_rate:
+                config.bump("failures")
+                self._send_json(config.failure_status, {"error": "injected failure"})
+                return
+
+            text = config.respond(request)
+            model = request.get("model", "stub")
+            if not request.get("stream", True):
+                self._send_json(200, {"model": model, "response": text, "done": True})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for piece in _tokens(text):
+                    self._write_chunk({"model": model, "response": piece, "done": False})
+                    if config.token_delay:
+                        time.sleep(config.token_delay)
+                self._write_chunk({"model": model, "response": "", "done": True})
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                config.bump("aborted_streams")
+                self.close_connection = True
+        finally:
+            config.bump("in_flight", -1)
+
+    def _write_chunk(self, body: dict):
+        data = (json.dumps(body) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_stub_server(host: str = STUB_HOST, port: int = 0,
+                      config: Optional[StubConfig] = None) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub on a daemon thread; port=0 picks a free port. Returns (server, base_url)."""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": config or StubConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    import sys
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else STUB_PORT
+    server = ThreadingHTTPServer((STUB_HOST, port), StubHandler)
+    print(f"Ollama stub listening on http://{STUB_HOST}:{port} (set LLM_BACKEND_HOST to use it)")
+    server.serve_forever()
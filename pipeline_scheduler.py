@@ -0,0 +1,215 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+# One local Ollama instance rarely benefits from more than 2-4 parallel requests
+DEFAULT_LLM_CONCURRENCY = 2
+DEFAULT_PREPARE_WORKERS = 2
+DEFAULT_FINALIZE_WORKERS = 1
+# Bounded queues between stages: a slow LLM stage blocks the producers (backpressure)
+DEFAULT_QUEUE_SIZE = 8
+
+_STOP = object()
+
+
+class PipelineScheduler:
+    """
+    Bounded concurrent pipeline: prepare (read/parse/prompt) -> generate (LLM) -> finalize (clean/fix/write).
+
+    - prepare(item)              -> job dict, or None to skip the item
+    - generate(job)              -> raw LLM response
+    - finalize(job, response)    -> anything (typically the written test path)
+    - on_error(job_or_item, exc) -> called for any stage failure, the item is dropped
+
+    Each stage runs in its own thread pool and the stages are connected by bounded
+    queues, so parsing of the next files overlaps with the LLM calls of the current ones.
+    """
+
+    def __init__(self,
+                 prepare: Callable[[Any], Optional[Dict[str, Any]]],
+                 generate: Callable[[Dict[str, Any]], Any],
+                 finalize: Callable[[Dict[str, Any], Any], Any],
+                 on_error: Optional[Callable[[Any, Exception], None]] = None,
+                 llm_concurrency: int = DEFAULT_LLM_CONCURRENCY,
+                 prepare_workers: int = DEFAULT_PREPARE_WORKERS,
+                 finalize_workers: int = DEFAULT_FINALIZE_WORKERS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.prepare = prepare
+        self.generate = generate
+        self.finalize = finalize
+        self.on_error = on_error
+        self.llm_concurrency = max(1, llm_concurrency)
+        self.prepare_workers = max(1, prepare_workers)
+        self.finalize_workers = max(1, finalize_workers)
+        self.queue_size = max(1, queue_size)
+
+        self._stats_lock = threading.Lock()
+        self.stats = self._new_stats()
+
+    @staticmethod
+    def _new_stats() -> Dict[str, Any]:
+        return {
+            "submitted": 0,
+            "skipped": 0,
+            "generated": 0,
+            "finalized": 0,
+            "errors": 0,
+            "busy_seconds": {"prepare": 0.0, "generate": 0.0, "finalize": 0.0},
+            "max_queue_depth": {"prepare": 0, "generate": 0, "finalize": 0},
+        }
+
+    # -----------------------
+    # Stage bookkeeping
+    # -----------------------
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _busy(self, stage: str, seconds: float):
+        with self._stats_lock:
+            self.stats["busy_seconds"][stage] += seconds
+
+    def _depth(self, stage: str, q: queue.Queue):
+        depth = q.qsize()
+        with self._stats_lock:
+            if depth > self.stats["max_queue_depth"][stage]:
+                self.stats["max_queue_depth"][stage] = depth
+
+    def _fail(self, obj: Any, exc: Exception):
+        self._count("errors")
+        if self.on_error is not None:
+            try:
+                self.on_error(obj, exc)
+            except Exception as e:
+                print(f"on_error handler failed: {e}")
+
+    # -----------------------
+    # Stage workers
+    # -----------------------
+    def _prepare_worker(self, in_q: queue.Queue, out_q: queue.Queue):
+        while True:
+            item = in_q.get()
+            if item is _STOP:
+                break
+            start = time.perf_counter()
+            try:
+                job = self.prepare(item)
+            except Exception as e:
+                job = None
+                self._fail(item, e)
+            else:
+                if job is None:
+                    self._count("skipped")
+            finally:
+                self._busy("prepare", time.perf_counter() - start)
+            if job is not None:
+                out_q.put(job)  # blocks while the LLM stage is saturated
+                self._depth("generate", out_q)
+
+    def _generate_worker(self, in_q: queue.Queue, out_q: queue.Queue):
+        while True:
+            job = in_q.get()
+            if job is _STOP:
+                break
+            start = time.perf_counter()
+            try:
+                response = self.generate(job)
+            except Exception as e:
+                self._fail(job, e)
+                continue
+            finally:
+                self._busy("generate", time.perf_counter() - start)
+            self._count("generated")
+            out_q.put((job, response))
+            self._depth("finalize", out_q)
+
+    def _finalize_worker(self, in_q: queue.Queue):
+        while True:
+            entry = in_q.get()
+            if entry is _STOP:
+                break
+            job, response = entry
+            start = time.perf_counter()
+            try:
+                self.finalize(job, response)
+                self._count("finalized")
+            except Exception as e:
+                self._fail(job, e)
+            finally:
+                self._busy("finalize", time.perf_counter() - start)
+
+    @staticmethod
+    def _start(target, args, count: int, name: str):
+        threads = []
+        for i in range(count):
+            t = threading.Thread(target=target, args=args, name=f"{name}-{i}", daemon=True)
+            t.start()
+            threads.append(t)
+        return threads
+
+    @staticmethod
+    def _drain(threads, q: queue.Queue):
+        for _ in threads:
+            q.put(_STOP)
+        for t in threads:
+            t.join()
+
+    # -----------------------
+    # Run
+    # -----------------------
+    def run(self, items: Iterable[Any]) -> Dict[str, Any]:
+        """
+        Push all items through the pipeline and block until every stage is drained.
+        Returns the wall-clock/throughput summary.
+        """
+        self.stats = self._new_stats()
+        prepare_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        generate_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        finalize_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        started = time.perf_counter()
+        preparers = self._start(self._prepare_worker, (prepare_q, generate_q), self.prepare_workers, "prepare")
+        generators = self._start(self._generate_worker, (generate_q, finalize_q), self.llm_concurrency, "generate")
+        finalizers = self._start(self._finalize_worker, (finalize_q,), self.finalize_workers, "finalize")
+
+        for item in items:
+            prepare_q.put(item)  # blocks when the pipeline is full
+            self._count("submitted")
+            self._depth("prepare", prepare_q)
+
+        # Shut the stages down in order so nothing is lost in between
+        self._drain(preparers, prepare_q)
+        self._drain(generators, generate_q)
+        self._drain(finalizers, finalize_q)
+
+        return self.summary(time.perf_counter() - started)
+
+    def summary(self, wall_seconds: float) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+            stats["busy_seconds"] = {k: round(v, 3) for k, v in self.stats["busy_seconds"].items()}
+            stats["max_queue_depth"] = dict(self.stats["max_queue_depth"])
+        stats["wall_seconds"] = round(wall_seconds, 3)
+        stats["llm_concurrency"] = self.llm_concurrency
+        stats["files_per_minute"] = round(stats["finalized"] * 60.0 / wall_seconds, 2) if wall_seconds > 0 else 0.0
+        # Fraction of the available LLM slots that were actually busy
+        llm_capacity = wall_seconds * self.llm_concurrency
+        stats["llm_utilization"] = round(self.stats["busy_seconds"]["generate"] / llm_capacity, 3) if llm_capacity > 0 else 0.0
+        return stats
+
+
+def print_summary(summary: Dict[str, Any]):
+    print("\n=== Scheduler summary ===")
+    print(f"Wall clock        : {summary['wall_seconds']}s")
+    print(f"Submitted files   : {summary['submitted']}")
+    print(f"Skipped           : {summary['skipped']}")
+    print(f"Generated / saved : {summary['generated']} / {summary['finalized']}")
+    print(f"Errors            : {summary['errors']}")
+    print(f"Throughput        : {summary['files_per_minute']} files/min")
+    print(f"LLM concurrency   : {summary['llm_concurrency']} (utilization {summary['llm_utilization']:.0%})")
+    print(f"Stage busy time   : {summary['busy_seconds']}")
+    print(f"Max queue depth   : {summary['max_queue_depth']}")
@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import os
+import re
+import time
+import hashlib
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set
+
+import javalang
+
+from java_parse_service import parse_java
+from kb_manifest import file_content_hash, chunk_ids, new_manifest, load_manifest, save_manifest, diff_manifest
+
+# langchain / FAISS are imported on first use: AutoPipeline imports this module for mark_generated
+if TYPE_CHECKING:
+    from langchain.schema import Document
+    from langchain_community.vectorstores import FAISS
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+PROJECT_INDEX_ROOT = "project_test_indexes"   # one sub-folder per project test root
+# Generated test files, one path per line; shared by every process using PROJECT_INDEX_ROOT
+GENERATED_OUTPUTS_FILE = os.path.join(PROJECT_INDEX_ROOT, "generated_outputs.txt")
+RESYNC_SECONDS = 30                           # re-scan src/test/java at most this often per project
+DENSE_CANDIDATES = 20
+MAX_STRUCTURAL_CANDIDATES = 50
+MAX_SNIPPET_CHARS = 2500
+# score = sum(weight * feature); dense similarity is 1 / (1 + L2 distance)
+SCORE_WEIGHTS = {"dense": 1.0, "same_class": 2.0, "same_package": 0.5, "types": 1.0, "members": 1.0}
+
+TEST_ANNOTATIONS = {"Test", "ParameterizedTest", "RepeatedTest", "TestFactory", "TestTemplate"}
+TEST_CLASS_SUFFIXES = ("Tests", "Test", "IT", "TestCase")
+
+_registry_lock = threading.Lock()
+_INDEXES: Dict[str, "ProjectTestIndex"] = {}
+# Test files this tool wrote; never mined as examples (see mark_generated)
+GENERATED_OUTPUTS: Set[str] = set()
+_generated_read = 0   # bytes of GENERATED_OUTPUTS_FILE already merged into GENERATED_OUTPUTS
+
+_STRINGS = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|//.*')
+
+
+def _norm(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def mark_generated(paths: Iterable[str]):
+    """
+    Register generated test files so the project index skips (and drops) them. They are appended
+    to GENERATED_OUTPUTS_FILE too, so other processes (the generation daemon) and later runs skip them.
+    """
+    with _registry_lock:
+        new = sorted({_norm(p) for p in paths if p} - GENERATED_OUTPUTS)
+        if not new:
+            return
+        GENERATED_OUTPUTS.update(new)
+        os.makedirs(os.path.dirname(GENERATED_OUTPUTS_FILE) or ".", exist_ok=True)
+        with open(GENERATED_OUTPUTS_FILE, "a", encoding="utf-8") as f:
+            f.write("".join(path + "\n" for path in new))  # one append per call
+
+
+def load_generated():
+    """Merge the paths other processes appended to GENERATED_OUTPUTS_FILE since the last call."""
+    global _generated_read
+    with _registry_lock:
+        try:
+            with open(GENERATED_OUTPUTS_FILE, "rb") as f:
+                f.seek(_generated_read)
+                chunk = f.read()
+        except OSError:
+            return
+        complete = chunk[:chunk.rfind(b"\n") + 1]  # a line still being written is read next time
+        _generated_read += len(complete)
+        GENERATED_OUTPUTS.update(line for line in complete.decode("utf-8").splitlines() if line)
+
+
+def generated_under(test_root: str) -> List[str]:
+    """Registered generated files inside test_root (what a generation daemon must skip for it)."""
+    prefix = os.path.join(_norm(test_root), "")
+    with _registry_lock:
+        return sorted(path for path in GENERATED_OUTPUTS if path.startswith(prefix))
+
+
+def tested_class_name(test_class: str) -> str:
+    for suffix in TEST_CLASS_SUFFIXES:
+        if test_class.endswith(suffix) and len(test_class) > len(suffix):
+            return test_class[:-len(suffix)]
+    return test_class
+
+
+# -----------------------
+# Mining test methods
+# -----------------------
+def _method_source(lines: List[str], line: int) -> str:
+    """Source of the method declared at 1-based `line`, including annotations above it."""
+    start = line - 1
+    while start > 0 and lines[start - 1].strip().startswith("@"):
+        start -= 1
+    depth, seen_open = 0, False
+    for end in range(line - 1, len(lines)):
+        code = _STRINGS.sub("", lines[end])
+        depth += code.count("{") - code.count("}")
+        seen_open = seen_open or "{" in code
+        if seen_open and depth <= 0:
+            break
+    return "\n".join(lines[start:end + 1])
+
+
+def _is_test_method(method) -> bool:
+    return any(a.name.split(".")[-1] in TEST_ANNOTATIONS for a in method.annotations) or method.name.startswith("test")
+
+
+def extract_test_methods(source: str, rel_path: str) -> List[Document]:
+    """One Document per test method, with structural features in the metadata."""
+    from langchain.schema import Document
+
+    tree = parse_java(source, cache=False)
+    lines = source.splitlines()
+    package = tree.package.name if tree.package else ""
+    imported = sorted({imp.path.split(".")[-1] for imp in tree.imports if not imp.wildcard})
+    docs = []
+    for type_decl in tree.types:
+        if not isinstance(type_decl, javalang.tree.ClassDeclaration):
+            continue
+        tested = tested_class_name(type_decl.name)
+        for method in type_decl.methods:
+            if not _is_test_method(method) or method.position is None:
+                continue
+            members = sorted({node.member for _, node in method.filter(javalang.tree.MethodInvocation)})
+            types = sorted({node.name for _, node in method.filter(javalang.tree.ReferenceType)} | set(imported))
+            snippet = _method_source(lines, method.position.line)[:MAX_SNIPPET_CHARS]
+            docs.append(Document(
+                page_content=f"// {package + '.' if package else ''}{type_decl.name}\n{snippet}",
+                metadata={"source": rel_path, "package": package, "test_class": type_decl.name,
+                          "tested_class": tested, "method": method.name, "members": members, "types": types}
+            ))
+    return docs
+
+
+def target_features(ast_json: Dict[str, Any]) -> Dict[str, Any]:
+    """What the class under test offers for matching: names, package, types and public members."""
+    classes, types, members = set(), set(), set()
+    for cls in ast_json.get("classes", []):
+        classes.add(cls.get("class_name"))
+        for field in cls.get("fields", []):
+            types.add(str(field.get("type", "")).split("<")[0])
+        for method in cls.get("methods", []):
+            if "private" not in (method.get("modifiers") or []):
+                members.add(method.get("name"))
+            for param in method.get("parameters", []):
+                types.add(str(param.get("type", "")).split("<")[0])
+    types.update(imp.split(".")[-1] for imp in ast_json.get("imports", []))
+    types.discard("")
+    return {"classes": classes, "package": ast_json.get("package") or "", "types": types, "members": members}
+
+
+def _overlap(found: Iterable[str], wanted: Set[str]) -> float:
+    found = set(found)
+    return len(found & wanted) / len(wanted) if wanted and found else 0.0
+
+
+def structural_score(metadata: Dict[str, Any], target: Dict[str, Any], dense: float = 0.0) -> float:
+    w = SCORE_WEIGHTS
+    score = w["dense"] * dense
+    score += w["same_class"] * (metadata.get("tested_class") in target["classes"])
+    score += w["same_package"] * (bool(target["package"]) and metadata.get("package") == target["package"])
+    score += w["types"] * _overlap(metadata.get("types", []), target["types"] | target["classes"])
+    score += w["members"] * _overlap(metadata.get("members", []), target["members"])
+    return score
+
+
+# -----------------------
+# Per-project index
+# -----------------------
+class ProjectTestIndex:
+    """
+    Existing test methods of one project (its src/test/java), embedded per method and kept
+    on disk under PROJECT_INDEX_ROOT: a FAISS index + SplitStore docstore + per-file manifest,
+    so only changed test files are re-parsed and re-embedded.
+    """
+
+    def __init__(self, test_root: str, embeddings, index_dir: Optional[str] = None):
+        self.test_root = os.path.abspath(test_root)
+        self.embeddings = embeddings
+        self.index_dir = index_dir or os.path.join(
+            PROJECT_INDEX_ROOT, hashlib.sha1(_norm(test_root).encode("utf-8")).hexdigest()[:16])
+        self.manifest_path = os.path.join(self.index_dir, "manifest.json")
+        self.faiss_dir = os.path.join(self.index_dir, "faiss")
+        self.docstore_path = os.path.join(self.index_dir, "docstore")
+        self.vectorstore: Optional[FAISS] = None
+        self.manifest: Optional[Dict[str, Any]] = None
+        self.last_sync = 0.0
+        self._lock = threading.RLock()
+
+    def _settings(self) -> Dict[str, Any]:
+        model = getattr(self.embeddings, "model_name", type(self.embeddings).__name__)
+        return {"embedding_model": model, "snippet_chars": MAX_SNIPPET_CHARS}
+
+    def _scan(self) -> Dict[str, str]:
+        load_generated()
+        hashes = {}
+        for dirpath, _, files in os.walk(self.test_root):
+            for file in files:
+                if not file.endswith(".java"):
+                    continue
+                path = os.path.join(dirpath, file)
+                if _norm(path) in GENERATED_OUTPUTS:
+                    continue
+                try:
+                    hashes[os.path.relpath(path, self.test_root)] = file_content_hash(path)
+                except OSError:
+                    continue
+        return hashes
+
+    def _close(self):
+        if self.vectorstore is not None:
+            self.vectorstore.docstore.close()
+            self.vectorstore = None
+
+    def _load(self, writable: bool):
+        from langchain_community.vectorstores import FAISS
+        from faiss_store import load_index
+        from split_store import SplitStoreDocstore
+
+        self._close()  # a read-only copy being reopened writable
+        index, index_to_docstore_id = load_index(self.faiss_dir, writable=writable)
+        return FAISS(self.embeddings, index, SplitStoreDocstore(self.docstore_path), index_to_docstore_id)
+
+    def sync(self) -> Dict[str, int]:
+        """Re-scan the test root and apply only the per-file changes. Returns the change counts."""
+        from langchain_community.vectorstores import FAISS
+        from faiss_store import has_saved_index, save_index, is_read_only
+        from split_store import SplitStoreDocstore
+
+        with self._lock:
+            current = self._scan()
+            manifest = self.manifest or load_manifest(self.manifest_path, self._settings())
+            # a manifest without test methods (no tests, or none parsable) is valid without an index
+            has_methods = manifest is not None and any(entry["ids"] for entry in manifest["files"].values())
+            if manifest is None or (has_methods and not has_saved_index(self.faiss_dir)):
+                manifest = new_manifest(self._settings())
+                has_methods = False
+                self._close()
+            delta = diff_manifest(manifest, current)
+            changed = any(delta.values())
+            if has_methods and (self.vectorstore is None or
+                                      (changed and is_read_only(self.vectorstore.index_to_docstore_id))):
+                self.vectorstore = self._load(writable=changed)
+
+            stale_ids, new_docs, new_ids = [], [], []
+            for rel in delta["removed"] + delta["changed"]:
+                stale_ids.extend(manifest["files"].pop(rel)["ids"])
+            for rel in delta["added"] + delta["changed"]:
+                try:
+                    with open(os.path.join(self.test_root, rel), "r", encoding="utf-8") as f:
+                        docs = extract_test_methods(f.read(), rel)
+                except Exception:
+                    docs = []  # unparsable test file: remember its hash so it is not retried every sync
+                ids = chunk_ids(rel, current[rel], len(docs))
+                new_docs.extend(docs)
+                new_ids.extend(ids)
+                manifest["files"][rel] = {
+                    "hash": current[rel], "ids": ids,
+                    "classes": sorted({d.metadata["tested_class"] for d in docs}),
+                    "package": docs[0].metadata["package"] if docs else "",
+                }
+
+            if stale_ids and self.vectorstore is not None:
+                self.vectorstore.delete(stale_ids)
+            if new_docs:
+                if self.vectorstore is None:
+                    docstore = SplitStoreDocstore(self.docstore_path, fresh=True)
+                    self.vectorstore = FAISS.from_documents(new_docs, self.embeddings, ids=new_ids, docstore=docstore)
+                else:
+                    self.vectorstore.add_documents(new_docs, ids=new_ids)
+            if changed and self.vectorstore is not None:
+                self.vectorstore.docstore.commit()
+                save_index(self.faiss_dir, self.vectorstore.index, self.vectorstore.index_to_docstore_id)
+                save_manifest(self.manifest_path, manifest)
+                self.vectorstore.docstore.store.compact()
+            elif changed:
+                os.makedirs(self.index_dir, exist_ok=True)
+                save_manifest(self.manifest_path, manifest)
+            self.manifest = manifest
+            self.last_sync = time.time()
+            return {"added": len(delta["added"]), "changed": len(delta["changed"]),
+                    "removed": len(delta["removed"]), "methods_embedded": len(new_ids)}
+
+    def search(self, ast_json: Dict[str, Any], query: str, k: int = 3) -> List[Document]:
+        """
+        Tests most useful as examples for the class in `ast_json`: dense candidates for `query`
+        plus every test of the same class / package, re-ranked by structural_score.
+        """
+        from langchain.schema import Document
+
+        with self._lock:
+            if self.vectorstore is None or self.manifest is None:
+                return []
+            target = target_features(ast_json)
+            scored: Dict[str, tuple] = {}
+            for doc, distance in self.vectorstore.similarity_search_with_score(query, k=DENSE_CANDIDATES):
+                key = f"{doc.metadata.get('source')}#{doc.metadata.get('method')}"
+                scored[key] = (structural_score(doc.metadata, target, 1.0 / (1.0 + float(distance))), doc)
+
+            structural_ids = []
+            for entry in self.manifest["files"].values():
+                if set(entry.get("classes", [])) & target["classes"] or (
+                        target["package"] and entry.get("package") == target["package"]):
+                    structural_ids.extend(entry["ids"])
+            for doc_id in structural_ids[:MAX_STRUCTURAL_CANDIDATES]:
+                doc = self.vectorstore.docstore.search(doc_id)
+                if not isinstance(doc, Document):
+                    continue
+                key = f"{doc.metadata.get('source')}#{doc.metadata.get('method')}"
+                if key not in scored:
+                    scored[key] = (structural_score(doc.metadata, target), doc)
+
+            ranked = sorted(scored.values(), key=lambda item: item[0], reverse=True)
+            return [doc for _, doc in ranked[:k]]
+
+
+def get_project_test_index(test_root: str, embeddings) -> ProjectTestIndex:
+    """Shared index for `test_root`, re-synced with the files at most every RESYNC_SECONDS."""
+    key = _norm(test_root)
+    with _registry_lock:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = _INDEXES[key] = ProjectTestIndex(test_root, embeddings)
+    if time.time() - index.last_sync > RESYNC_SECONDS:
+        index.sync()
+    return index
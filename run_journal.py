@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+# Statuses that mean "do not touch this file again on a restarted run"
+DONE_STATUSES = ("generated", "skipped")
+
+
+class RunJournal:
+    """
+    Append-only JSONL journal with one record per processed source file.
+
+    Every record is flushed and fsync'ed before record() returns, so after a crash
+    at most the file that was in flight is lost. On load the last record per file
+    wins and a truncated trailing line (crash mid-write) is ignored.
+    """
+
+    def __init__(self, path: str, retry_errors: bool = True):
+        self.path = path
+        self.retry_errors = retry_errors
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._load()
+        self._fh = open(self.path, "a", encoding="utf-8")
+        if self._fh.tell() > 0 and not self._ends_with_newline():
+            # terminate a truncated last line so the next record starts clean
+            self._fh.write("\n")
+            self._fh.flush()
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.normcase(os.path.abspath(file_path))
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # partial line from an interrupted write
+                    continue
+                self.entries[self._key(entry["file"])] = entry
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def is_done(self, file_path: str) -> bool:
+        entry = self.entries.get(self._key(file_path))
+        if entry is None:
+            return False
+        if entry["status"] in DONE_STATUSES:
+            return True
+        return not self.retry_errors
+
+    def record(self, file_path: str, status: str, output: Optional[str] = None, project: Optional[str] = None,
+               output_dir: Optional[str] = None, timings: Optional[Dict[str, float]] = None,
+               error: Optional[str] = None) -> Dict[str, Any]:
+        entry = {
+            "file": os.path.abspath(file_path),
+            "status": status,
+            "output": output,
+            "project": project,
+            "output_dir": output_dir,
+            "timings": {k: round(v, 3) for k, v in (timings or {}).items()},
+            "error": error,
+            "ts": time.time()
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._fh.write(line + "\n")
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self.entries[self._key(file_path)] = entry
+        return entry
+
+    def outputs(self) -> List[str]:
+        """Test files written by earlier runs (status generated)."""
+        with self._lock:
+            return [e["output"] for e in self.entries.values() if e["status"] == "generated" and e.get("output")]
+
+    def summary(self) -> Dict[str, Any]:
+        """Rebuild the AutoPipeline `results` counters from the journal."""
+        summary = {
+            "Processed_files": 0,
+            "generated_tests_classes": 0,
+            "Error_Count": 0,
+            "errors": [],
+            "ProjectCount": 0,
+            "lastProject": {}
+        }
+        projects = set()
+        last = None
+        with self._lock:
+            entries = sorted(self.entries.values(), key=lambda e: e.get("ts", 0))
+        for entry in entries:
+            if entry.get("project"):
+                projects.add(entry["project"])
+            if entry["status"] == "skipped":
+                continue
+            summary["Processed_files"] += 1
+            if entry["status"] == "generated":
+                summary["generated_tests_classes"] += 1
+            elif entry["status"] == "error":
+                summary["Error_Count"] += 1
+                summary["errors"].append({"file": entry["file"], "error": entry.get("error")})
+            last = entry
+        summary["ProjectCount"] = len(projects)
+        if last is not None and last.get("project"):
+            summary["lastProject"] = {"srcpath": last["project"], "output": last.get("output_dir")}
+        return summary
+
+    def close(self):
+        with self._lock:
+            if not self._fh.closed:
+                self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import zipfile
+
+import javalang
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from ASTstructured import tree_to_json
+from ASTenchancedStructure import enhancedtree_to_json
+
+ZIP_PATH = os.path.join(ROOT, "JavaProjectsFromGithub.zip")
+REPEATS = 5
+# keys produced by both extractors; the visitor output must match the filter output on these
+SHARED_KEYS = {
+    "tree_to_json": ("invocations", "conditionals"),
+    "enhancedtree_to_json": ("invocations", "conditionals", "returns"),
+}
+
+
+def load_trees(zip_path):
+    trees = []
+    with zipfile.ZipFile(zip_path) as zf:
+        for name in zf.namelist():
+            if not name.endswith(".java"):
+                continue
+            source = zf.read(name).decode("utf-8", errors="replace")
+            try:
+                trees.append((name, javalang.parse.parse(source)))
+            except Exception:
+                continue
+    return trees
+
+
+def time_extractor(fn, trees, extractor):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for _, tree in trees:
+            fn(tree, extractor=extractor)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def compare_outputs(fn, trees, keys):
+    mismatches = []
+    for name, tree in trees:
+        old = fn(tree, extractor="filter")
+        new = fn(tree, extractor="visitor")
+        for old_cls, new_cls in zip(old["classes"], new["classes"]):
+            for old_m, new_m in zip(old_cls.get("methods", []), new_cls.get("methods", [])):
+                for key in keys:
+                    if old_m.get(key) != new_m.get(key):
+                        mismatches.append((name, old_m["name"], key))
+    return mismatches
+
+
+def main():
+    trees = load_trees(ZIP_PATH)
+    print(f"Parsed {len(trees)} Java files from {os.path.basename(ZIP_PATH)} (best of {REPEATS} runs)\n")
+    print(f"{'extractor':<22}{'filter (s)':>12}{'visitor (s)':>13}{'speedup':>10}{'mismatches':>12}")
+    for label, fn in (("tree_to_json", tree_to_json), ("enhancedtree_to_json", enhancedtree_to_json)):
+        old = time_extractor(fn, trees, "filter")
+        new = time_extractor(fn, trees, "visitor")
+        mismatches = compare_outputs(fn, trees, SHARED_KEYS[label])
+        print(f"{label:<22}{old:>12.4f}{new:>13.4f}{old / new:>9.2f}x{len(mismatches):>12}")
+        for mismatch in mismatches[:5]:
+            print("   mismatch:", mismatch)
+
+
+if __name__ == "__main__":
+    main()
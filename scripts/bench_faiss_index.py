@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import sqlite3
+import argparse
+from array import array
+
+import numpy as np
+import faiss
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from faiss_indexes import build_params, build_index, set_search_params
+
+K = 4
+SWEEPS = {
+    "flat": [{}],
+    "ivf_flat": [{"nprobe": n} for n in (1, 4, 8, 16, 32)],
+    "ivf_pq": [{"nprobe": n} for n in (4, 8, 16, 32)],
+    "hnsw": [{"ef_search": e} for e in (16, 32, 64, 128)],
+}
+
+
+def synthetic_vectors(count, dim, clusters=200, seed=0):
+    """Clustered, L2-normalised vectors: closer to sentence embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype("float32")
+    vectors = centers[rng.integers(0, clusters, count)] + 0.35 * rng.normal(size=(count, dim)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def cached_vectors(path, limit):
+    """Vectors from embedding_service's SQLite cache (real KB chunks), if one exists."""
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT vector FROM embeddings LIMIT ?", (limit,)).fetchall()
+    conn.close()
+    return np.array([array("f", blob) for (blob,) in rows], dtype="float32")
+
+
+def search_all(index, queries):
+    start = time.perf_counter()
+    _, ids = index.search(queries, K)
+    return ids, (time.perf_counter() - start) / len(queries)
+
+
+def recall(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs latency of FAISS index types against the flat baseline")
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)  # all-MiniLM-L6-v2
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--cache", help="embedding_cache.sqlite to take real vectors from")
+    args = parser.parse_args()
+
+    if args.cache:
+        data = cached_vectors(args.cache, args.count + args.queries)
+    else:
+        data = synthetic_vectors(args.count + args.queries, args.dim)
+    vectors, queries = data[:-args.queries], data[-args.queries:]
+    print(f"{len(vectors)} vectors, dim {vectors.shape[1]}, {len(queries)} queries, k={K}")
+
+    truth = None
+    print(f"{'index':<10} {'params':<44} {'build s':>8} {'MB':>7} {'us/query':>9} {'recall':>7}")
+    for index_type, sweep in SWEEPS.items():
+        params = build_params(index_type, len(vectors), vectors.shape[1])
+        start = time.perf_counter()
+        index = build_index(vectors, params)
+        index.add(vectors)
+        build_seconds = time.perf_counter() - start
+        size_mb = len(faiss.serialize_index(index)) / 1e6
+        for search in sweep:
+            set_search_params(index, **search)
+            ids, per_query = search_all(index, queries)
+            if truth is None:
+                truth = ids
+            label = ", ".join(f"{k}={v}" for k, v in {**params, **search}.items() if k != "index_type")
+            print(f"{index_type:<10} {label:<44} {build_seconds:>8.2f} {size_mb:>7.1f} "
+                  f"{per_query * 1e6:>9.1f} {recall(ids, truth):>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
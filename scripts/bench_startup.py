@@ -0,0 +1,67 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+DEFAULT_MODULES = ["AutomatewithoutRag", "AutoPipeline", "AutomateRagOPT"]
+# imported by any of these = the module is not import-light
+HEAVY = ["torch", "transformers", "sentence_transformers", "langchain", "langchain_core", "langchain_community",
+         "faiss", "numpy"]
+
+PROBE = """
+import sys, json
+import {module}
+print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))
+"""
+
+
+def parse_importtime(stderr):
+    """[(cumulative us, self us, module)] from `python -X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # nesting is shown by indentation after the single separator space
+        rows.append((int(cumulative_us), int(self_us), name[1:].rstrip()))
+    return rows
+
+
+def measure(module, python, top):
+    code = PROBE.format(module=module, heavy=HEAVY)
+    start = time.perf_counter()
+    proc = subprocess.run([python, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        print(f"{module}: import failed\n{proc.stderr.strip().splitlines()[-1]}")
+        return None
+    rows = parse_importtime(proc.stderr)
+    # direct imports of the entry module (one indentation level deep)
+    direct = [r for r in rows if len(r[2]) - len(r[2].lstrip()) == 2]
+    heavy = json.loads(proc.stdout.strip().splitlines()[-1])
+    print(f"\n{module}: {wall:.2f}s wall (interpreter included), heavy modules loaded: {', '.join(heavy) or 'none'}")
+    for cumulative_us, _, name in sorted(direct, reverse=True)[:top]:
+        print(f"  {cumulative_us / 1e6:>7.3f}s  {name.strip()}")
+    return wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import cost of the generation entry points")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=8, help="slowest top-level imports to list")
+    parser.add_argument("--python", default=sys.executable)
+    args = parser.parse_args()
+    subprocess.run([args.python, "-c", "pass"], capture_output=True)  # warm the OS file cache
+    start = time.perf_counter()
+    subprocess.run([args.python, "-c", "pass"], capture_output=True)
+    print(f"bare interpreter: {time.perf_counter() - start:.2f}s")
+    for module in args.modules:
+        measure(module, args.python, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Offline stand-in for `mvn` so batch_evaluator / RunProjectResultGenerator can be exercised
+without Maven or a JDK:  MVN_COMMAND="python scripts/stub_mvn.py" python batch_evaluator.py ...
+
+Behaviour is driven by markers in the project's test sources:
+  // STUB:COMPILE_ERROR   -> a javac-style "[ERROR] <file>:[line,col] cannot find symbol" and exit 1
+  // STUB:HANG            -> never finishes (forks a child, like surefire), to test kill-on-timeout
+  // STUB:TEST_FAIL       -> `test` writes a failing surefire testcase for that class
+`dependency:build-classpath -Dmdep.outputFile=F` writes a two-jar classpath (empty files in stub-repo/) to F.
+STUB_MVN_DELAY (seconds, default 0.2) simulates JVM start-up + main compile; it is skipped with
+-Dmaven.main.skip=true, like the real compiler plugin. `clean` removes target/, compiling fills
+target/classes and target/test-classes. STUB_MVN_NOISE=N prints N filler [DEBUG] lines (huge logs),
+and compile errors are printed one by one (STUB_MVN_ERROR_DELAY apart) so fail-fast can be observed.
+"""
+import os
+import re
+import sys
+import time
+import shutil
+import subprocess
+
+TEST_METHOD = re.compile(r"@Test\s+(?:public\s+)?void\s+(\w+)")
+
+
+def test_sources(root):
+    for dirpath, _, files in os.walk(os.path.join(root, "src", "test", "java")):
+        for file in sorted(files):
+            if file.endswith(".java"):
+                path = os.path.join(dirpath, file)
+                with open(path, "r", encoding="utf-8") as f:
+                    yield path, f.read()
+
+
+def write_surefire_reports(root, sources):
+    report_dir = os.path.join(root, "target", "surefire-reports")
+    os.makedirs(report_dir, exist_ok=True)
+    total = failures = 0
+    for path, code in sources:
+        name = os.path.splitext(os.path.basename(path))[0]
+        cases = []
+        for method in TEST_METHOD.findall(code) or ["stubTest"]:
+            total += 1
+            if "STUB:TEST_FAIL" in code:
+                failures += 1
+                cases.append(f'<testcase name="{method}" classname="{name}">'
+                             f'<failure message="expected true" type="org.opentest4j.AssertionFailedError"/></testcase>')
+            else:
+                cases.append(f'<testcase name="{method}" classname="{name}"/>')
+        with open(os.path.join(report_dir, f"TEST-{name}.xml"), "w", encoding="utf-8") as f:
+            f.write(f'<testsuite name="{name}">{"".join(cases)}</testsuite>\n')
+    print(f"[INFO] Tests run: {total}, Failures: {failures}, Errors: 0, Skipped: 0")
+    return failures
+
+
+def main(argv):
+    root = os.getcwd()
+    goals = [a for a in argv if not a.startswith("-")]
+    print(f"[INFO] Stub Maven: goals={' '.join(goals)} args={' '.join(a for a in argv if a.startswith('-D'))}")
+    if not os.path.exists(os.path.join(root, "pom.xml")):
+        print(f"[ERROR] The goal you specified requires a project to execute but there is no POM in this directory ({root}).")
+        return 1
+    print(f"[INFO] Building {os.path.basename(root)} 1.0-SNAPSHOT", flush=True)
+    target = os.path.join(root, "target")
+    if "clean" in goals:
+        shutil.rmtree(target, ignore_errors=True)
+    if "-Dmaven.main.skip=true" in argv:
+        print("[INFO] Not compiling main sources")
+    else:
+        time.sleep(float(os.environ.get("STUB_MVN_DELAY", "0.2")))
+        os.makedirs(os.path.join(target, "classes"), exist_ok=True)
+        print("[INFO] Compiling main sources")
+    sources = list(test_sources(root))
+
+    if "dependency:build-classpath" in goals:
+        output_file = next((a.split("=", 1)[1] for a in argv if a.startswith("-Dmdep.outputFile=")), None)
+        jars = [os.path.join(root, "stub-repo", name) for name in ("junit-jupiter-api-5.10.2.jar", "mockito-core-5.11.0.jar")]
+        for jar in jars:
+            os.makedirs(os.path.dirname(jar), exist_ok=True)
+            open(jar, "a").close()
+        if output_file:
+            with open(output_file, "w", encoding="utf-8") as f:
+                f.write(os.pathsep.join(jars))
+        print("[INFO] Dependencies classpath written")
+
+    if not any(goal in goals for goal in ("test-compile", "test", "package", "verify", "install")):
+        print("[INFO] BUILD SUCCESS")   # compile / dependency goals never see test sources
+        return 0
+
+    if any("STUB:HANG" in code for _, code in sources):
+        print("[INFO] Running tests (stub hangs here)", flush=True)
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(3600)"])
+        child.wait()
+        return 1
+
+    for number in range(int(os.environ.get("STUB_MVN_NOISE", "0"))):
+        print(f"[DEBUG] resolving org.example:artifact-{number}:jar:1.0 from the local repository ({'.' * 80})")
+
+    errors = 0
+    for path, code in sources:
+        for number, line in enumerate(code.splitlines(), start=1):
+            if "STUB:COMPILE_ERROR" in line:
+                errors += 1
+                print(f"[ERROR] {path}:[{number},5] cannot find symbol", flush=True)
+                time.sleep(float(os.environ.get("STUB_MVN_ERROR_DELAY", "0")))
+    if errors:
+        print("[INFO] BUILD FAILURE")
+        return 1
+    print("[INFO] Compiling test sources")
+    os.makedirs(os.path.join(target, "test-classes"), exist_ok=True)
+    if "test" in goals and write_surefire_reports(root, sources):
+        print("[INFO] BUILD FAILURE")
+        return 1
+    print("[INFO] BUILD SUCCESS")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
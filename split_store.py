@@ -0,0 +1,348 @@
+import os
+import json
+import mmap
+import hashlib
+import struct
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from langchain.schema import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+
+# -----------------------
+# File layout
+# -----------------------
+# <path>.data : DATA_MAGIC, then records  [RECORD_HEAD][id][metadata json][content]  (UTF-8)
+# <path>.idx  : INDEX_MAGIC + TAG_SIZE bytes tag, then one fixed ENTRY per record (row number = position)
+# <path>.ids  : IDS_MAGIC + IDS_HEAD, then one ID_ENTRY per row it covers, sorted by (id hash, row);
+#               written by commit() / create / compact, rows appended later are read from .data on open
+DATA_MAGIC = b"KBSPLIT1"
+INDEX_MAGIC = b"KBSIDX01"
+IDS_MAGIC = b"KBSIDS01"
+TAG_SIZE = 64
+RECORD_HEAD = struct.Struct("<HII")   # id length, metadata length, content length
+ENTRY = struct.Struct("<QII")         # data offset, record length, flags
+IDS_HEAD = struct.Struct("<QQI")      # rows covered, offset + length of the last one (checked against .idx)
+ID_ENTRY = struct.Struct("<QI")       # 64-bit id hash, row
+INDEX_HEADER = len(INDEX_MAGIC) + TAG_SIZE
+IDS_HEADER = len(IDS_MAGIC) + IDS_HEAD.size
+FLAG_DELETED = 1
+COMPACT_DEAD_RATIO = 0.5
+
+
+class SplitStore:
+    """
+    Append-only binary store of KB chunks, memory-mapped for reading.
+
+    Opening only maps the files, including the sorted id table (.ids) that get() binary-searches;
+    just the rows appended since its last commit() are read. A Document is built when get() asks
+    for it, so startup cost and resident memory stay flat as the KB grows. delete() only
+    tombstones rows (lookups by id keep working until compact()), which keeps an older
+    persisted FAISS index valid if the process dies between deleting and saving.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._data = self._index = self._id_table = None
+        if not os.path.exists(path + ".idx") or not os.path.exists(path + ".data"):
+            self._write_files(path, [], "")
+        self._open()
+
+    # -----------------------
+    # Files
+    # -----------------------
+    @staticmethod
+    def _write_files(path: str, rows: Iterable[tuple], tag: str):
+        """Write a fresh store (rows of (id, metadata, content)) via temp files + os.replace."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        id_entries, last = [], (0, 0)
+        with open(path + ".data.tmp", "wb") as data, open(path + ".idx.tmp", "wb") as index:
+            data.write(DATA_MAGIC)
+            index.write(INDEX_MAGIC + tag.encode("utf-8")[:TAG_SIZE].ljust(TAG_SIZE, b"\0"))
+            offset = len(DATA_MAGIC)
+            for row, (doc_id, metadata, content) in enumerate(rows):
+                record = _encode_record(doc_id, metadata, content)
+                data.write(record)
+                index.write(ENTRY.pack(offset, len(record), 0))
+                id_entries.append((_id_hash(doc_id), row))
+                last = (offset, len(record))
+                offset += len(record)
+        _write_id_table(path + ".ids.tmp", id_entries, len(id_entries), last)
+        os.replace(path + ".data.tmp", path + ".data")
+        os.replace(path + ".idx.tmp", path + ".idx")
+        os.replace(path + ".ids.tmp", path + ".ids")
+
+    def _map(self):
+        self._close_maps()
+        with open(self.path + ".data", "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(self.path + ".idx", "rb") as f:
+            self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(DATA_MAGIC)] != DATA_MAGIC or self._index[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f"{self.path} is not a split store")
+        if os.path.exists(self.path + ".ids"):
+            with open(self.path + ".ids", "rb") as f:
+                if os.fstat(f.fileno()).st_size >= IDS_HEADER:
+                    self._id_table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _open(self):
+        """Map the files; only rows the id table does not cover (appended since commit) are read."""
+        self._map()
+        self._rows = (len(self._index) - INDEX_HEADER) // ENTRY.size
+        self._dead: Optional[int] = None  # counted on first use
+        self._covered = self._table_rows()
+        self._recent: Dict[str, int] = {}
+        for row in range(self._covered, self._rows):
+            self._recent[self._read_id(row)] = row
+
+    def _table_rows(self) -> int:
+        """Rows covered by the mapped id table, 0 if there is none or it belongs to other files."""
+        table = self._id_table
+        if table is None or table[:len(IDS_MAGIC)] != IDS_MAGIC:
+            return 0
+        covered, last_offset, last_length = IDS_HEAD.unpack_from(table, len(IDS_MAGIC))
+        if covered > self._rows or len(table) != IDS_HEADER + covered * ID_ENTRY.size or \
+                (covered and self._entry(covered - 1)[:2] != (last_offset, last_length)):
+            return 0
+        return covered
+
+    def _close_maps(self):
+        for m in (self._data, self._index, self._id_table):
+            if m is not None:
+                m.close()
+        self._data = self._index = self._id_table = None
+
+    def _entry(self, row: int):
+        return ENTRY.unpack_from(self._index, INDEX_HEADER + row * ENTRY.size)
+
+    def _read_id(self, row: int) -> str:
+        offset = self._entry(row)[0]
+        id_len = RECORD_HEAD.unpack_from(self._data, offset)[0]
+        start = offset + RECORD_HEAD.size
+        return self._data[start:start + id_len].decode("utf-8")
+
+    def _row(self, doc_id: str) -> Optional[int]:
+        """Newest row holding doc_id: rows since the last commit first, then a binary search of the id table."""
+        row = self._recent.get(doc_id)
+        if row is not None or not self._covered:
+            return row
+        key = _id_hash(doc_id)
+        lo, hi = 0, self._covered
+        while lo < hi:  # first table entry with hash > key
+            mid = (lo + hi) // 2
+            if ID_ENTRY.unpack_from(self._id_table, IDS_HEADER + mid * ID_ENTRY.size)[0] <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        for position in range(lo - 1, -1, -1):  # equal hashes are sorted by row: newest first
+            entry_hash, row = ID_ENTRY.unpack_from(self._id_table, IDS_HEADER + position * ID_ENTRY.size)
+            if entry_hash != key:
+                break
+            if self._read_id(row) == doc_id:
+                return row
+        return None
+
+    @property
+    def dead(self) -> int:
+        if self._dead is None:
+            self._dead = sum(self._entry(row)[2] & FLAG_DELETED for row in range(self._rows))
+        return self._dead
+
+    # -----------------------
+    # Reading
+    # -----------------------
+    @property
+    def tag(self) -> str:
+        return self._index[len(INDEX_MAGIC):INDEX_HEADER].rstrip(b"\0").decode("utf-8")
+
+    def __len__(self) -> int:
+        return self._rows - self.dead
+
+    def __contains__(self, doc_id: str) -> bool:
+        with self._lock:
+            return self._row(doc_id) is not None
+
+    def _read(self, row: int) -> Document:
+        offset = self._entry(row)[0]
+        id_len, meta_len, content_len = RECORD_HEAD.unpack_from(self._data, offset)
+        start = offset + RECORD_HEAD.size + id_len
+        metadata = json.loads(self._data[start:start + meta_len]) if meta_len else {}
+        start += meta_len
+        return Document(page_content=self._data[start:start + content_len].decode("utf-8"), metadata=metadata)
+
+    def get(self, doc_id: str) -> Optional[Document]:
+        with self._lock:
+            row = self._row(doc_id)
+            return None if row is None else self._read(row)
+
+    def ids(self) -> List[str]:
+        """Live ids in insertion order (reads every row's id)."""
+        with self._lock:
+            newest = {self._read_id(row): row for row in range(self._rows)}
+            return [doc_id for doc_id, row in sorted(newest.items(), key=lambda item: item[1])
+                    if not self._entry(row)[2] & FLAG_DELETED]
+
+    def __iter__(self) -> Iterator[Document]:
+        for doc_id in self.ids():
+            doc = self.get(doc_id)
+            if doc is not None:
+                yield doc
+
+    # -----------------------
+    # Writing
+    # -----------------------
+    @classmethod
+    def create(cls, path: str, documents: Iterable[Document], ids: Optional[Iterable[str]] = None,
+               tag: str = "") -> "SplitStore":
+        """Replace whatever is at `path` with `documents` (ids default to row numbers)."""
+        documents = list(documents)
+        ids = [str(i) for i in range(len(documents))] if ids is None else list(ids)
+        cls._write_files(path, ((i, d.metadata, d.page_content) for i, d in zip(ids, documents)), tag)
+        return cls(path)
+
+    def _is_live(self, doc_id: str) -> bool:
+        row = self._row(doc_id)
+        return row is not None and not self._entry(row)[2] & FLAG_DELETED
+
+    def add(self, items: Dict[str, Document]):
+        with self._lock:
+            # a tombstoned id may come back (e.g. a KB file restored with the same content)
+            existing = [doc_id for doc_id in items if self._is_live(doc_id)]
+            if existing:
+                raise ValueError(f"Tried to add ids that already exist: {existing[:5]}")
+            # unmap before touching the files (Windows refuses to change mapped files)
+            self._close_maps()
+            with open(self.path + ".data", "ab") as data, open(self.path + ".idx", "ab") as index:
+                offset = data.tell()
+                for doc_id, doc in items.items():
+                    record = _encode_record(doc_id, doc.metadata, doc.page_content)
+                    data.write(record)
+                    index.write(ENTRY.pack(offset, len(record), 0))
+                    offset += len(record)
+            self._map()
+            for doc_id in items:  # a re-added tombstoned id now points at its new row
+                self._recent[doc_id] = self._rows
+                self._rows += 1
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            entries = {}
+            for doc_id in ids:
+                row = self._row(doc_id)
+                if row is not None:
+                    entries[row] = self._entry(row)
+            self._close_maps()
+            with open(self.path + ".idx", "r+b") as index:
+                for row, (offset, length, flags) in entries.items():
+                    index.seek(INDEX_HEADER + row * ENTRY.size)
+                    index.write(ENTRY.pack(offset, length, flags | FLAG_DELETED))
+            self._map()
+            if self._dead is not None:
+                self._dead += sum(1 for _, _, flags in entries.values() if not flags & FLAG_DELETED)
+
+    def commit(self):
+        """Fold the rows added since the last commit into the .ids table, so the next open only maps it."""
+        with self._lock:
+            if self._covered == self._rows:
+                return
+            entries = [ID_ENTRY.unpack_from(self._id_table, IDS_HEADER + i * ID_ENTRY.size)
+                       for i in range(self._covered)]
+            entries += [(_id_hash(self._read_id(row)), row) for row in range(self._covered, self._rows)]
+            _write_id_table(self.path + ".ids.tmp", entries, self._rows, self._entry(self._rows - 1)[:2])
+            self._close_maps()
+            os.replace(self.path + ".ids.tmp", self.path + ".ids")
+            self._map()
+            self._covered, self._recent = self._rows, {}
+
+    def compact(self, force: bool = False) -> bool:
+        """Rewrite without tombstoned rows once they make up COMPACT_DEAD_RATIO of the file."""
+        with self._lock:
+            if not self._rows or (not force and self.dead / self._rows < COMPACT_DEAD_RATIO):
+                return False
+            live = self.ids()
+            docs = [self.get(doc_id) for doc_id in live]
+            tag = self.tag
+            self._close_maps()
+            self._write_files(self.path, ((i, d.metadata, d.page_content) for i, d in zip(live, docs)), tag)
+            self._open()
+            return True
+
+    def move(self, path: str):
+        """Replace the store at `path` with this one (os.replace of its files) and continue from there."""
+        with self._lock:
+            self._close_maps()
+            os.replace(self.path + ".idx", path + ".idx")
+            os.replace(self.path + ".data", path + ".data")
+            if os.path.exists(self.path + ".ids"):
+                os.replace(self.path + ".ids", path + ".ids")
+            elif os.path.exists(path + ".ids"):
+                os.remove(path + ".ids")  # the replaced store's table; rows are re-read on open instead
+            self.path = path
+            self._map()
+
+    def close(self):
+        with self._lock:
+            self._close_maps()
+
+
+def _id_hash(doc_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(doc_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _write_id_table(path: str, entries: List[tuple], rows: int, last: tuple):
+    with open(path, "wb") as f:
+        f.write(IDS_MAGIC + IDS_HEAD.pack(rows, *last))
+        for entry in sorted(entries):
+            f.write(ID_ENTRY.pack(*entry))
+
+
+def _encode_record(doc_id: str, metadata: dict, content: str) -> bytes:
+    id_bytes = doc_id.encode("utf-8")
+    meta_bytes = json.dumps(metadata, ensure_ascii=False).encode("utf-8") if metadata else b""
+    content_bytes = content.encode("utf-8")
+    return RECORD_HEAD.pack(len(id_bytes), len(meta_bytes), len(content_bytes)) + id_bytes + meta_bytes + content_bytes
+
+
+# -----------------------
+# FAISS docstore
+# -----------------------
+class SplitStoreDocstore(Docstore, AddableMixin):
+    """
+    LangChain docstore over a SplitStore. FAISS.save_local pickles only the store path,
+    so load_local no longer unpickles every Document; they are built per search hit.
+    """
+
+    def __init__(self, path: str, fresh: bool = False):
+        self.path = path
+        self.store = SplitStore.create(path, []) if fresh else SplitStore(path)
+
+    def close(self):
+        self.store.close()
+
+    def commit(self):
+        """Persist the id table for rows added since the last commit (see SplitStore.commit)."""
+        self.store.commit()
+
+    def move(self, path: str):
+        """Swap a docstore built at a temporary path into `path` (see SplitStore.move)."""
+        self.store.move(path)
+        self.path = path
+
+    def __reduce__(self):
+        return (SplitStoreDocstore, (self.path,))
+
+    def search(self, search: str):
+        doc = self.store.get(search)
+        return doc if doc is not None else f"ID {search} not found."
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        self.store.add(texts)
+
+    def delete(self, ids: List) -> None:
+        self.store.delete(ids)
+
+    def __len__(self) -> int:
+        return len(self.store)
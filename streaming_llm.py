@@ -0,0 +1,114 @@
+import time
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from llm_backend import get_llm_backend
+
+# -----------------------
+# Stats (per process)
+# -----------------------
+_stats_lock = threading.Lock()
+_STATS = {"streams": 0, "early_stops": 0, "chars_kept": 0, "seconds": 0.0}
+
+
+class ClassCloseDetector:
+    """
+    Incremental version of clean_java_code's line logic:
+    fence and blank lines are ignored, code starts at the first line beginning with
+    'import' / 'public class' / 'class', and the class is closed when the brace balance
+    returns to 0 after at least one '{'.
+    Feed chunks as they arrive; feed() returns True once the class is closed.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.balance = 0
+        self.seen_open = False
+        self.closed = False
+        self._partial = ""
+
+    @staticmethod
+    def _is_start(stripped: str) -> bool:
+        return stripped.startswith("import") or stripped.startswith("public class") or stripped.startswith("class")
+
+    def _line(self, line: str) -> bool:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("```"):
+            return False
+        if not self.started:
+            if not self._is_start(stripped):
+                return False
+            self.started = True
+        self.balance += line.count("{") - line.count("}")
+        self.seen_open = self.seen_open or "{" in line
+        return self.balance == 0 and self.seen_open
+
+    def feed(self, text: str) -> bool:
+        if self.closed:
+            return True
+        self._partial += text
+        *lines, self._partial = self._partial.split("\n")
+        for line in lines:
+            if self._line(line):
+                self.closed = True
+                return True
+        # don't wait for the newline after the final '}' - that is where the explanation starts
+        pending = self._partial.strip()
+        if self.started and self.seen_open and pending.endswith("}") and not pending.startswith("```"):
+            if self.balance + pending.count("{") - pending.count("}") == 0:
+                self.closed = True
+        return self.closed
+
+
+def _chunk_text(chunk) -> str:
+    return chunk.get("response") or ""
+
+
+def consume_until_class_close(chunks: Iterable[Any]) -> Dict[str, Any]:
+    """Read a streamed response until the test class closes; closes the stream when stopping early."""
+    detector = ClassCloseDetector()
+    parts, stopped_early = [], False
+    try:
+        for chunk in chunks:
+            text = _chunk_text(chunk)
+            parts.append(text)
+            if detector.feed(text):
+                stopped_early = True
+                break
+    finally:
+        # closing the generator closes the HTTP response, which cancels decoding on the server
+        close = getattr(chunks, "close", None)
+        if stopped_early and close is not None:
+            close()
+    return {"response": "".join(parts), "stopped_early": stopped_early}
+
+
+def stream_generate(model: str, prompt: str, options: Optional[Dict[str, Any]] = None,
+                    stop_at_class_close: bool = True) -> Dict[str, Any]:
+    """
+    Streamed generation through the shared LLM backend. With `stop_at_class_close` the request is aborted as soon
+    as the generated test class is syntactically closed, skipping any trailing explanation.
+    Returns {"response", "stopped_early", "seconds"}; "response" is the raw text (still run
+    clean_java_code on it as before).
+    """
+    start = time.perf_counter()
+    chunks = get_llm_backend().stream(model, prompt, options=options)
+    if stop_at_class_close:
+        result = consume_until_class_close(chunks)
+    else:
+        result = {"response": "".join(_chunk_text(c) for c in chunks), "stopped_early": False}
+    result["seconds"] = round(time.perf_counter() - start, 3)
+
+    with _stats_lock:
+        _STATS["streams"] += 1
+        _STATS["early_stops"] += int(result["stopped_early"])
+        _STATS["chars_kept"] += len(result["response"])
+        _STATS["seconds"] += result["seconds"]
+    return result
+
+
+def stream_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_STATS)
+    stats["seconds"] = round(stats["seconds"], 3)
+    return stats
@@ -0,0 +1,101 @@
+import os
+import json
+import shlex
+import shutil
+import hashlib
+from typing import Any, Dict, List, Optional
+
+from RunProjectResultGenerator import MAX_BUILD_ERRORS, MVN_COMMAND, MVN_TIMEOUT, run_maven
+
+# -----------------------
+# Configs (tune if needed)
+# -----------------------
+# mvnd keeps a pool of warm Maven JVMs (plugins loaded, JIT-compiled); each concurrent build
+# gets its own daemon, so every evaluator worker reuses a warm JVM after its first project
+USE_MVND = True
+MVND_COMMAND = shlex.split(os.environ["MVND_COMMAND"]) if os.environ.get("MVND_COMMAND") else None
+STATE_FILE = ".warm_build.json"     # kept in <project>/target
+MAIN_INPUTS = ("src/main",)         # + every pom.xml of the project
+
+
+def find_mvnd() -> Optional[List[str]]:
+    if MVND_COMMAND:
+        return list(MVND_COMMAND)
+    path = shutil.which("mvnd") or shutil.which("mvnd.cmd")
+    return [path] if path else None
+
+
+def main_sources_hash(project_path: str) -> str:
+    """Content hash of everything that shapes target/classes: the poms and src/main."""
+    hasher = hashlib.sha1()
+    files = []
+    for dirpath, dirnames, filenames in os.walk(project_path):
+        dirnames[:] = sorted(d for d in dirnames if d not in ("target", ".git") and not d.startswith("."))
+        rel_dir = os.path.relpath(dirpath, project_path).replace(os.sep, "/")
+        for name in filenames:
+            rel = name if rel_dir == "." else f"{rel_dir}/{name}"
+            if name == "pom.xml" or any(rel.startswith(p + "/") or f"/{p}/" in rel for p in MAIN_INPUTS):
+                files.append(rel)
+    for rel in sorted(files):
+        hasher.update(rel.encode("utf-8"))
+        with open(os.path.join(project_path, rel), "rb") as f:
+            hasher.update(hashlib.sha1(f.read()).digest())
+    return hasher.hexdigest()
+
+
+def _state_path(project_path: str) -> str:
+    return os.path.join(project_path, "target", STATE_FILE)
+
+
+def load_state(project_path: str) -> Dict[str, Any]:
+    try:
+        with open(_state_path(project_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(project_path: str, state: Dict[str, Any]):
+    path = _state_path(project_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def main_compiled(project_path: str, errors: List[Dict[str, Any]]) -> bool:
+    """target/classes exists and no compile error (run_maven's "errors") points into main sources."""
+    if not os.path.isdir(os.path.join(project_path, "target", "classes")):
+        return False
+    main_dir = os.sep + os.path.join("src", "main") + os.sep
+    return not any(main_dir in os.path.normpath(e["file"]) for e in errors)
+
+
+def warm_test_compile(project_path: str, log_file: str, extra_args: Optional[List[str]] = None,
+                      timeout: Optional[float] = MVN_TIMEOUT, env=None, use_mvnd: bool = USE_MVND,
+                      max_errors: Optional[int] = MAX_BUILD_ERRORS) -> Dict[str, Any]:
+    """
+    `test-compile` that only pays for main sources when they changed:
+      cold: clean test-compile (first run, or poms / src/main changed since the last good build)
+      warm: test-compile -Dmaven.main.skip=true on the existing target/classes; target/test-classes
+            is dropped first so only the current (generated) test sources are compiled
+    Runs through mvnd when available. Adds mode / runner / main_hash to run_maven's result.
+    """
+    main_hash = main_sources_hash(project_path)
+    state = load_state(project_path)
+    warm = state.get("main_hash") == main_hash and os.path.isdir(os.path.join(project_path, "target", "classes"))
+    mvnd = find_mvnd() if use_mvnd else None
+
+    if warm:
+        shutil.rmtree(os.path.join(project_path, "target", "test-classes"), ignore_errors=True)
+        goals = ["test-compile", "-Dmaven.main.skip=true"]
+    else:
+        goals = ["clean", "test-compile"]
+    result = run_maven(project_path, goals, log_file, extra_args=extra_args, timeout=timeout, env=env,
+                       mvn=mvnd or MVN_COMMAND, max_errors=max_errors)
+    result.update(mode="warm" if warm else "cold", runner="mvnd" if mvnd else "mvn", main_hash=main_hash)
+
+    if not warm and not result["timed_out"] and not result["aborted"]:
+        if main_compiled(project_path, result["errors"]):
+            save_state(project_path, {"main_hash": main_hash})
+    return result